@@ -0,0 +1,242 @@
+# analytics.py
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import pandas as pd
+import streamlit as st
+
+from schema import resolve
+from textnorm import norm_series
+
+
+def find_volunteer_col(columns) -> Optional[str]:
+    """Coluna 'Voluntários envolvidos' (lista separada por vírgula) nas Ações."""
+    return resolve("acoes", columns).get("voluntarios")
+
+
+def explode_volunteers(acoes: pd.DataFrame, col: str) -> pd.DataFrame:
+    """
+    Uma linha por (ação, voluntário): `acao_id` é o índice da linha em Ações,
+    `nome` o texto original e `nome_norm` a chave normalizada.
+    """
+    s = acoes[col].dropna().astype(str)
+    ex = s.str.split(",").explode().str.strip()
+    ex = ex[ex.notna() & (ex != "")]
+    return pd.DataFrame({"acao_id": ex.index, "nome": ex.to_numpy(), "nome_norm": norm_series(ex).to_numpy()})
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def volunteer_bridge(_acoes: pd.DataFrame, _volunt: pd.DataFrame, version: str):
+    """
+    Tabela-ponte voluntário↔ação construída uma vez por snapshot (`version`).
+
+    Devolve (bridge, names):
+      - bridge: acao_id (índice em Ações) × vol_id (int)
+      - names:  vol_id → nome exibido, nome_norm e vol_row (linha na aba
+                Voluntários quando o nome casa, senão -1)
+    """
+    col = find_volunteer_col(_acoes.columns)
+    if not col:
+        empty = pd.DataFrame({"acao_id": pd.Series(dtype="int64"), "vol_id": pd.Series(dtype="int32")})
+        return empty, pd.DataFrame(columns=["vol_id", "nome", "nome_norm", "vol_row"])
+
+    ex = explode_volunteers(_acoes, col)
+    codes, uniques = pd.factorize(ex["nome_norm"])
+    bridge = pd.DataFrame({"acao_id": ex["acao_id"].to_numpy(), "vol_id": codes.astype("int32")})
+
+    names = pd.DataFrame({"vol_id": range(len(uniques)), "nome_norm": uniques})
+    first_display = ex.drop_duplicates("nome_norm").set_index("nome_norm")["nome"]
+    names["nome"] = names["nome_norm"].map(first_display)
+
+    # junta com a aba Voluntários pelo nome normalizado
+    names["vol_row"] = -1
+    name_col = resolve("voluntarios", _volunt.columns).get("nome") \
+        if _volunt is not None and not _volunt.empty else None
+    if name_col:
+        keys = norm_series(_volunt[name_col])
+        rows = pd.Series(_volunt.index, index=keys.to_numpy())
+        rows = rows[~rows.index.duplicated()]
+        names["vol_row"] = names["nome_norm"].map(rows).fillna(-1).astype(int)
+    return bridge, names
+
+
+def unique_volunteers(bridge: pd.DataFrame, action_ids) -> int:
+    """Voluntários distintos nas ações informadas (ids = índice de Ações)."""
+    return int(bridge.loc[bridge["acao_id"].isin(action_ids), "vol_id"].nunique())
+
+
+def volunteer_stats(bridge: pd.DataFrame, names: pd.DataFrame, action_ids,
+                    dur_h: Optional[pd.Series] = None) -> pd.DataFrame:
+    """Ações e horas por voluntário nas ações informadas."""
+    b = bridge[bridge["acao_id"].isin(action_ids)]
+    if b.empty:
+        return pd.DataFrame(columns=["Voluntário", "Ações", "Horas"])
+    horas = dur_h.reindex(b["acao_id"]).fillna(0.0).to_numpy() if dur_h is not None else 0.0
+    agg = (
+        b.assign(Horas=horas)
+        .groupby("vol_id")
+        .agg(Ações=("acao_id", "nunique"), Horas=("Horas", "sum"))
+        .join(names.set_index("vol_id")["nome"])
+        .rename(columns={"nome": "Voluntário"})
+        .sort_values(["Horas", "Ações"], ascending=False)
+    )
+    return agg[["Voluntário", "Ações", "Horas"]].reset_index(drop=True)
+
+
+# ---------------------------------------------------------------------
+# Horas de voluntariado (Horário de início/término)
+# ---------------------------------------------------------------------
+def _parse_clock(s: pd.Series) -> pd.Series:
+    """'08:00:00' / '08:00' -> horário (NaT se inválido), vetorizado."""
+    txt = s.astype(str).str.strip()
+    t = pd.to_datetime(txt, format="%H:%M:%S", errors="coerce")
+    return t.fillna(pd.to_datetime(txt, format="%H:%M", errors="coerce"))
+
+
+def action_hours(acoes: pd.DataFrame) -> Tuple[pd.Series, float]:
+    """
+    Duração (h) de cada ação e o total. Término antes do início vira o dia
+    seguinte; com a coluna Data (datetime) preenchida, ações sem data
+    contam 0. Sem as colunas de horário, tudo 0.
+    """
+    cols = resolve("acoes", acoes.columns)
+    h_ini_col, h_fim_col = cols.get("inicio"), cols.get("termino")
+    if not (h_ini_col and h_fim_col):
+        return pd.Series(0.0, index=acoes.index), 0.0
+    delta = _parse_clock(acoes[h_fim_col]) - _parse_clock(acoes[h_ini_col])
+    delta = delta.where(delta >= pd.Timedelta(0), delta + pd.Timedelta(days=1))
+    datas = acoes["Data"] if "Data" in acoes.columns else None
+    if datas is not None and pd.api.types.is_datetime64_any_dtype(datas) and datas.notna().any():
+        delta = delta.where(datas.notna())
+    dur_h = (delta.dt.total_seconds() / 3600.0).clip(lower=0).fillna(0.0)
+    return dur_h, float(dur_h.sum())
+
+
+# ---------------------------------------------------------------------
+# Perfil de colunas (por snapshot)
+# ---------------------------------------------------------------------
+# Acima disso a coluna não vira filtro de multiselect (mesmo limite da UI)
+MAX_FILTER_OPTIONS = 50
+
+
+def _build_profile(df: pd.DataFrame) -> dict:
+    n_rows, n_cols = len(df), len(df.columns)
+    mem = df.memory_usage(deep=True)
+    nulls = df.isnull().sum()
+    cols = {}
+    for c in df.columns:
+        vals = df[c].dropna().unique()
+        cols[c] = {
+            "cardinality": int(len(vals)),
+            "null_ratio": float(nulls[c] / n_rows) if n_rows else 0.0,
+            "memory_bytes": int(mem.get(c, 0)),
+            # opções já ordenadas para os multiselects; None quando alta cardinalidade
+            "options": sorted(map(str, vals)) if len(vals) <= MAX_FILTER_OPTIONS else None,
+        }
+    cells = n_rows * n_cols
+    return {
+        "rows": n_rows,
+        "cols": n_cols,
+        "memory_bytes": int(mem.sum()),
+        "completeness": (1 - nulls.sum() / cells) * 100 if cells else 0.0,
+        "columns": cols,
+    }
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _cached_profile(_df: pd.DataFrame, table_key: str, version: str) -> dict:
+    return _build_profile(_df)
+
+
+def column_profile(df: pd.DataFrame, table_key: str) -> dict:
+    """
+    Perfil da tabela (linhas, memória, completude) e de cada coluna
+    (valores distintos, cardinalidade, % nulos, memória), calculado uma vez
+    por snapshot. Sem versão em df.attrs, calcula sem cache.
+    """
+    version = df.attrs.get("snapshot_version")
+    if not version:
+        return _build_profile(df)
+    return _cached_profile(df, table_key, version)
+
+
+# ---------------------------------------------------------------------
+# Cubo de Doações (mês × forma × tipo de doador × recorrente)
+# ---------------------------------------------------------------------
+CUBE_DIMS = ["forma_doacao", "tipo_doador", "recorrente"]
+_NA = "Não informado"
+
+
+def parse_brl(s: pd.Series) -> pd.Series:
+    """'R$ 1.234,56' / '1234.56' / 'R$ 1.500' (= 1500) -> float (vetorizado)."""
+    txt = s.astype(str).str.replace(r"[^0-9,.\-]", "", regex=True)
+    has_comma = txt.str.contains(",", regex=False)
+    txt = txt.where(~has_comma, txt.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    # sem vírgula, pontos seguidos de exatamente três dígitos são separador
+    # de milhar (pt-BR): '1.500' -> 1500, '1.234.567' -> 1234567; '1.50' segue decimal
+    milhar = ~has_comma & txt.str.fullmatch(r"-?\d{1,3}(?:\.\d{3})+")
+    txt = txt.where(~milhar, txt.str.replace(".", "", regex=False))
+    return pd.to_numeric(txt, errors="coerce")
+
+
+def _donation_columns(columns) -> dict:
+    """Colunas da aba Doações pelo registro de colunas (schema.py)."""
+    return dict(resolve("doacoes", columns).columns)
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def donations_cube(_doacoes: pd.DataFrame, version: str) -> pd.DataFrame:
+    """
+    Cubo pré-agregado das Doações, montado uma vez por snapshot (`version`):
+    mes × forma_doacao × tipo_doador × recorrente → valor (soma) e doacoes
+    (contagem). Filtros e drilldowns leem daqui, não das linhas brutas.
+    """
+    cols_out = ["mes"] + CUBE_DIMS + ["valor", "doacoes"]
+    if _doacoes is None or _doacoes.empty:
+        return pd.DataFrame(columns=cols_out)
+
+    cols = _donation_columns(_doacoes.columns)
+    n = len(_doacoes)
+    base = pd.DataFrame(index=_doacoes.index)
+    if "data" in cols:
+        datas = pd.to_datetime(_doacoes[cols["data"]], errors="coerce", dayfirst=True)
+        base["mes"] = datas.dt.to_period("M").dt.to_timestamp()
+    else:
+        base["mes"] = pd.NaT
+    for dim in CUBE_DIMS:
+        if dim in cols:
+            # fillna antes do astype: NaN/None (fontes federadas) viraria "nan"/"None"
+            v = _doacoes[cols[dim]].fillna("").astype(str).str.strip()
+            base[dim] = v.mask(v == "", _NA)
+        else:
+            base[dim] = [_NA] * n
+    base["valor"] = parse_brl(_doacoes[cols["valor"]]).fillna(0.0) if "valor" in cols else 0.0
+
+    cube = (
+        base.groupby(["mes"] + CUBE_DIMS, dropna=False, observed=True)
+        .agg(valor=("valor", "sum"), doacoes=("valor", "size"))
+        .reset_index()
+    )
+    for dim in CUBE_DIMS:
+        cube[dim] = cube[dim].astype("category")
+    return cube[cols_out]
+
+
+def slice_cube(cube: pd.DataFrame, periodo=None, **filters) -> pd.DataFrame:
+    """Fatia o cubo por período (tupla de datas) e listas de valores por dimensão."""
+    out = cube
+    if periodo and len(periodo) == 2 and all(periodo):
+        ini = pd.Timestamp(periodo[0]).to_period("M").to_timestamp()
+        fim = pd.Timestamp(periodo[1]).to_period("M").to_timestamp()
+        out = out[out["mes"].between(ini, fim)]
+    for dim, sel in filters.items():
+        if sel:
+            out = out[out[dim].isin(sel)]
+    return out
+
+
+def rollup(cube: pd.DataFrame, by) -> pd.DataFrame:
+    """Re-agrega o cubo (já fatiado) pelas dimensões em `by`."""
+    by = [by] if isinstance(by, str) else list(by)
+    return cube.groupby(by, as_index=False, observed=True)[["valor", "doacoes"]].sum()
@@ -1,5 +1,6 @@
 import streamlit as st
 import ui
+import perf
 from auth import ensure_auth, do_logout, show_login, clear_login_styles
 
 if not ensure_auth():
@@ -33,13 +34,13 @@ user = st.session_state.get("auth_user", {}) or {}
 papel = str(user.get("papel", "")).strip().lower()
 
 # Monta lista de páginas (Admin volta!)
-pages = ["Dashboard", "Dados Brutos"]
+pages = ["Dashboard", "Doações", "Dados Brutos"]
 if papel == "admin":
     pages.append("Admin")
 
 # --- Sidebar com logo grande e navegação em blocos ---
 page = ui.sidebar_nav(
-    items=["Dashboard", "Dados Brutos", "Admin"],  # ou pages=[...]
+    items=["Dashboard", "Doações", "Dados Brutos", "Admin"],  # ou pages=[...]
     logo="logo.png",
     on_logout=lambda: (do_logout(), st.rerun())  # <- essencial
 )
@@ -47,10 +48,13 @@ page = ui.sidebar_nav(
 
 
 # --- Router ---
-if page == "Dashboard":
-    ui.dashboard_acoes()
-elif page == "Dados Brutos":
-    ui.dados_brutos()
-elif page == "Admin":
-    # exige que exista ui.admin()
-    ui.admin()
+with perf.rerun(page, user.get("email", "")):
+    if page == "Dashboard":
+        ui.dashboard_acoes()
+    elif page == "Doações":
+        ui.doacoes_dashboard()
+    elif page == "Dados Brutos":
+        ui.dados_brutos()
+    elif page == "Admin":
+        # exige que exista ui.admin()
+        ui.admin()
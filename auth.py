@@ -15,6 +15,7 @@ import streamlit as st
 
 from db import init_db, get_user_by_email, record_login  # create_user opcional
 from ui_components import inject_css_once
+from perf import timed
 
 # =========================
 # ====== CONFIGURAÇÃO =====
@@ -328,7 +329,9 @@ def _login_form_card() -> Optional[dict]:
 
 
             user = get_user_by_email(email)
-            if not user or not bcrypt.checkpw(senha.encode("utf-8"), user["hash_senha"]):
+            with timed("auth.bcrypt_check"):
+                senha_ok = bool(user) and bcrypt.checkpw(senha.encode("utf-8"), user["hash_senha"])
+            if not senha_ok:
                 st.error("E-mail ou senha incorretos.")
                 _rate_register_fail()
                 st.markdown('</div>', unsafe_allow_html=True)
@@ -339,7 +342,8 @@ def _login_form_card() -> Optional[dict]:
                 st.markdown('</div>', unsafe_allow_html=True)
                 return None
 
-            record_login(email)
+            with timed("auth.record_login"):
+                record_login(email)
             st.markdown('</div>', unsafe_allow_html=True)
             return {"email": user["email"], "nome": user["nome"], "papel": user["papel"], "remember": remember}
 
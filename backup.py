@@ -0,0 +1,156 @@
+# backup.py
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import zipfile
+from datetime import datetime, timezone
+from typing import BinaryIO, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from export import CHUNK_ROWS, write_parquet, pq
+
+MANIFEST_NAME = "manifest.json"
+_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+FORMATS = ["ndjson"] + (["parquet"] if pq is not None else [])
+# mistura a ordem de ocorrência no hash: linhas idênticas viram chaves distintas
+_OCC_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """Hash (uint64) por linha, estável entre execuções — base do incremental."""
+    if df.empty:
+        return np.empty(0, dtype=np.uint64)
+    return pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64)
+
+
+def row_keys(df: pd.DataFrame) -> np.ndarray:
+    """Chave (uint64) por linha: hash da linha + ordem entre linhas idênticas."""
+    h = row_hashes(df)
+    if not len(h):
+        return h
+    occ = pd.Series(h).groupby(h, sort=False).cumcount().to_numpy(dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        return h + occ * _OCC_MIX
+
+
+def write_ndjson(df: pd.DataFrame, dst):
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS]
+        dst.write(chunk.to_json(orient="records", lines=True, force_ascii=False).encode("utf-8"))
+
+
+# ---------------------------------------------------------------------
+# Manifesto local do último backup
+# ---------------------------------------------------------------------
+def _state_dir(base: Optional[str] = None) -> str:
+    return base or os.path.join(os.getcwd(), ".cuida_backups")
+
+
+def read_manifest(state_dir: Optional[str] = None) -> Optional[dict]:
+    """Só o JSON do último manifesto (data, modo, tabelas), sem os hashes."""
+    path = os.path.join(_state_dir(state_dir), MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_last_manifest(state_dir: Optional[str] = None) -> Optional[dict]:
+    """Manifesto do último backup gerado (com os hashes de linha por tabela)."""
+    d = _state_dir(state_dir)
+    manifest = read_manifest(state_dir)
+    if manifest is None:
+        return None
+    manifest["_hashes"] = {}
+    for key in manifest.get("tables", {}):
+        hp = os.path.join(d, f"{key}.u64")
+        if os.path.exists(hp):
+            manifest["_hashes"][key] = np.fromfile(hp, dtype=np.uint64)
+    return manifest
+
+
+def _save_manifest(manifest: dict, hashes: Dict[str, np.ndarray], state_dir: Optional[str] = None):
+    d = _state_dir(state_dir)
+    os.makedirs(d, exist_ok=True)
+    for key, h in hashes.items():
+        h.tofile(os.path.join(d, f"{key}.u64"))
+    tmp = os.path.join(d, MANIFEST_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(d, MANIFEST_NAME))
+
+
+# ---------------------------------------------------------------------
+# Backup
+# ---------------------------------------------------------------------
+def build_backup(data_all: Dict[str, pd.DataFrame], fmt: str = "ndjson",
+                 incremental: bool = False, state_dir: Optional[str] = None) -> BinaryIO:
+    """
+    Gera um .zip com uma entrada por aba (Parquet ou NDJSON), escrita em
+    blocos direto no arquivo compactado — sem montar cópias do dataset.
+
+    Incremental: inclui só as linhas cuja chave (`row_keys`) não estava no
+    último manifesto, mais a lista de chaves removidas (`removed/<aba>.u64`).
+    Linhas repetidas têm chaves distintas, então uma cópia a mais ou a menos
+    de uma linha idêntica também entra no diff.
+    O manifesto (e os hashes atuais) fica no zip e em `state_dir`.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato de backup não suportado: {fmt}")
+    prev = load_last_manifest(state_dir) if incremental else None
+    prev_hashes = (prev or {}).get("_hashes", {})
+
+    now = datetime.now(timezone.utc).isoformat()
+    manifest = {
+        "version": 1,
+        "created_at": now,
+        "mode": "incremental" if prev else "full",
+        "base": prev.get("created_at") if prev else None,
+        "format": fmt,
+        "tables": {},
+    }
+    hashes: Dict[str, np.ndarray] = {}
+
+    out = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES)
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for key, df in data_all.items():
+            if df is None:
+                continue
+            h = row_keys(df)
+            hashes[key] = h
+            rows = df
+            removed = np.empty(0, dtype=np.uint64)
+            if prev is not None and key in prev_hashes:
+                old = prev_hashes[key]
+                rows = df[~np.isin(h, old)]
+                removed = np.setdiff1d(old, h)
+
+            if fmt == "parquet":
+                # Parquet já vem comprimido: guarda sem deflate
+                info = zipfile.ZipInfo(f"{key}.parquet", date_time=datetime.now().timetuple()[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                with zf.open(info, "w", force_zip64=True) as dst:
+                    write_parquet(rows, dst)
+            else:
+                with zf.open(f"{key}.ndjson", "w", force_zip64=True) as dst:
+                    write_ndjson(rows, dst)
+            zf.writestr(f"hashes/{key}.u64", h.tobytes())
+            if len(removed):
+                zf.writestr(f"removed/{key}.u64", removed.tobytes())
+
+            manifest["tables"][key] = {
+                "rows": int(len(df)),
+                "written": int(len(rows)),
+                "removed": int(len(removed)),
+                "columns": [str(c) for c in df.columns],
+            }
+        zf.writestr(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2))
+
+    _save_manifest(manifest, hashes, state_dir)
+    out.seek(0)
+    return out
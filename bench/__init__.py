@@ -0,0 +1 @@
+# bench/ — benchmarks offline do pipeline do dashboard (ver bench/run.py)
@@ -0,0 +1,142 @@
+# bench/fakes.py
+"""
+Fakes locais das APIs do gspread e do Drive, suficientes para rodar
+data.read_all_tables / yaml_store sem credenciais nem rede.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+from typing import Dict, List
+
+
+class FakeWorksheet:
+    def __init__(self, title: str, values: List[List[str]]):
+        self.title = title
+        self._values = values
+
+    @property
+    def row_count(self) -> int:
+        return len(self._values)
+
+    @property
+    def col_count(self) -> int:
+        return max((len(r) for r in self._values), default=0)
+
+    def get_all_values(self) -> List[List[str]]:
+        # gspread devolve uma lista nova a cada chamada
+        return [list(r) for r in self._values]
+
+    def get(self, range_name: str, **kwargs) -> List[List[str]]:
+        """Faixa de linhas em A1 ("5001:10000"), como Worksheet.get do gspread."""
+        from storage import a1_row_span
+        start, end = a1_row_span(range_name)
+        return [list(r) for r in self._values[start - 1:end]]
+
+
+class FakeSpreadsheet:
+    def __init__(self, tables: Dict[str, List[List[str]]], title: str = "Cuida SP - Database"):
+        self.title = title
+        self._ws = {name: FakeWorksheet(name, vals) for name, vals in tables.items()}
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        if title not in self._ws:
+            raise KeyError(f"WorksheetNotFound: {title}")
+        return self._ws[title]
+
+    def worksheets(self) -> List[FakeWorksheet]:
+        return list(self._ws.values())
+
+
+class FakeClient:
+    def __init__(self, spreadsheet: FakeSpreadsheet):
+        self._sh = spreadsheet
+
+    def open_by_key(self, key: str) -> FakeSpreadsheet:
+        return self._sh
+
+    def open(self, title: str) -> FakeSpreadsheet:
+        return self._sh
+
+
+class FakeDriveFile:
+    """Conteúdo (bytes) do YAML de usuários + metadados mínimos."""
+
+    def __init__(self, data: bytes = b""):
+        self.data = data
+        self.version = 1
+
+    def download(self) -> bytes:
+        return self.data
+
+    def upload(self, data: bytes):
+        from datetime import datetime, timezone
+        self.data = data
+        self.version += 1
+        self.modified = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+    def metadata(self) -> dict:
+        return {"id": "fake", "size": str(len(self.data)), "version": str(self.version),
+                "modifiedTime": getattr(self, "modified", None)}
+
+
+def install_secrets(extra: dict | None = None, workdir: str | None = None) -> str:
+    """
+    Aponta o st.secrets para um secrets.toml temporário (chave Fernet nova),
+    para que os módulos do app possam ser importados fora do Streamlit.
+    `extra` = {seção: {chave: valor}} (ex.: {"storage": {"backend": "local"}}).
+    Caches e históricos persistentes (geocache, KPIs, snapshots, backups)
+    vão para `workdir` (padrão: diretório temporário novo), nunca para os
+    arquivos padrão do app.
+    """
+    from cryptography.fernet import Fernet
+    from streamlit import config
+
+    state = workdir or tempfile.mkdtemp(prefix="bench_state_")
+    sections = {
+        "app": {"fernet_key": Fernet.generate_key().decode(), "cache_ttl_seconds": 300,
+                "backup_state_dir": os.path.join(state, "backups")},
+        "geo": {"cache_file": os.path.join(state, "geocache.json")},
+        "kpi": {"store_file": os.path.join(state, "kpis.csv")},
+        "snapshots": {"dir": os.path.join(state, "snapshots")},
+    }
+    for name, values in (extra or {}).items():
+        sections.setdefault(name, {}).update(values)
+    lines = []
+    for name, values in sections.items():
+        lines.append(f"[{name}]")
+        lines += [f'{k} = "{v}"' if isinstance(v, str) else f"{k} = {v}" for k, v in values.items()]
+    fd, path = tempfile.mkstemp(suffix=".toml", prefix="bench_secrets_")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    config.set_option("secrets.files", [path])
+    return path
+
+
+def quiet_streamlit():
+    """Silencia os avisos de 'bare mode' do Streamlit fora do `streamlit run`."""
+    from streamlit.logger import set_log_level
+    set_log_level("error")
+
+
+def patch_sheets(spreadsheet: FakeSpreadsheet):
+    """Faz data._open_sheet devolver a planilha fake (para qualquer fonte)."""
+    import data
+    data._open_sheet = lambda source=None: spreadsheet
+
+
+def patch_drive(drive_file: FakeDriveFile):
+    """Troca o I/O do Drive em yaml_store pelo arquivo fake."""
+    import yaml_store
+    yaml_store._download_raw = drive_file.download
+
+    def _upload(data: bytes):
+        drive_file.upload(data)
+        yaml_store._DOC_META.clear()
+        yaml_store._DOC_META.update(drive_file.metadata())
+
+    yaml_store._upload_raw = _upload
+    yaml_store.users_doc_metadata = lambda refresh=False: drive_file.metadata()
+    import sys
+    if "db" in sys.modules:  # db importa o nome diretamente
+        sys.modules["db"].users_doc_metadata = yaml_store.users_doc_metadata
@@ -0,0 +1,258 @@
+# bench/load_test.py
+"""
+Teste de carga: N sessões simultâneas contra os backends locais
+(storage.py), sem Google/rede:
+
+    python -m bench.load_test --sessions 20 --iterations 5
+    python -m bench.load_test --sessions 8 --mode apptest
+
+Modo `sim` (padrão): cada sessão é uma thread que repete o roteiro de um
+usuário chamando as mesmas funções que as páginas chamam — login (bcrypt +
+record_login), filtros do Dashboard, busca no Dados Brutos e uma edição no
+Admin. Modo `apptest`: cada sessão roda o app.py inteiro no AppTest do
+Streamlit, página por página (mais fiel, bem mais lento).
+
+Relata vazão, latência p50/p95/p99 por etapa e escritas perdidas: ao final
+o arquivo de usuários é relido do disco e comparado com o que cada sessão
+gravou (último nome salvo e quantidade de logins registrados).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from bench import fakes, synth
+
+_SEARCH_TERMS = ["consola", "paulista", "kits", "saúde", "ana", "vila", "concluída", "rua"]
+_PASSWORD = "carga-123"
+
+
+# ---------------------------------------------------------------------
+# Preparação do ambiente local
+# ---------------------------------------------------------------------
+def setup(workdir: str, size: str, n_users: int, bcrypt_rounds: int) -> List[str]:
+    """Gera as abas sintéticas, aponta os secrets para elas e cria os usuários."""
+    from storage import write_sheet_folder
+
+    sheets_dir = os.path.join(workdir, "sheets")
+    users_file = os.path.join(workdir, "users.enc")
+    write_sheet_folder(synth.generate(synth.SIZES[size]), sheets_dir, "parquet")
+    fakes.install_secrets({"storage": {"backend": "local", "sheets_dir": sheets_dir, "users_file": users_file}},
+                          workdir=workdir)
+
+    import base64
+    import bcrypt
+    import db
+    from yaml_store import upload_users_doc
+
+    h = base64.b64encode(bcrypt.hashpw(_PASSWORD.encode(), bcrypt.gensalt(bcrypt_rounds))).decode()
+    emails = [f"carga{i:04d}@cuidasp.test" for i in range(n_users)]
+    users = [{"id": i + 1, "nome": f"Carga {i}", "email": e, "hash_senha": h,
+              "papel": "Admin", "ativo": 1, "last_login": None} for i, e in enumerate(emails)]
+    upload_users_doc({"users": users, "metrics": {"monthly_accesses": {}}})
+    db._LOADED = False  # força recarga a partir do arquivo recém-criado
+    return emails
+
+
+# ---------------------------------------------------------------------
+# Roteiro de uma sessão (modo sim)
+# ---------------------------------------------------------------------
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def step(self, name: str, fn):
+        t0 = time.perf_counter()
+        try:
+            return fn()
+        except Exception:
+            with self._lock:
+                self.errors[name] += 1
+        finally:
+            dt = time.perf_counter() - t0
+            with self._lock:
+                self.samples[name].append(dt)
+
+
+def _login(email: str):
+    import bcrypt
+    from db import get_user_by_email, record_login
+    user = get_user_by_email(email)
+    if not user or not bcrypt.checkpw(_PASSWORD.encode(), user["hash_senha"]):
+        raise RuntimeError("login falhou")
+    record_login(email)
+    return True
+
+
+def _dashboard(rng: random.Random):
+    import analytics
+    import data
+    import ui
+    tables = data.read_all_tables()
+    acoes, end = tables["acoes"], tables["enderecos"]
+    version = data.snapshot_version(tables)
+    # mesmos nomes canônicos que os filtros esperam ("Frente de Atuação" -> "Frente de Atuacao")
+    base = acoes.copy()
+    ui._normalize_columns(base)
+    frentes = sorted(base["Frente de Atuacao"].dropna().unique()) if "Frente de Atuacao" in base else []
+    filt = {"frentes": rng.sample(frentes, k=min(2, len(frentes))), "search_query": rng.choice(_SEARCH_TERMS)}
+    df = ui._apply_filters(base, end, filt)
+    bridge, _ = analytics.volunteer_bridge(acoes, tables["voluntarios"], version)
+    analytics.unique_volunteers(bridge, df.index)
+
+
+def _dados_brutos(rng: random.Random):
+    import analytics
+    import data
+    from textnorm import search_mask
+    tables = data.read_all_tables()
+    key = rng.choice(list(tables))
+    df = tables[key]
+    analytics.column_profile(df, key)
+    return df[search_mask(df, rng.choice(_SEARCH_TERMS))]  # mesma busca livre de ui._filter_dataframe
+
+
+def _admin_edit(email: str, marker: str):
+    from db import list_users, update_user
+    u = next(u for u in list_users() if u["email"] == email)
+    update_user(u["id"], marker, u["email"], u["papel"], u["ativo"])
+    return True
+
+
+def run_sim(emails: List[str], iterations: int, seed: int) -> dict:
+    rec = Recorder()
+    expected_logins: Dict[str, int] = defaultdict(int)
+    expected_name: Dict[str, str] = {}
+
+    def session(i: int):
+        rng = random.Random(seed + i)
+        email = emails[i]
+        for k in range(iterations):
+            if rec.step("login", lambda: _login(email)):
+                expected_logins[email] += 1
+            rec.step("dashboard", lambda: _dashboard(rng))
+            rec.step("dados_brutos", lambda: _dados_brutos(rng))
+            marker = f"Carga {i} #{k}"
+            if rec.step("admin_edit", lambda: _admin_edit(email, marker)):
+                expected_name[email] = marker
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(emails)) as pool:
+        list(pool.map(session, range(len(emails))))
+    wall = time.perf_counter() - t0
+    return {"wall_s": wall, "rec": rec, "lost": lost_writes(expected_logins, expected_name)}
+
+
+def lost_writes(expected_logins: Dict[str, int], expected_name: Dict[str, str]) -> dict:
+    """Relê o arquivo de usuários e conta o que as sessões gravaram e sumiu."""
+    from yaml_store import download_users_doc
+    doc = download_users_doc()
+    by_email = {u["email"]: u for u in doc.get("users", [])}
+    logged = defaultdict(int)
+    for row in doc.get("access_logs", []) or []:
+        logged[row.get("email")] += 1
+    names = sum(1 for e, n in expected_name.items() if by_email.get(e, {}).get("nome") != n)
+    logins = sum(max(0, n - logged.get(e, 0)) for e, n in expected_logins.items())
+    return {"admin_edits": names, "access_logs": logins,
+            "expected_access_logs": sum(expected_logins.values())}
+
+
+# ---------------------------------------------------------------------
+# Modo AppTest (script inteiro por sessão)
+# ---------------------------------------------------------------------
+def run_apptest(emails: List[str], iterations: int, pages: List[str]) -> dict:
+    from streamlit.testing.v1 import AppTest
+    import streamlit as st
+
+    rec = Recorder()
+    app_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+    secrets = {k: dict(v) for k, v in st.secrets.items()}
+
+    def session(i: int):
+        at = AppTest.from_file(app_path, default_timeout=300)
+        for k, v in secrets.items():
+            at.secrets[k] = v
+        at.session_state["auth_user"] = {"email": emails[i], "nome": f"Carga {i}", "papel": "admin"}
+        for _ in range(iterations):
+            for page in pages:
+                at.session_state["nav_current"] = page
+
+                def _run():
+                    at.run()
+                    if at.exception:
+                        raise RuntimeError(at.exception[0].value)
+                rec.step(f"page:{page}", _run)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(emails)) as pool:
+        list(pool.map(session, range(len(emails))))
+    return {"wall_s": time.perf_counter() - t0, "rec": rec, "lost": None}
+
+
+# ---------------------------------------------------------------------
+# Relatório
+# ---------------------------------------------------------------------
+def _pct(vals: List[float], q: float) -> float:
+    s = sorted(vals)
+    return s[min(len(s) - 1, int(round(q * (len(s) - 1))))] if s else 0.0
+
+
+def report(result: dict, sessions: int):
+    rec, wall = result["rec"], result["wall_s"]
+    total_ops = sum(len(v) for v in rec.samples.values())
+    print(f"\n{sessions} sessões • {total_ops} operações em {wall:.1f}s "
+          f"• {total_ops / wall:.1f} ops/s")
+    print(f"   {'etapa':<22}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'máx ms':>10}{'erros':>7}")
+    for name, vals in sorted(rec.samples.items()):
+        print(f"   {name:<22}{len(vals):>6}{_pct(vals, .5) * 1000:>10.1f}{_pct(vals, .95) * 1000:>10.1f}"
+              f"{_pct(vals, .99) * 1000:>10.1f}{max(vals) * 1000:>10.1f}{rec.errors.get(name, 0):>7}")
+    lost = result.get("lost")
+    if lost is not None:
+        print(f"\nEscritas perdidas: {lost['admin_edits']} edições de usuário, "
+              f"{lost['access_logs']} de {lost['expected_access_logs']} logins em access_logs")
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Teste de carga com sessões simultâneas (offline)")
+    p.add_argument("--sessions", type=int, default=10)
+    p.add_argument("--iterations", type=int, default=3)
+    p.add_argument("--size", default="1k", choices=list(synth.SIZES))
+    p.add_argument("--mode", default="sim", choices=["sim", "apptest"])
+    p.add_argument("--pages", default="Dashboard,Doações,Dados Brutos,Admin")
+    p.add_argument("--bcrypt-rounds", type=int, default=12)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--workdir", help="pasta para as abas/usuários (padrão: temporária)")
+    p.add_argument("--fail-on-lost", action="store_true", help="sai com código 1 se houver escrita perdida")
+    args = p.parse_args(argv)
+
+    fakes.quiet_streamlit()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="cuida_load_")
+    emails = setup(workdir, args.size, args.sessions, args.bcrypt_rounds)
+    fakes.quiet_streamlit()  # de novo: os loggers dos módulos do app nascem no setup
+    print(f"Ambiente local em {workdir} ({args.size}, {args.sessions} usuários)", flush=True)
+
+    if args.mode == "apptest":
+        pages = [s.strip() for s in args.pages.split(",") if s.strip()]
+        result = run_apptest(emails, args.iterations, pages)
+    else:
+        result = run_sim(emails, args.iterations, args.seed)
+    report(result, args.sessions)
+
+    lost = result.get("lost") or {}
+    if args.fail_on_lost and (lost.get("admin_edits") or lost.get("access_logs")):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+# bench/roundtrip.py
+"""
+Verificações de ida e volta dos formatos gravados pelo app (sem Google/rede):
+
+    python -m bench.roundtrip
+
+Sai com código 1 se alguma verificação falhar — use no CI junto com o
+benchmark.
+"""
+from __future__ import annotations
+
+import io
+import json
+import sys
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+
+def _frame_with_nulls() -> pd.DataFrame:
+    return pd.DataFrame({
+        "Nome": ["Ana", None, "Caio", "Caio"],
+        "Valor": ["R$ 10,00", np.nan, "", ""],
+        "Obs": [None, "x", np.nan, np.nan],
+    })
+
+
+def check_parquet_nulls():
+    from export import pq, write_parquet
+    if pq is None:
+        return "pyarrow ausente: ignorado"
+    df = _frame_with_nulls()
+    buf = io.BytesIO()
+    write_parquet(df, buf, chunk_rows=2)  # mais de um row group
+    buf.seek(0)
+    back = pd.read_parquet(buf)
+    assert back.shape == df.shape, back.shape
+    assert back.isna().equals(df.isna()), "nulos não preservados"
+    assert not back.isin(["None", "nan"]).any().any(), "nulo gravado como texto"
+    assert back.fillna("").equals(df.fillna("")), "valores divergentes"
+
+
+def check_snapshots_as_of():
+    import tempfile
+    from datetime import datetime, timedelta, timezone
+    from snapshots import SnapshotStore
+
+    t0 = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+    v1 = {"acoes": _frame_with_nulls()}
+    v2 = {"acoes": pd.concat([v1["acoes"].iloc[1:], v1["acoes"].iloc[[3]]], ignore_index=True)}
+    v3 = {"acoes": v2["acoes"].iloc[:-1]}  # remove uma das duplicatas
+    with tempfile.TemporaryDirectory() as d:
+        # duas instâncias no mesmo diretório = app + cron em processos distintos
+        a, b = SnapshotStore(d, checkpoint_every=10), SnapshotStore(d, checkpoint_every=10)
+        assert a.record(v1, "1", when=t0) == 1
+        assert b.record(v2, "2", when=t0 + timedelta(days=1)) == 2
+        assert a.record(v3, "3", when=t0 + timedelta(days=2)) == 3
+        assert [e["kind"] for e in SnapshotStore(d).entries()] == ["full", "delta", "delta"]
+        for i, v in enumerate((v1, v2, v3)):
+            got = SnapshotStore(d).as_of(t0 + timedelta(days=i, hours=1))["acoes"]
+            want = v["acoes"]
+            assert got.isna().sum().sum() == want.isna().sum().sum(), f"nulos na versão {i + 1}"
+            key = lambda df: sorted(map(tuple, df.fillna("<nulo>").to_numpy().tolist()))
+            assert key(got) == key(want), f"linhas divergentes na versão {i + 1}"
+
+
+def check_backup_duplicates():
+    import tempfile
+    import zipfile
+    from backup import build_backup
+
+    df = _frame_with_nulls()  # linhas 2 e 3 idênticas
+    with tempfile.TemporaryDirectory() as d:
+        build_backup({"acoes": df}, incremental=True, state_dir=d)
+        for nxt, written, removed in ((df.iloc[:3], 0, 1), (df, 1, 0)):
+            with zipfile.ZipFile(build_backup({"acoes": nxt}, incremental=True, state_dir=d)) as zf:
+                t = json.loads(zf.read("manifest.json"))["tables"]["acoes"]
+            assert (t["written"], t["removed"]) == (written, removed), t
+
+
+def check_geocache_approx():
+    import os
+    import tempfile
+    from geocache import GeocodeCache
+
+    with tempfile.TemporaryDirectory() as d:
+        c = GeocodeCache(os.path.join(d, "geo.json"))
+        c.seed(["Rua Augusta", "Av. Paulista"], None, [1, 2], [1, 2], "gazetteer")
+        c.seed(["Rua Prof. Alfonso Bovero"], None, [3], [3], "dim")
+        lat, _ = c.lookup(pd.Series(["Rua A, 10", "Rua Augus", "Rua Alfonso Bovero, 5"]))
+        assert np.isnan(lat[:2]).all(), f"aproximou rua curta/parcial: {lat}"
+        assert lat[2] == 3, f"não aproximou pela Dim: {lat}"
+        c.save()
+        with open(c.path, encoding="utf-8") as f:
+            saved = json.load(f)["entries"]
+        assert "alfonso bovero" not in saved, "aproximado persistido"
+
+
+def check_kpi_novos_after_prune():
+    import os
+    import tempfile
+    from kpi_store import KpiStore
+
+    def acoes(rows):
+        return {"acoes": pd.DataFrame(rows, columns=["Data", "Voluntários envolvidos"])}
+
+    with tempfile.TemporaryDirectory() as d:
+        k = KpiStore(os.path.join(d, "kpis.csv"))
+        k.sync(acoes([("01/03/2026", "Ana, Bia"), ("02/03/2026", "Ana, Caio")]), "1")
+        # 01/03 saiu da planilha: Ana e Bia não são novas de novo
+        k.sync(acoes([("02/03/2026", "Ana, Caio"), ("03/03/2026", "Bia, Duda")]), "2")
+        novos = KpiStore(k.path).history()["voluntarios_novos"].tolist()
+        assert novos == [2, 1, 1], novos
+
+
+CHECKS: Dict[str, Callable[[], object]] = {
+    "parquet_nulls": check_parquet_nulls,
+    "backup_duplicates": check_backup_duplicates,
+    "snapshots_as_of": check_snapshots_as_of,
+    "geocache_approx": check_geocache_approx,
+    "kpi_novos_after_prune": check_kpi_novos_after_prune,
+}
+
+
+def main(argv=None) -> int:
+    failed = 0
+    for name, fn in CHECKS.items():
+        try:
+            note = fn()
+        except AssertionError as e:
+            failed += 1
+            print(f"FALHOU {name}: {e}")
+        else:
+            print(f"ok     {name}" + (f" ({note})" if note else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
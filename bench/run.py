@@ -0,0 +1,157 @@
+# bench/run.py
+"""
+Benchmark dos caminhos quentes do dashboard contra planilhas sintéticas,
+sem Google/rede:
+
+    python -m bench.run --sizes 1k,10k,100k
+    python -m bench.run --sizes 10k --json bench.json
+    python -m bench.run --sizes 10k --baseline bench.json --max-regression 0.25
+
+Mede tempo (mínimo/mediana de N repetições) e pico de memória (tracemalloc)
+por etapa. Com --baseline, sai com código 1 se alguma etapa ficar mais lenta
+que o limite — use no CI antes de publicar.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+from bench import fakes, synth
+
+
+def _measure(fn: Callable[[], object], repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"min_s": min(times), "median_s": statistics.median(times), "peak_mb": peak / 2**20}
+
+
+def _stages(sheet: fakes.FakeSpreadsheet) -> Dict[str, Callable[[], object]]:
+    import pandas as pd
+    import analytics
+    import data
+    import textnorm
+    import ui
+
+    fakes.patch_sheets(sheet)
+    data.clear_tables()
+    tables = data.read_all_tables()
+    acoes, end, volunt = tables["acoes"], tables["enderecos"], tables["voluntarios"]
+    acoes_dt = acoes.copy()
+    acoes_dt["Data"] = pd.to_datetime(acoes_dt["Data"], errors="coerce", dayfirst=True)
+    ws_acoes = sheet.worksheet("Ações")
+
+    def _read_all():
+        data.clear_tables()
+        return data.read_all_tables()
+
+    def _bridge():
+        analytics.volunteer_bridge.clear()
+        return analytics.volunteer_bridge(acoes, volunt, "bench")
+
+    def _cube():
+        analytics.donations_cube.clear()
+        return analytics.donations_cube(tables["doacoes"], "bench")
+
+    return {
+        "read_ws[Ações]": lambda: data._read_ws(ws_acoes),
+        "read_all_tables": _read_all,
+        "resolve_coords_for_acoes": lambda: ui._resolve_coords_for_acoes(acoes, end),
+        "norm_series[Endereço]": lambda: textnorm.norm_series(acoes["Endereço"]),
+        "hours": lambda: ui._calculate_hours(acoes_dt),
+        "search_filter": lambda: ui._apply_filters(acoes, end, {"search_query": "consola"}),
+        "volunteer_bridge": _bridge,
+        "donations_cube": _cube,
+    }
+
+
+def run(sizes, repeat: int = 3, only=None) -> dict:
+    results: dict = {}
+    for label in sizes:
+        n = synth.SIZES[label]
+        print(f"\n== {label} ({n:,} ações) ==", flush=True)
+        t0 = time.perf_counter()
+        sheet = fakes.FakeSpreadsheet(synth.generate(n))
+        print(f"   dados sintéticos gerados em {time.perf_counter() - t0:.1f}s", flush=True)
+        results[label] = {}
+        for name, fn in _stages(sheet).items():
+            if only and name not in only:
+                continue
+            r = _measure(fn, repeat)
+            results[label][name] = r
+            print(f"   {name:<28} min {r['min_s'] * 1000:10.1f} ms   "
+                  f"mediana {r['median_s'] * 1000:10.1f} ms   pico {r['peak_mb']:8.1f} MB", flush=True)
+    return results
+
+
+def compare(results: dict, baseline: dict, max_regression: float, min_delta_s: float = 0.005) -> list:
+    """
+    Etapas cujo tempo mínimo piorou mais que `max_regression` (fração) e mais
+    que `min_delta_s` em absoluto (ignora ruído em etapas de poucos ms).
+    """
+    regressions = []
+    for size, stages in results.items():
+        for name, r in stages.items():
+            base = baseline.get(size, {}).get(name)
+            if not base:
+                continue
+            ratio = r["min_s"] / base["min_s"] if base["min_s"] else 1.0
+            if ratio > 1 + max_regression and r["min_s"] - base["min_s"] > min_delta_s:
+                regressions.append((size, name, base["min_s"], r["min_s"], ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Benchmark do pipeline do dashboard (offline)")
+    p.add_argument("--sizes", default="1k,10k", help=f"tamanhos: {','.join(synth.SIZES)}")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--only", default="", help="lista de etapas separadas por vírgula")
+    p.add_argument("--json", dest="json_out", help="grava os resultados neste arquivo")
+    p.add_argument("--baseline", help="resultados anteriores (JSON) para comparação")
+    p.add_argument("--max-regression", type=float, default=0.25)
+    p.add_argument("--min-delta-ms", type=float, default=5.0)
+    args = p.parse_args(argv)
+
+    fakes.install_secrets()
+    fakes.quiet_streamlit()
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in synth.SIZES]
+    if unknown:
+        p.error(f"tamanhos desconhecidos: {', '.join(unknown)}")
+    only = {s.strip() for s in args.only.split(",") if s.strip()} or None
+
+    results = run(sizes, args.repeat, only)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regs = compare(results, baseline, args.max_regression, args.min_delta_ms / 1000)
+        if regs:
+            print("\nREGRESSÕES:")
+            for size, name, old, new, ratio in regs:
+                print(f"   [{size}] {name}: {old * 1000:.1f} ms -> {new * 1000:.1f} ms ({ratio:.2f}x)")
+            return 1
+        print("\nSem regressões acima do limite.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
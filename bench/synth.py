@@ -0,0 +1,193 @@
+# bench/synth.py
+"""
+Gerador de dados sintéticos no formato do Google Sheets (lista de listas de
+strings, 1ª linha = cabeçalho) para Voluntários, Ações, Doações e
+Dim_enderecos, com endereços pt-BR e os formatos de coordenada que aparecem
+nas planilhas reais (vírgula decimal, ponto de milhar, micrograus).
+
+Também popula o backend local (ver storage.py):
+
+    python -m bench.synth --size 10k --out local_data/sheets [--format parquet]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+_LOGRADOUROS = ["Rua", "R.", "Avenida", "Av.", "Alameda", "Travessa", "Praça", "Estrada"]
+_NOMES_RUA = [
+    "Augusta", "da Consolação", "Vergueiro", "Paulista", "dos Santos", "Brigadeiro Luís Antônio",
+    "Domingos de Morais", "Teodoro Sampaio", "Cardeal Arcoverde", "Rebouças", "Ipiranga",
+    "São João", "Tiradentes", "Celso Garcia", "do Estado", "Sapopemba", "Inajar de Souza",
+    "Sumaré", "Pompéia", "Heitor Penteado", "Jabaquara", "Santo Amaro", "Washington Luís",
+    "Interlagos", "Nossa Senhora do Sabará", "Guarapiranga", "M'Boi Mirim", "Aricanduva",
+]
+_BAIRROS = [
+    "Bela Vista", "Consolação", "Vila Mariana", "Pinheiros", "Santa Cecília", "Mooca", "Brás",
+    "Tatuapé", "Itaquera", "Capão Redondo", "Grajaú", "Jabaquara", "Santana", "Lapa", "Penha",
+]
+_PRIMEIROS = ["Ana", "Beatriz", "Carlos", "Daniel", "Eduarda", "Felipe", "Gabriela", "Helena",
+              "Igor", "João", "Karina", "Lucas", "Mariana", "Nicolas", "Otávio", "Paula", "Rafael",
+              "Sofia", "Thiago", "Vitória"]
+_SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Ferreira", "Costa",
+               "Rodrigues", "Almeida", "Nascimento", "Araújo", "Gonçalves", "Ribeiro"]
+_FRENTES = ["Kits de Higiene", "Educação", "Saúde", "Alimentação", "Moradia", "Cultura"]
+_STATUS = ["Concluída", "Ativa", "Suspensa"]
+_FORMAS = ["Pix", "Transferência", "Dinheiro", "Bens", "Outro"]
+_TIPOS = ["Pessoa Física", "Pessoa Jurídica"]
+
+# caixa aproximada da Grande São Paulo
+_LAT = (-23.80, -23.40)
+_LON = (-46.85, -46.35)
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+
+
+def _fmt_coord(v: float, style: int) -> str:
+    """Formatos vistos nas planilhas: '-23.5505', '-23,5505', '-235.505.199', '-23550519'."""
+    if style == 0:
+        return f"{v:.6f}"
+    if style == 1:
+        return f"{v:.6f}".replace(".", ",")
+    if style == 2:
+        digits = f"{abs(round(v * 1e7)):d}"
+        groups = []
+        while digits:
+            groups.insert(0, digits[-3:])
+            digits = digits[:-3]
+        return ("-" if v < 0 else "") + ".".join(groups)
+    return f"{round(v * 1e6):d}"
+
+
+def _coords(rng, n: int):
+    lat = rng.uniform(*_LAT, n)
+    lon = rng.uniform(*_LON, n)
+    styles = rng.choice(4, n, p=[0.55, 0.30, 0.10, 0.05]).tolist()
+    return ([_fmt_coord(a, s) for a, s in zip(lat.tolist(), styles)],
+            [_fmt_coord(b, s) for b, s in zip(lon.tolist(), styles)])
+
+
+def _ruas(rng, n: int) -> List[str]:
+    tipos = rng.choice(_LOGRADOUROS, n).tolist()
+    nomes = rng.choice(_NOMES_RUA, n).tolist()
+    return [f"{t} {nm}" for t, nm in zip(tipos, nomes)]
+
+
+def _nomes(rng, n: int) -> List[str]:
+    return [f"{a} {b}" for a, b in zip(rng.choice(_PRIMEIROS, n).tolist(), rng.choice(_SOBRENOMES, n).tolist())]
+
+
+def _datas(rng, n: int) -> List[str]:
+    base = np.datetime64("2021-01-01")
+    dias = rng.integers(0, 365 * 5, n)
+    return np.datetime_as_string(base + dias, unit="D").tolist()
+
+
+def _br_date(iso: str) -> str:
+    y, m, d = iso.split("-")
+    return f"{d}/{m}/{y}"
+
+
+def enderecos(rng, n: int) -> List[List[str]]:
+    lat, lon = _coords(rng, n)
+    ruas = _ruas(rng, n)
+    rows = [["Rua", "Número", "Bairro", "Cidade", "UF", "CEP", "Latitude", "Longitude"]]
+    nums = rng.integers(1, 4000, n).tolist()
+    bairros = rng.choice(_BAIRROS, n).tolist()
+    ceps = rng.integers(1000000, 9999999, n).tolist()
+    for i in range(n):
+        rows.append([ruas[i], str(nums[i]), bairros[i], "São Paulo", "SP",
+                     f"0{ceps[i] // 1000:04d}-{ceps[i] % 1000:03d}", lat[i], lon[i]])
+    return rows
+
+
+def voluntarios(rng, n: int) -> List[List[str]]:
+    lat, lon = _coords(rng, n)
+    nomes = _nomes(rng, n)
+    generos = rng.choice(["Feminino", "Masculino", "Outro", ""], n, p=[0.6, 0.35, 0.03, 0.02]).tolist()
+    posicoes = rng.choice(["Voluntário", "Coordenador"], n, p=[0.92, 0.08]).tolist()
+    ruas = _ruas(rng, n)
+    nums = rng.integers(1, 4000, n).tolist()
+    tel = rng.integers(1000, 9999, (n, 2)).tolist()
+    rows = [["Nome", "E-mail", "Telefone", "Gênero", "Posição", "Endereço", "Cidade", "UF",
+             "Latitude", "Longitude"]]
+    for i in range(n):
+        email = nomes[i].lower().replace(" ", ".") + f"{i}@exemplo.com"
+        rows.append([nomes[i], email, f"(11) 9{tel[i][0]}-{tel[i][1]}",
+                     generos[i], posicoes[i], f"{ruas[i]}, {nums[i]}", "São Paulo", "SP", lat[i], lon[i]])
+    return rows
+
+
+def acoes(rng, n: int, ruas_dim: List[str], nomes_vol: List[str]) -> List[List[str]]:
+    datas = _datas(rng, n)
+    ini = rng.integers(7, 18, n).tolist()
+    dur = rng.integers(1, 6, n).tolist()
+    frentes = rng.choice(_FRENTES, n).tolist()
+    status = rng.choice(_STATUS, n, p=[0.7, 0.25, 0.05]).tolist()
+    ruas = rng.choice(ruas_dim, n).tolist()
+    nums = rng.integers(1, 4000, n).tolist()
+    pessoas = rng.integers(0, 300, n).tolist()
+    k = rng.integers(1, 6, n).tolist()
+    idx = rng.integers(0, len(nomes_vol), (n, 5)).tolist()
+    rows = [["Data", "Frente de Atuação", "Status", "Endereço", "Horário de início",
+             "Horário de término", "Pessoas impactadas", "Voluntários envolvidos"]]
+    for i in range(n):
+        envolvidos = ", ".join(nomes_vol[j] for j in idx[i][:k[i]])
+        rows.append([_br_date(datas[i]), frentes[i], status[i], f"{ruas[i]}, {nums[i]}",
+                     f"{ini[i]:02d}:00", f"{(ini[i] + dur[i]) % 24:02d}:30", str(pessoas[i]), envolvidos])
+    return rows
+
+
+def doacoes(rng, n: int) -> List[List[str]]:
+    datas = _datas(rng, n)
+    valores = rng.lognormal(4.5, 1.2, n).tolist()
+    formas = rng.choice(_FORMAS, n).tolist()
+    tipos = rng.choice(_TIPOS, n, p=[0.85, 0.15]).tolist()
+    rec = rng.choice(["Sim", "Não"], n, p=[0.3, 0.7]).tolist()
+    nomes = _nomes(rng, n)
+    rows = [["Data", "Doador", "Tipo de doador", "Forma de doação", "Valor", "Recorrente"]]
+    for i in range(n):
+        valor = "R$ " + f"{valores[i]:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        rows.append([_br_date(datas[i]), nomes[i], tipos[i], formas[i], valor, rec[i]])
+    return rows
+
+
+def generate(n: int, seed: int = 42) -> Dict[str, List[List[str]]]:
+    """
+    Planilha sintética com `n` Ações; Voluntários, Doações e Dim_enderecos
+    escalam proporcionalmente. Chaves = nomes padrão das abas.
+    """
+    rng = np.random.default_rng(seed)
+    n_end = max(50, n // 20)
+    n_vol = max(20, n // 5)
+    dim = enderecos(rng, n_end)
+    vol = voluntarios(rng, n_vol)
+    ruas_dim = [r[0] for r in dim[1:]]
+    nomes_vol = [r[0] for r in vol[1:]]
+    return {
+        "Voluntários": vol,
+        "Ações": acoes(rng, n, ruas_dim, nomes_vol),
+        "Doações": doacoes(rng, max(10, n // 2)),
+        "Dim_enderecos": dim,
+    }
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Gera planilhas sintéticas numa pasta (backend local)")
+    p.add_argument("--size", default="1k", choices=list(SIZES))
+    p.add_argument("--out", default="local_data/sheets")
+    p.add_argument("--format", default="csv", choices=["csv", "parquet"])
+    p.add_argument("--seed", type=int, default=42)
+    args = p.parse_args(argv)
+
+    from storage import write_sheet_folder
+    write_sheet_folder(generate(SIZES[args.size], args.seed), args.out, args.format)
+    print(f"Abas gravadas em {args.out} ({args.size}, {args.format})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
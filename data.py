@@ -1,10 +1,22 @@
 # data.py
+import hashlib
+import logging
+import threading
+import time
 import streamlit as st
 import gspread
 import pandas as pd
-import unicodedata
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from perf import timed, instrument
+from schema import resolve_all
+from storage import LocalSpreadsheet, local_spreadsheet
+from textnorm import norm
 from google.oauth2.service_account import Credentials
 
+_log = logging.getLogger("cuida_sp.data")
+
 SCOPES = [
     "https://www.googleapis.com/auth/spreadsheets.readonly",
     "https://www.googleapis.com/auth/drive.readonly",
@@ -15,72 +27,403 @@ def _gc():
     creds = Credentials.from_service_account_info(info, scopes=SCOPES)
     return gspread.authorize(creds)
 
-def _open_sheet():
-    ss_id = st.secrets.get("sheets", {}).get("spreadsheet_id")
-    ss_name = st.secrets.get("sheets", {}).get("spreadsheet_name", "Cuida SP - Database")
+def _open_sheet(source: Optional[dict] = None):
+    source = source or {}
+    if source.get("sheets_dir"):  # fonte regional em pasta local
+        return LocalSpreadsheet(source["sheets_dir"], source.get("name") or "Cuida SP - Database")
+    local = local_spreadsheet(st.secrets)  # [storage] backend = "local"
+    if local is not None:
+        return local
+    cfg = st.secrets.get("sheets", {})
+    ss_id = source.get("spreadsheet_id", cfg.get("spreadsheet_id"))
+    ss_name = source.get("spreadsheet_name", cfg.get("spreadsheet_name", "Cuida SP - Database"))
     gc = _gc()
     return gc.open_by_key(ss_id) if ss_id else gc.open(ss_name)
 
-def _norm(s: str) -> str:
-    # minúsculas, sem acentos, trim e remove duplos espaços
-    s0 = unicodedata.normalize("NFKD", s).encode("ASCII", "ignore").decode("ASCII")
-    return " ".join(s0.lower().strip().split())
-
 def _resolve_ws(sh, desired: str):
     """Tenta achar a worksheet pelo nome exato e depois por nome normalizado (sem acento)."""
     try:
         return sh.worksheet(desired)
     except Exception:
-        want = _norm(desired)
+        want = norm(desired)
         for ws in sh.worksheets():
-            if _norm(ws.title) == want:
+            if norm(ws.title) == want:
                 return ws
         raise  # deixa a exceção original subir se não acharmos nada
 
-def _read_ws(ws) -> pd.DataFrame:
-    # tenta com a 1ª linha como header
-    vals = ws.get_all_values()
-    if not vals:
-        return pd.DataFrame()
+def _chunk_rows() -> int:
+    """Linhas por requisição ao ler abas grandes (secrets: sheets.chunk_rows)."""
+    return int(st.secrets.get("sheets", {}).get("chunk_rows", 5000))
+
+
+def _row_blocks(ws, chunk_rows: int) -> Iterator[List[List[str]]]:
+    """
+    Linhas da aba em blocos de até `chunk_rows`, por faixas A1 ("1:5000",
+    "5001:10000", ...). Abas pequenas (ou sem `get`) saem num bloco só.
+    """
+    total = getattr(ws, "row_count", None)
+    if not hasattr(ws, "get") or (total is not None and total <= chunk_rows):
+        yield ws.get_all_values()
+        return
+    start, pending = 1, 0
+    while total is None or start <= total:
+        end = start + chunk_rows - 1 if total is None else min(start + chunk_rows - 1, total)
+        with timed("sheets.read_chunk"):
+            block = list(ws.get(f"{start}:{end}", pad_values=True))
+        want, start = end - start + 1, end + 1
+        if not block:
+            if total is None:
+                return
+            pending += want
+            continue
+        if pending:  # linhas em branco no meio da aba: o Sheets corta as do fim de cada faixa
+            yield [[] for _ in range(pending)]
+        yield block
+        pending = want - len(block)
+
+
+def _header_index(rows: List[List[str]]) -> int:
     # se primeira linha tem pelo menos 2 colunas não vazias, consideramos header
-    header = vals[0]
-    if sum(1 for h in header if h and h.strip()) >= 2:
-        df = pd.DataFrame(vals[1:], columns=header)
-    else:
-        # procurar primeira linha com mais colunas preenchidas e usá-la como header
-        best_i, best_nonempty = 0, 0
-        for i, row in enumerate(vals[:10]):  # olha as 10 primeiras
-            cnt = sum(1 for c in row if c and c.strip())
-            if cnt > best_nonempty:
-                best_nonempty = cnt
-                best_i = i
-        header = vals[best_i]
-        df = pd.DataFrame(vals[best_i+1:], columns=header)
-    # remove colunas completamente vazias
-    df = df.loc[:, [c for c in df.columns if c and str(c).strip()]]
+    if sum(1 for h in rows[0] if h and h.strip()) >= 2:
+        return 0
+    # procurar primeira linha com mais colunas preenchidas e usá-la como header
+    best_i, best_nonempty = 0, 0
+    for i, row in enumerate(rows[:10]):  # olha as 10 primeiras
+        cnt = sum(1 for c in row if c and c.strip())
+        if cnt > best_nonempty:
+            best_nonempty = cnt
+            best_i = i
+    return best_i
+
+
+def _frame(body: List[List[str]], header: List[str], keep: List[int]) -> pd.DataFrame:
+    width = len(header)
+    if any(len(r) != width for r in body):  # faixas vêm com a largura da própria faixa
+        body = [r[:width] + [""] * (width - len(r)) for r in body]
+    df = pd.DataFrame(body, columns=range(width))
+    if len(keep) != width:
+        df = df.iloc[:, keep]
+    df.columns = [header[i] for i in keep]
     return df
 
-@st.cache_data(ttl=st.secrets.get("app", {}).get("cache_ttl_seconds", 300), show_spinner=True)
-def read_all_tables():
-    sh = _open_sheet()
+
+def iter_ws_chunks(ws, chunk_rows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Lê a aba em faixas de linhas e devolve um DataFrame por faixa, com o
+    cabeçalho detectado só na primeira. A memória de pico fica em uma faixa
+    de texto cru (e não na aba inteira) e quem consome pode exibir parciais.
+    """
+    header = keep = None
+    for block in _row_blocks(ws, chunk_rows or _chunk_rows()):
+        if header is None:
+            if not any(block):
+                continue
+            hi = _header_index(block)
+            header = [str(h) for h in block[hi]]
+            # remove colunas completamente vazias (sem nome)
+            keep = [i for i, h in enumerate(header) if h and h.strip()]
+            yield _frame(block[hi + 1:], header, keep)  # mesmo vazia: leva as colunas
+        elif block:
+            yield _frame(block, header, keep)
+
+
+def _read_ws(ws) -> pd.DataFrame:
+    frames = list(iter_ws_chunks(ws))
+    if not frames:
+        return pd.DataFrame()
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+# ---------------------------------------------------------------------
+# Fontes: uma planilha (padrão) ou várias planilhas regionais federadas
+# ---------------------------------------------------------------------
+SOURCE_COL = "Fonte"        # coluna com o nome da fonte quando há mais de uma
+MAX_PARALLEL_SOURCES = 8
+_FAILED_SOURCE_TTL = 60     # fonte regional com erro: tenta de novo após 1 min
+
+
+def _default_ttl() -> float:
+    return float(st.secrets.get("app", {}).get("cache_ttl_seconds", 300))
+
+
+def _sources() -> List[dict]:
+    """
+    Planilhas lidas por read_all_tables. Sem `sources`, a planilha única de
+    [sheets]/[storage]. Várias planilhas regionais:
+
+        [[sheets.sources]]
+        name = "Zona Sul"
+        spreadsheet_id = "..."
+        ttl_seconds = 600                  # opcional (padrão: app.cache_ttl_seconds)
+
+        [[sheets.sources]]
+        name = "Zona Leste"
+        sheets_dir = "local_data/leste"    # pasta local, mesmo formato do backend local
+
+    Nomes das abas (vol_ws, acoes_ws, ...) vêm de [sheets] e podem ser
+    sobrescritos por fonte.
+    """
     cfg = st.secrets.get("sheets", {})
-    ws_map = {
+    raw = [dict(s) for s in (cfg.get("sources") or [])]
+    if not raw:
+        return [{"name": ""}]
+    for i, src in enumerate(raw):
+        src["name"] = str(src.get("name") or f"Fonte {i + 1}")
+    return raw
+
+
+def source_names() -> List[str]:
+    return [s["name"] for s in _sources() if s["name"]]
+
+
+def _ws_map(source: dict) -> Dict[str, str]:
+    cfg = {**st.secrets.get("sheets", {}), **source}
+    return {
         "voluntarios": cfg.get("vol_ws", "Voluntários"),
         "acoes": cfg.get("acoes_ws", "Ações"),
         "doacoes": cfg.get("doa_ws", "Doações"),
         "enderecos": cfg.get("dim_enderecos_ws", "Dim_enderecos"),
     }
+
+
+class _Table(NamedTuple):
+    df: pd.DataFrame
+    version: str                # muda só quando o conteúdo da aba muda
+    revision: Optional[str]     # revisão da planilha/arquivo quando foi lida
+    error: Optional[str]
+    digest: Optional[str] = None  # hash do conteúdo (cabeçalho + valores)
+
+
+class _SourceState:
+    """Abas em cache de uma fonte + quando foram conferidas pela última vez."""
+
+    def __init__(self, ttl: float):
+        self.tables: Dict[str, _Table] = {}
+        self.checked_at = 0.0   # time.monotonic() da última carga/verificação
+        self.ttl = ttl
+        self.stale: set = set()  # abas invalidadas explicitamente
+
+
+_SRC_LOCK = threading.Lock()
+_SRC_STATE: Dict[str, _SourceState] = {}
+_SRC_HANDLES: Dict[str, object] = {}           # planilha aberta (evita reabrir a cada verificação)
+_SRC_FLIGHT: Dict[str, threading.Lock] = {}    # uma carga por fonte de cada vez
+
+
+def _revision_reader(sh):
+    """
+    Revisão barata de uma aba, sem ler os dados: mtime do arquivo no backend
+    local (por aba) ou modifiedTime do Drive. No Drive a revisão é da
+    planilha inteira (uma chamada por verificação): editar uma aba faz todas
+    as abas vencidas serem relidas, e é o hash do conteúdo (_load_table)
+    que decide se a versão muda. None quando não há como saber: a aba é
+    sempre relida.
+    """
+    per_ws = getattr(sh, "revision", None)
+    if per_ws is not None:
+        return per_ws
+    drive = getattr(sh, "get_lastUpdateTime", None)
+    if drive is None:
+        return lambda title: None
+    memo = []
+
+    def _rev(title):
+        if not memo:
+            with timed("sheets.revision_check"):
+                memo.append(drive())
+        return memo[0]
+    return _rev
+
+
+def _content_digest(df: pd.DataFrame) -> str:
+    h = hashlib.sha1("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    if not df.empty:
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _load_table(sh, key: str, desired: str, revision: Optional[str],
+                old: Optional[_Table] = None) -> _Table:
+    """
+    Relê a aba. Se o conteúdo é igual ao de `old` (ex.: o Drive acusou
+    mudança em outra aba da planilha), devolve `old` com a revisão nova:
+    mesmo DataFrame e mesma versão, então os caches derivados seguem válidos.
+    """
+    try:
+        ws = _resolve_ws(sh, desired)
+        with timed(f"sheets.read_ws.{key}"):
+            df = _read_ws(ws)
+        err = None
+    except Exception as e:
+        # Log leve e dataframe vazio
+        _log.debug("[read_all_tables] Falha ao abrir '%s': %s", desired, e)
+        df, revision, err = pd.DataFrame(), None, str(e)
+    digest = _content_digest(df) if err is None else None
+    if old is not None and old.error is None and digest is not None and digest == old.digest:
+        return old._replace(revision=revision)
+    version = uuid.uuid4().hex[:12]
+    df.attrs["snapshot_version"] = version
+    return _Table(df, version, revision, err, digest)
+
+
+def _refresh_source(source: dict, state: _SourceState, keys) -> None:
+    name = source["name"]
+    with _SRC_LOCK:
+        sh = _SRC_HANDLES.get(name)
+    if sh is None:
+        sh = _open_sheet(source)
+        with _SRC_LOCK:
+            _SRC_HANDLES[name] = sh
+    rev_of = _revision_reader(sh)
+    ws_map = _ws_map(source)
+    with timed(f"sheets.read_source.{name or 'principal'}"):
+        for key in keys:
+            desired = ws_map[key]
+            old = state.tables.get(key)
+            rev = rev_of(desired)
+            if old is not None and old.error is None and rev is not None and rev == old.revision:
+                continue  # aba intacta: mantém DataFrame e versão (caches derivados seguem válidos)
+            state.tables[key] = _load_table(sh, key, desired, rev, old)
+
+
+def _get_source(source: dict, federated: bool) -> Dict[str, _Table]:
+    """
+    Abas da fonte. Dentro do TTL saem do cache; vencido o TTL (ou com abas
+    invalidadas), confere a revisão e relê só as abas cuja revisão andou;
+    a versão de uma aba relida só muda se o conteúdo mudou.
+    """
+    name = source["name"]
+    ws_map = _ws_map(source)
+    with _SRC_LOCK:
+        flight = _SRC_FLIGHT.setdefault(name, threading.Lock())
+        state = _SRC_STATE.get(name)
+        if state is None:
+            state = _SRC_STATE[name] = _SourceState(float(source.get("ttl_seconds", _default_ttl())))
+    with flight:
+        expired = time.monotonic() - state.checked_at >= state.ttl
+        keys = [k for k in ws_map if expired or k in state.stale or k not in state.tables]
+        if keys:
+            try:
+                _refresh_source(source, state, keys)
+                state.ttl = float(source.get("ttl_seconds", _default_ttl()))
+            except Exception as e:
+                with _SRC_LOCK:
+                    _SRC_HANDLES.pop(name, None)
+                if not federated:
+                    raise
+                # uma região fora do ar não derruba as outras
+                _log.warning("[read_all_tables] Fonte '%s' indisponível: %s", name, e)
+                for k in keys:
+                    if k not in state.tables or state.tables[k].error:
+                        state.tables[k] = _Table(pd.DataFrame(), f"erro-{uuid.uuid4().hex[:8]}", None, str(e))
+                state.ttl = min(_FAILED_SOURCE_TTL, _default_ttl())
+            state.checked_at = time.monotonic()
+            state.stale.difference_update(keys)
+        return dict(state.tables)
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _federate(versions: Tuple[Tuple[str, ...], ...], names: Tuple[str, ...],
+              _parts: Tuple[Dict[str, _Table], ...]) -> dict:
+    """
+    Une as fontes numa tabela lógica por aba (coluna `SOURCE_COL` quando há
+    mais de uma). Chaveado pelas versões das abas: só refaz a união quando
+    alguma delas é relida.
+    """
     out = {}
-    for key, desired in ws_map.items():
-        try:
-            ws = _resolve_ws(sh, desired)
-            out[key] = _read_ws(ws)
-        except Exception as e:
-            # Log leve e dataframe vazio
-            st.debug(f"[read_all_tables] Falha ao abrir '{desired}': {e}")
-            out[key] = pd.DataFrame()
+    for key in _parts[0]:
+        if len(_parts) == 1:
+            out[key] = _parts[0][key].df.copy(deep=False)
+            version = _parts[0][key].version
+        else:
+            tabs = [(n, p[key]) for n, p in zip(names, _parts) if key in p]
+            frames = [t.df.assign(**{SOURCE_COL: n}) for n, t in tabs if not t.df.empty]
+            out[key] = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            version = hashlib.sha1("|".join(t.version for _, t in tabs).encode()).hexdigest()[:12]
+        out[key].attrs["snapshot_version"] = version  # identifica a carga desta aba
+    resolve_all(out)  # mapa de colunas resolvido (e problemas relatados) na carga
     return out
 
+
+@instrument("sheets.read_all_tables")
+def read_all_tables():
+    """
+    {aba: DataFrame} de todas as fontes. Cada fonte tem cache e TTL
+    próprios; as vencidas são buscadas em paralelo, então o tempo de carga
+    fica próximo ao da fonte mais lenta.
+    """
+    srcs = _sources()
+    if len(srcs) == 1:
+        parts = [_get_source(srcs[0], federated=False)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(srcs), MAX_PARALLEL_SOURCES),
+                                thread_name_prefix="sheets") as pool:
+            parts = list(pool.map(lambda s: _get_source(s, federated=True), srcs))
+    versions = tuple(tuple(f"{k}:{t.version}" for k, t in p.items()) for p in parts)
+    return _federate(versions, tuple(s["name"] for s in srcs), tuple(parts))
+
+
+def invalidate_tables(keys=None, source: Optional[str] = None):
+    """
+    Marca abas (todas por padrão) de uma fonte (todas por padrão) para
+    reverificação na próxima leitura. Só as que mudaram desde a última
+    carga (revisão do Drive/arquivo) são relidas; as demais mantêm a versão.
+    """
+    with _SRC_LOCK:
+        for name, state in _SRC_STATE.items():
+            if source is None or name == source:
+                state.stale.update(keys if keys is not None else state.tables.keys())
+
+
+def refresh_source(name: str):
+    """Reverifica uma fonte; a próxima leitura busca só o que mudou nela."""
+    invalidate_tables(source=name)
+
+
+def clear_tables():
+    """Descarta o cache de todas as fontes: a próxima leitura relê tudo."""
+    with _SRC_LOCK:
+        _SRC_STATE.clear()
+        _SRC_HANDLES.clear()
+    _federate.clear()
+
+
+def source_status() -> List[dict]:
+    """Situação do cache por fonte e aba (para o Admin)."""
+    now = time.monotonic()
+    with _SRC_LOCK:
+        states = dict(_SRC_STATE)
+    out = []
+    for src in _sources():
+        state = states.get(src["name"])
+        if state is None:
+            continue
+        for key, t in sorted(state.tables.items()):
+            out.append({
+                "Fonte": src["name"] or "principal",
+                "Aba": key,
+                "Linhas": len(t.df),
+                "Versão": t.version,
+                "Revisão": t.revision or "—",
+                "Verificada há (s)": round(now - state.checked_at),
+                "TTL (s)": round(state.ttl),
+                "Erro": t.error or "",
+            })
+    return out
+
+
+def snapshot_version(data_all: dict) -> str:
+    """
+    Versão do snapshot devolvido por read_all_tables: combina as versões das
+    abas, então muda quando qualquer uma delas é relida.
+    """
+    versions = [getattr(df, "attrs", {}).get("snapshot_version") for df in (data_all or {}).values()]
+    versions = [v for v in versions if v]
+    if len(set(versions)) <= 1:
+        return versions[0] if versions else ""
+    return hashlib.sha1("|".join(versions).encode()).hexdigest()[:12]
+
+
 def enum_options():
     return {
         "posicoes": ["Voluntário", "Coordenador"],
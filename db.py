@@ -1,13 +1,38 @@
 # db.py  (backend YAML criptografado no Google Drive)
 from __future__ import annotations
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Tuple, NamedTuple, Callable
 from datetime import datetime, timezone, timedelta
-import base64, copy, bcrypt, streamlit as st
+from array import array
+from bisect import bisect_left, bisect_right
+import base64, heapq, sys, threading, bcrypt, streamlit as st
 
-from yaml_store import download_users_doc, upload_users_doc
+from yaml_store import download_users_doc, upload_users_doc, users_doc_metadata
+from perf import instrument
 
-_STORE: Dict[str, Any] = {"users": []}
+
+class _Snapshot(NamedTuple):
+    """
+    Versão imutável do documento de usuários. Ninguém altera um snapshot
+    publicado: escritores montam um novo (sob _WRITE_LOCK) e trocam a
+    referência de _STORE, o que é atômico; leitores só pegam `_STORE` e
+    leem sem lock e sem deepcopy.
+    """
+    users: Tuple[Dict[str, Any], ...]
+    by_email: Dict[str, int]          # e-mail normalizado -> posição em users
+    metrics: Dict[str, Any]
+    extra: Dict[str, Any]             # demais chaves do YAML, preservadas no upload
+
+
+def _make_snapshot(users: Iterable[Dict[str, Any]], metrics: Dict[str, Any],
+                   extra: Dict[str, Any]) -> _Snapshot:
+    users = tuple(users)
+    return _Snapshot(users, {u["email"]: i for i, u in enumerate(users)}, metrics, extra)
+
+
+_STORE: _Snapshot = _make_snapshot((), {"monthly_accesses": {}}, {})
 _LOADED = False
+# serializa escritores (inclui o ida-e-volta ao Drive em _persist)
+_WRITE_LOCK = threading.RLock()
 
 from yaml_store import download_yaml_optional
 _LOG_CFG = download_yaml_optional(
@@ -16,41 +41,200 @@ _LOG_CFG = download_yaml_optional(
 )
 _RETENTION_DAYS = _LOG_CFG["retention_days"]
 
+
+class _AccessLog:
+    """
+    Logs de acesso em ordem cronológica crescente, guardados como arrays
+    paralelos de epoch (float) e id de e-mail (int) — os e-mails são
+    internados uma única vez. O prune só avança o início da janela
+    (amortizado O(1)) e as consultas por período usam busca binária.
+    No YAML o formato continua sendo a lista de {email, ts}.
+    """
+    __slots__ = ("_ts", "_ids", "_start", "_emails", "_email_ids", "_lock")
+
+    def __init__(self):
+        # lock curto só para a estrutura (não cobre I/O): leituras do painel
+        # não esperam o upload de outra sessão
+        self._lock = threading.RLock()
+        self._ts = array("d")
+        self._ids = array("I")
+        self._start = 0
+        self._emails: List[str] = []
+        self._email_ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ts) - self._start
+
+    def _intern(self, email: str) -> int:
+        e = _norm_email(email)
+        i = self._email_ids.get(e)
+        if i is None:
+            i = len(self._emails)
+            self._emails.append(sys.intern(e))
+            self._email_ids[self._emails[i]] = i
+        return i
+
+    def _parse(self, rows: Iterable[Dict]) -> List[Tuple[float, int]]:
+        out = []
+        for r in rows or []:
+            ts, em = r.get("ts"), _norm_email(r.get("email"))
+            if not ts or not em:
+                continue
+            try:
+                out.append((datetime.fromisoformat(str(ts)).timestamp(), self._intern(em)))
+            except ValueError:
+                continue
+        out.sort()  # o YAML vem do mais novo p/ o mais antigo: timsort faz isso em O(n)
+        return out
+
+    def load(self, rows: Iterable[Dict]):
+        with self._lock:
+            parsed = self._parse(rows)
+            self._ts = array("d", (ts for ts, _ in parsed))
+            self._ids = array("I", (eid for _, eid in parsed))
+            self._start = 0
+
+    def append(self, email: str, epoch: float):
+        with self._lock:
+            eid = self._intern(email)
+            if self._ts and epoch < self._ts[-1]:
+                # relógio fora de ordem: mantém a ordenação
+                pos = bisect_right(self._ts, epoch, self._start)
+                self._ts.insert(pos, epoch)
+                self._ids.insert(pos, eid)
+            else:
+                self._ts.append(epoch)
+                self._ids.append(eid)
+
+    def prune(self, cutoff: float):
+        """Descarta registros anteriores a `cutoff` (epoch)."""
+        with self._lock:
+            self._start = bisect_left(self._ts, cutoff, self._start)
+            # compacta só quando o lixo passa da metade (custo amortizado)
+            if self._start > 1024 and self._start * 2 > len(self._ts):
+                del self._ts[:self._start]
+                del self._ids[:self._start]
+                self._start = 0
+
+    def merge_rows(self, rows: Iterable[Dict]):
+        """Mescla logs vindos do Drive (dedupe por email+ts), preservando a ordem."""
+        with self._lock:
+            self._merge(self._parse(rows))
+
+    def _merge(self, incoming: List[Tuple[float, int]]):
+        if not incoming:
+            return
+        mine = zip(self._ts[self._start:], self._ids[self._start:])
+        ts_out, ids_out = array("d"), array("I")
+        last_ts, seen = None, set()
+        for ts, eid in heapq.merge(mine, incoming):
+            if ts != last_ts:
+                last_ts, seen = ts, set()
+            if eid in seen:
+                continue
+            seen.add(eid)
+            ts_out.append(ts)
+            ids_out.append(eid)
+        self._ts, self._ids, self._start = ts_out, ids_out, 0
+
+    def _first_since(self, cutoff: float) -> int:
+        return bisect_left(self._ts, cutoff, self._start)
+
+    def count_since(self, cutoff: float) -> int:
+        with self._lock:
+            return len(self._ts) - self._first_since(cutoff)
+
+    def unique_since(self, cutoff: float) -> int:
+        with self._lock:
+            return len(set(self._ids[self._first_since(cutoff):]))
+
+    def last_epoch(self) -> Optional[float]:
+        with self._lock:
+            return self._ts[-1] if len(self) else None
+
+    def rows_since(self, cutoff: float) -> List[Dict]:
+        """Lista de {email, ts} a partir de `cutoff`, do mais novo p/ o mais antigo."""
+        with self._lock:
+            lo = self._first_since(cutoff)
+            ts, ids = self._ts[lo:], self._ids[lo:]
+        return [
+            {"email": self._emails[ids[i]], "ts": _iso(ts[i])}
+            for i in range(len(ts) - 1, -1, -1)
+        ]
+
+    def to_rows(self) -> List[Dict]:
+        return self.rows_since(float("-inf"))
+
+
+_LOGS = _AccessLog()
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+def _retention_cutoff(days: int | None = None) -> float:
+    return (datetime.now(timezone.utc) - timedelta(days=days or _RETENTION_DAYS)).timestamp()
+
+def _with_logs(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Documento pronto para upload (access_logs serializados de volta)."""
+    return {**doc, "access_logs": _LOGS.to_rows()}
+
 def _utcnow():
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 def _norm_email(e: str) -> str:
     return (e or "").strip().lower()
 
-def _next_id() -> int:
-    return (max([u.get("id", 0) for u in _STORE["users"]] or [0]) + 1)
+def _next_id(users: Iterable[Dict[str, Any]]) -> int:
+    return (max([u.get("id", 0) for u in users] or [0]) + 1)
 
-def _find_idx_by_email(email: str) -> int:
-    e = _norm_email(email)
-    for i, u in enumerate(_STORE["users"]):
-        if _norm_email(u.get("email")) == e:
-            return i
-    return -1
+def _find_idx_by_email(snap: _Snapshot, email: str) -> int:
+    return snap.by_email.get(_norm_email(email), -1)
+
+def _from_doc(doc: Dict[str, Any]) -> _Snapshot:
+    """Snapshot a partir do YAML (sem access_logs, que vivem em _LOGS)."""
+    extra = {k: v for k, v in doc.items() if k not in ("users", "metrics", "access_logs")}
+    metrics = doc.get("metrics") or {"monthly_accesses": {}}
+    return _make_snapshot(doc.get("users") or [], metrics, extra)
+
+def _to_doc(snap: _Snapshot) -> Dict[str, Any]:
+    return {"users": [dict(u) for u in snap.users], **snap.extra, "metrics": snap.metrics}
 
 def _ensure_loaded():
     global _LOADED, _STORE
     if _LOADED: return
-    _STORE = download_users_doc()
-    for u in _STORE["users"]:
-        u.setdefault("id", _next_id())
-        u["email"] = _norm_email(u.get("email"))
-        u.setdefault("nome", "")
-        u.setdefault("papel", "Leitor")
-        u.setdefault("ativo", 1)
-        u.setdefault("last_login", None)
-        # normaliza campo do hash como string base64
-        if isinstance(u.get("hash_senha"), (bytes, bytearray)):
-            u["hash_senha"] = base64.b64encode(u["hash_senha"]).decode()
-    # seções auxiliares ---------------------------------------------
-    if "metrics" not in _STORE:
-        _STORE["metrics"] = {"monthly_accesses": {}}
-    _STORE.setdefault("access_logs", [])  # lista de dicionários
-    _LOADED = True
+    with _WRITE_LOCK:
+        if _LOADED: return
+        doc = download_users_doc()
+        users = []
+        for raw in doc.get("users") or []:
+            u = dict(raw)
+            u.setdefault("id", _next_id(users))
+            u["email"] = _norm_email(u.get("email"))
+            u.setdefault("nome", "")
+            u.setdefault("papel", "Leitor")
+            u.setdefault("ativo", 1)
+            u.setdefault("last_login", None)
+            # normaliza campo do hash como string base64
+            if isinstance(u.get("hash_senha"), (bytes, bytearray)):
+                u["hash_senha"] = base64.b64encode(u["hash_senha"]).decode()
+            users.append(u)
+        _LOGS.load(doc.get("access_logs") or [])  # vira estrutura ordenada
+        _STORE = _from_doc({**doc, "users": users})
+        _LOADED = True
+
+def _commit(change: Callable[[_Snapshot], Tuple[_Snapshot, Any]]) -> Any:
+    """
+    Único caminho de escrita: sob _WRITE_LOCK aplica `change(snapshot atual)`,
+    que devolve (novo snapshot, resultado), publica o novo snapshot e persiste.
+    """
+    global _STORE
+    _ensure_loaded()
+    with _WRITE_LOCK:
+        new, result = change(_STORE)
+        if new is not None:
+            _STORE = new
+            _STORE = _persist(new)
+        return result
 
 def init_db():
     """Carrega para memória e faz bootstrap de admin (se fornecido em secrets)."""
@@ -61,96 +245,91 @@ def init_db():
     pwd   = adm.get("password")
     nome  = adm.get("name", "Admin")
     papel = adm.get("role", "Admin")
-    if email and pwd and _find_idx_by_email(email) == -1:
+    if email and pwd and _find_idx_by_email(_STORE, email) == -1:
         try:
             h = bcrypt.hashpw(pwd.encode("utf-8"), bcrypt.gensalt())
             create_user(nome, email, h, papel, 1)
         except Exception:
             pass
 
-def _persist():
+@instrument("db.persist")
+def _persist(snap: _Snapshot) -> _Snapshot:
     """
-    Persistência segura:
+    Persistência segura (chamada sob _WRITE_LOCK):
     - Baixa o doc atual do Drive
     - Mescla access_logs (dedupe por email+ts)
-    - (Opcional) mantém users/metrics do _STORE como fonte principal
-    - Sobe de volta
+    - Mantém users/metrics do snapshot como fonte principal
+    - Sobe de volta e devolve o snapshot sincronizado com o que foi salvo
     """
-    global _STORE
-
     try:
         remote = download_users_doc()
 
         # --- merge access_logs (não deixar sobrescrever) ---
-        remote_logs = remote.get("access_logs", []) or []
-        local_logs  = _STORE.get("access_logs", []) or []
+        _LOGS.merge_rows(remote.pop("access_logs", None) or [])
+        _LOGS.prune(_retention_cutoff())
 
-        merged = {}
-        for r in remote_logs:
-            ts = r.get("ts")
-            em = _norm_email(r.get("email"))
-            if ts and em:
-                merged[(em, ts)] = {"email": em, "ts": ts}
-        for r in local_logs:
-            ts = r.get("ts")
-            em = _norm_email(r.get("email"))
-            if ts and em:
-                merged[(em, ts)] = {"email": em, "ts": ts}
+        # --- mantém users/metrics do snapshot (admin pode ter alterado usuários) ---
+        remote["users"] = [dict(u) for u in snap.users]
+        remote["metrics"] = snap.metrics
 
-        remote["access_logs"] = sorted(merged.values(), key=lambda x: x["ts"], reverse=True)
+        upload_users_doc(_with_logs(remote))
 
-        # --- mantém users do _STORE (admin pode ter alterado usuários) ---
-        remote["users"] = _STORE.get("users", remote.get("users", []))
+        # sincroniza memória com o que foi salvo (chaves extras do remoto)
+        return _make_snapshot(snap.users, snap.metrics,
+                              {k: v for k, v in remote.items() if k not in ("users", "metrics")})
 
-        # --- mantém metrics do _STORE; se quiser, dá pra recalcular depois ---
-        remote["metrics"] = _STORE.get("metrics", remote.get("metrics", {"monthly_accesses": {}}))
+    except Exception:
+        # fallback antigo
+        upload_users_doc(_with_logs(_to_doc(snap)))
+        return snap
 
-        upload_users_doc(remote)
+def _hash_b64(hash_senha: bytes | str) -> str:
+    if isinstance(hash_senha, (bytes, bytearray)):
+        return base64.b64encode(hash_senha).decode()
+    return str(hash_senha)
 
-        # sincroniza memória com o que foi salvo
-        _STORE = remote
+def _replace_user(snap: _Snapshot, i: int, **fields) -> _Snapshot:
+    users = list(snap.users)
+    users[i] = {**users[i], **fields}
+    return _make_snapshot(users, snap.metrics, snap.extra)
 
-    except Exception:
-        # fallback antigo
-        upload_users_doc(_STORE)
+def _idx_by_id(snap: _Snapshot, uid: int) -> int:
+    return next((i for i, u in enumerate(snap.users) if u["id"] == uid), -1)
 
 def create_user(nome: str, email: str, hash_senha: bytes | str,
                 papel: str = "Leitor", ativo: int = 1) -> int:
-    _ensure_loaded()
-    if _find_idx_by_email(email) != -1:
-        raise ValueError("E-mail já cadastrado.")
-    if isinstance(hash_senha, (bytes, bytearray)):
-        hash_b64 = base64.b64encode(hash_senha).decode()
-    else:
-        hash_b64 = str(hash_senha)
-    uid = _next_id()
-    _STORE["users"].append({
-        "id": uid,
-        "nome": nome,
-        "email": _norm_email(email),
-        "hash_senha": hash_b64,            # armazenado como base64
-        "papel": papel,
-        "ativo": int(ativo),
-        "last_login": None,
-        "created_at": _utcnow(),
-    })
-    _persist()
-    return uid
+    def change(snap: _Snapshot):
+        if _find_idx_by_email(snap, email) != -1:
+            raise ValueError("E-mail já cadastrado.")
+        uid = _next_id(snap.users)
+        user = {
+            "id": uid,
+            "nome": nome,
+            "email": _norm_email(email),
+            "hash_senha": _hash_b64(hash_senha),   # armazenado como base64
+            "papel": papel,
+            "ativo": int(ativo),
+            "last_login": None,
+            "created_at": _utcnow(),
+        }
+        return _make_snapshot(snap.users + (user,), snap.metrics, snap.extra), uid
+    return _commit(change)
 
 def get_user_by_email(email: str) -> Optional[Dict]:
     _ensure_loaded()
-    i = _find_idx_by_email(email)
+    snap = _STORE                      # leitura sem lock: o snapshot nunca muda
+    i = _find_idx_by_email(snap, email)
     if i == -1:
         return None
-    u = copy.deepcopy(_STORE["users"][i])
+    u = snap.users[i]
     # devolve hash como bytes (compatível com bcrypt.checkpw do auth.py)
     try:
-        u["hash_senha"] = base64.b64decode(u.get("hash_senha") or "")
+        hash_senha = base64.b64decode(u.get("hash_senha") or "")
     except Exception:
-        u["hash_senha"] = b""
+        hash_senha = b""
     return {
         "id": u["id"], "nome": u["nome"], "email": u["email"],
-        "hash_senha": u["hash_senha"], "papel": u["papel"],
+        "hash_senha": hash_senha, "papel": u["papel"],
         "ativo": u["ativo"], "last_login": u.get("last_login"),
     }
 
@@ -162,52 +341,42 @@ def record_login(email: str):
       mais antigos que RETENTION_DAYS.
     • Incrementa o contador mensal em metrics.monthly_accesses.
     """
-    _ensure_loaded()                                     # garante _STORE em memória
-
-    # ------------------------------------------------------------------
-    # 1) LOG detalhado de acesso (lista access_logs)
-    # ------------------------------------------------------------------
-    now = datetime.now(timezone.utc)
-    _STORE.setdefault("access_logs", []).append({
-        "email": email,
-        "ts": now.isoformat()           # carimbo ISO-8601 em UTC
-    })
-
-    # — prune automático (mantém só os últimos N dias) -----------------
-    cutoff = now - timedelta(days=_RETENTION_DAYS)       # _RETENTION_DAYS vem do yaml
-    _STORE["access_logs"] = [
-        row for row in _STORE["access_logs"]
-        if datetime.fromisoformat(row["ts"]) >= cutoff
-    ]
-
-    # ------------------------------------------------------------------
-    # 2) Atualiza last_login do próprio usuário
-    # ------------------------------------------------------------------
-    idx = _find_idx_by_email(email)
-    if idx != -1:
-        _STORE["users"][idx]["last_login"] = now.isoformat()
-
-    # ------------------------------------------------------------------
-    # 3) Incrementa acumulador mensal
-    # ------------------------------------------------------------------
-    month_key = now.strftime("%Y-%m")                    # ex.: '2025-11'
-    m = _STORE.setdefault("metrics", {}).setdefault("monthly_accesses", {})
-    m[month_key] = m.get(month_key, 0) + 1
-
-    # ------------------------------------------------------------------
-    # 4) Persiste tudo de volta ao YAML (Google Drive ou local)
-    # ------------------------------------------------------------------
-    _persist()
+    def change(snap: _Snapshot):
+        # ------------------------------------------------------------------
+        # 1) LOG detalhado de acesso (lista access_logs)
+        # ------------------------------------------------------------------
+        now = datetime.now(timezone.utc)
+        _LOGS.append(email, now.timestamp())
+
+        # — prune automático (mantém só os últimos N dias) -----------------
+        _LOGS.prune(_retention_cutoff())                 # _RETENTION_DAYS vem do yaml
+
+        # ------------------------------------------------------------------
+        # 2) Atualiza last_login do próprio usuário
+        # ------------------------------------------------------------------
+        idx = _find_idx_by_email(snap, email)
+        if idx != -1:
+            snap = _replace_user(snap, idx, last_login=now.isoformat())
+
+        # ------------------------------------------------------------------
+        # 3) Incrementa acumulador mensal
+        # ------------------------------------------------------------------
+        month_key = now.strftime("%Y-%m")                # ex.: '2025-11'
+        m = dict(snap.metrics.get("monthly_accesses", {}))
+        m[month_key] = m.get(month_key, 0) + 1
+        metrics = {**snap.metrics, "monthly_accesses": m}
+
+        # ------------------------------------------------------------------
+        # 4) Persiste tudo de volta ao YAML (Google Drive ou local)
+        # ------------------------------------------------------------------
+        return _make_snapshot(snap.users, metrics, snap.extra), None
+    _commit(change)
 
 def _prune_access_logs():
     """
     Mantém apenas registros dentro da janela de retenção configurada.
     """
-    cutoff = datetime.now(timezone.utc) - timedelta(days=_RETENTION_DAYS)
-    _STORE["access_logs"] = [
-        row for row in _STORE["access_logs"]
-        if datetime.fromisoformat(row["ts"]) >= cutoff
-    ]
+    _LOGS.prune(_retention_cutoff())
 
 def get_month_access_count(year: int | None = None,
                            month: int | None = None) -> int:
@@ -218,13 +387,13 @@ def get_month_access_count(year: int | None = None,
     _ensure_loaded()
     now = datetime.now(timezone.utc)
     key = f"{year or now.year}-{(month or now.month):02d}"
-    return _STORE.get("metrics", {}).get("monthly_accesses", {}).get(key, 0)
+    return _STORE.metrics.get("monthly_accesses", {}).get(key, 0)
 
 
 def list_users() -> List[Dict]:
     _ensure_loaded()
     out = []
-    for u in sorted(_STORE["users"], key=lambda x: x.get("id", 0), reverse=True):
+    for u in sorted(_STORE.users, key=lambda x: x.get("id", 0), reverse=True):
         out.append({
             "id": u["id"], "nome": u["nome"], "email": u["email"],
             "papel": u["papel"], "ativo": u["ativo"], "last_login": u.get("last_login"),
@@ -232,37 +401,32 @@ def list_users() -> List[Dict]:
     return out
 
 def update_user(uid: int, nome: str, email: str, papel: str, ativo: int):
-    _ensure_loaded()
-    # checa conflito de e-mail
     e = _norm_email(email)
-    for u in _STORE["users"]:
-        if u["id"] != uid and _norm_email(u["email"]) == e:
+
+    def change(snap: _Snapshot):
+        # checa conflito de e-mail
+        other = snap.by_email.get(e, -1)
+        if other != -1 and snap.users[other]["id"] != uid:
             raise ValueError("E-mail já em uso por outro usuário.")
-    for u in _STORE["users"]:
-        if u["id"] == uid:
-            u["nome"] = nome
-            u["email"] = e
-            u["papel"] = papel
-            u["ativo"] = int(ativo)
-            _persist()
-            return
+        i = _idx_by_id(snap, uid)
+        if i == -1:
+            return None, None
+        return _replace_user(snap, i, nome=nome, email=e, papel=papel, ativo=int(ativo)), None
+    _commit(change)
 
 def update_password(uid: int, hash_senha: bytes | str):
-    _ensure_loaded()
-    if isinstance(hash_senha, (bytes, bytearray)):
-        hash_b64 = base64.b64encode(hash_senha).decode()
-    else:
-        hash_b64 = str(hash_senha)
-    for u in _STORE["users"]:
-        if u["id"] == uid:
-            u["hash_senha"] = hash_b64
-            _persist()
-            return
+    def change(snap: _Snapshot):
+        i = _idx_by_id(snap, uid)
+        if i == -1:
+            return None, None
+        return _replace_user(snap, i, hash_senha=_hash_b64(hash_senha)), None
+    _commit(change)
 
 def delete_user(uid: int):
-    _ensure_loaded()
-    _STORE["users"] = [u for u in _STORE["users"] if u["id"] != uid]
-    _persist()
+    def change(snap: _Snapshot):
+        users = [u for u in snap.users if u["id"] != uid]
+        return _make_snapshot(users, snap.metrics, snap.extra), None
+    _commit(change)
 
 def get_recent_logs(days: int = 30):
     """
@@ -270,9 +434,25 @@ def get_recent_logs(days: int = 30):
     ordenada do mais novo para o mais antigo.
     """
     _ensure_loaded()
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-    logs = [
-        row for row in _STORE["access_logs"]
-        if datetime.fromisoformat(row["ts"]) >= cutoff
-    ]
-    return sorted(logs, key=lambda r: r["ts"], reverse=True)
+    return _LOGS.rows_since(_retention_cutoff(days))
+
+def get_log_summary(days: int = 30) -> Dict[str, Any]:
+    """
+    Resumo leve dos logs para o painel Admin, sem baixar o YAML do Drive:
+    contagens saem do estado em memória (sincronizado a cada _persist) e a
+    data de modificação vem dos metadados do arquivo no Drive.
+    """
+    _ensure_loaded()
+    cutoff = _retention_cutoff(days)
+    last = _LOGS.last_epoch()
+    try:
+        meta = users_doc_metadata()
+    except Exception:
+        meta = {}
+    return {
+        "stored": len(_LOGS),
+        "recent": _LOGS.count_since(cutoff),
+        "unique_recent": _LOGS.unique_since(cutoff),
+        "last_ts": _iso(last) if last is not None else None,
+        "modified_time": meta.get("modifiedTime"),
+    }
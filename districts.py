@@ -0,0 +1,332 @@
+# districts.py
+"""
+Agregação de pontos (ações, voluntários) por distrito/município para o
+mapa coroplético. A geometria vem de um GeoJSON local configurado em
+secrets — o app não embute limites administrativos:
+
+    [geo]
+    districts_file = "dados/distritos_sp.geojson"   # FeatureCollection, Polygon/MultiPolygon em lon/lat
+    districts_name = "ds_nome"                      # opcional: propriedade com o nome
+
+- Índice espacial: STRtree do shapely (opcional) sobre os polígonos —
+  uma consulta vetorizada dá as caixas candidatas de todos os pontos; o
+  teste exato usa o polígono preparado. Sem shapely: índice ordenado por
+  longitude + caixa envolvente e ray casting em numpy, em blocos.
+- Atribuição ponto -> distrito memorizada por coordenada: um snapshot novo
+  só testa as coordenadas que ainda não apareceram (a geometria não muda
+  enquanto o arquivo não muda).
+- Geometria simplificada por nível de zoom (tolerância ~1 pixel), gerada
+  uma vez por arquivo e nível; partes menores que um pixel são omitidas.
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from textnorm import norm
+
+# shapely é opcional (STRtree / simplify em C)
+try:
+    import shapely
+    from shapely.geometry import mapping
+    from shapely.strtree import STRtree
+except Exception:
+    shapely = None
+
+# níveis de zoom com geometria pré-simplificada
+ZOOMS = (8, 10, 12, 14)
+_NAME_KEYS = ("name", "nome", "ds_nome", "nm_distrito", "nome_distrito", "nm_mun", "nm_municip",
+              "distrito", "municipio")
+# arestas × pontos por bloco do ray casting (limita a memória do fallback)
+_PIP_BLOCK = 2_000_000
+# acima disso a memória de coordenadas é reiniciada
+_KNOWN_MAX = 500_000
+
+
+def tolerance(zoom: int) -> float:
+    """Graus por pixel (tiles de 256 px) no zoom dado."""
+    return 360.0 / (256 * 2 ** zoom)
+
+
+def zoom_for_extent(extent: float) -> int:
+    """Maior nível de ZOOMS em que `extent` graus cabem num mapa de ~500 px."""
+    if not extent or extent <= 0:
+        return ZOOMS[-1]
+    z = math.log2(2 * 360.0 / extent)
+    return max([ZOOMS[0]] + [lvl for lvl in ZOOMS if lvl <= z])
+
+
+def _coord_keys(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """lat/lon -> int64 (resolução de 1e-6 grau)."""
+    ilat = np.rint((lat + 90.0) * 1e6).astype(np.int64)
+    ilon = np.rint((lon + 180.0) * 1e6).astype(np.int64)
+    return (ilat << 29) | ilon
+
+
+def _ring(coords) -> Optional[np.ndarray]:
+    r = np.asarray(coords, dtype=float)
+    if r.ndim != 2 or len(r) < 3:
+        return None
+    r = r[:, :2]
+    if not np.array_equal(r[0], r[-1]):
+        r = np.vstack([r, r[:1]])
+    return r if len(r) >= 4 else None
+
+
+def _polygons(geom: Optional[dict]) -> List[List[np.ndarray]]:
+    """Polygon/MultiPolygon GeoJSON -> [[anel externo, buracos...], ...]."""
+    if not geom:
+        return []
+    coords = geom.get("coordinates") or []
+    polys = [coords] if geom.get("type") == "Polygon" else coords if geom.get("type") == "MultiPolygon" else []
+    out = []
+    for poly in polys:
+        rings = [r for r in (_ring(c) for c in poly) if r is not None]
+        if rings:
+            out.append(rings)
+    return out
+
+
+def _contains(rings: Sequence[np.ndarray], px: np.ndarray, py: np.ndarray) -> np.ndarray:
+    """Ray casting par-ímpar sobre todos os anéis (buracos inclusos)."""
+    inside = np.zeros(len(px), dtype=bool)
+    for r in rings:
+        x1, y1, x2, y2 = r[:-1, 0], r[:-1, 1], r[1:, 0], r[1:, 1]
+        step = max(1, _PIP_BLOCK // len(x1))
+        for s in range(0, len(px), step):
+            X, Y = px[s:s + step, None], py[s:s + step, None]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cross = ((y1 > Y) != (y2 > Y)) & (X < (x2 - x1) * (Y - y1) / (y2 - y1) + x1)
+            inside[s:s + step] ^= (cross.sum(axis=1) & 1).astype(bool)
+    return inside
+
+
+def _simplify_ring(r: np.ndarray, tol: float) -> np.ndarray:
+    """Douglas-Peucker iterativo; mantém o anel fechado (>= 4 pontos)."""
+    n = len(r)
+    if tol <= 0 or n <= 4:
+        return r
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j <= i + 1:
+            continue
+        a, b, seg = r[i], r[j], r[i + 1:j]
+        ab = b - a
+        den = math.hypot(ab[0], ab[1])
+        if den == 0:
+            d = np.hypot(seg[:, 0] - a[0], seg[:, 1] - a[1])
+        else:
+            d = np.abs(ab[0] * (seg[:, 1] - a[1]) - ab[1] * (seg[:, 0] - a[0])) / den
+        k = int(d.argmax())
+        if d[k] > tol:
+            m = i + 1 + k
+            keep[m] = True
+            stack += [(i, m), (m, j)]
+    out = r[keep]
+    return out if len(out) >= 4 else r
+
+
+class DistrictLayer:
+    def __init__(self, features: Sequence[dict], name_key: Optional[str] = None):
+        names, parts, owner = [], [], []
+        for i, f in enumerate(features):
+            polys = _polygons(f.get("geometry"))
+            if not polys:
+                continue
+            props = f.get("properties") or {}
+            key = name_key if name_key in props else next((k for k in props if norm(k) in _NAME_KEYS), None)
+            names.append(str(props[key]) if key is not None else f"#{i + 1}")
+            parts += polys
+            owner += [len(names) - 1] * len(polys)
+        if not parts:
+            raise ValueError("GeoJSON sem polígonos")
+
+        self.names = np.array(names, dtype=object)
+        self._parts = parts
+        self._owner = np.array(owner, dtype=np.int64)
+        self._bounds = np.array([[p[0][:, 0].min(), p[0][:, 1].min(), p[0][:, 0].max(), p[0][:, 1].max()]
+                                 for p in parts])
+        self._geoms = None
+        self._tree = None
+        if shapely is not None:
+            self._geoms = np.array([shapely.Polygon(p[0], p[1:]) for p in parts], dtype=object)
+            shapely.prepare(self._geoms)
+            self._tree = STRtree(self._geoms)
+        self.revision = ""  # muda quando o arquivo muda (chave para caches de figura)
+        self._lock = threading.Lock()
+        self._simplified: Dict[int, dict] = {}
+        self._known_keys = np.empty(0, dtype=np.int64)   # ordenado
+        self._known_codes = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_file(cls, path: str, name_key: Optional[str] = None) -> "DistrictLayer":
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+        features = raw.get("features") if raw.get("type") == "FeatureCollection" else [raw]
+        layer = cls(features or [], name_key)
+        layer.revision = str(os.stat(path).st_mtime_ns)
+        return layer
+
+    def bounds(self, ids=None) -> tuple:
+        """(minx, miny, maxx, maxy) de todos os distritos ou só dos `ids`."""
+        b = self._bounds if ids is None else self._bounds[np.isin(self._owner, np.asarray(ids))]
+        return float(b[:, 0].min()), float(b[:, 1].min()), float(b[:, 2].max()), float(b[:, 3].max())
+
+    # ------------------------------------------------------------------
+    # Ponto -> distrito
+    # ------------------------------------------------------------------
+    def _candidates(self, x: np.ndarray, y: np.ndarray):
+        """(parte, índices dos pontos dentro da caixa envolvente da parte)."""
+        if self._tree is not None:
+            pi, gi = self._tree.query(shapely.points(x, y))  # só caixas: rápido
+            o = np.argsort(gi, kind="stable")
+            pi, gi = pi[o], gi[o]
+            cuts = np.flatnonzero(np.diff(gi)) + 1
+            for a, b in zip(np.r_[0, cuts], np.r_[cuts, len(gi)]):
+                if a < b:
+                    yield int(gi[a]), pi[a:b]
+            return
+        order = np.argsort(x, kind="stable")
+        xs = x[order]
+        for p, (minx, miny, maxx, maxy) in enumerate(self._bounds):
+            lo, hi = np.searchsorted(xs, minx, "left"), np.searchsorted(xs, maxx, "right")
+            if lo < hi:
+                cand = order[lo:hi]
+                yield p, cand[(y[cand] >= miny) & (y[cand] <= maxy)]
+
+    def _locate(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        out = np.full(len(x), -1, dtype=np.int64)
+        for p, cand in self._candidates(x, y):
+            cand = cand[out[cand] < 0]  # divisa: fica com o primeiro distrito
+            if not len(cand):
+                continue
+            if self._geoms is not None:
+                # "intersects" inclui pontos exatamente na divisa
+                inside = shapely.intersects_xy(self._geoms[p], x[cand], y[cand])
+            else:
+                inside = _contains(self._parts[p], x[cand], y[cand])
+            out[cand[inside]] = self._owner[p]
+        return out
+
+    def assign(self, lat, lon) -> np.ndarray:
+        """Índice do distrito de cada ponto (-1 = fora de todos / sem coordenada)."""
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        codes = np.full(len(lat), -1, dtype=np.int64)
+        ok = np.isfinite(lat) & np.isfinite(lon)
+        if not ok.any():
+            return codes
+        keys = _coord_keys(lat[ok], lon[ok])
+        uniq, first, inv = np.unique(keys, return_index=True, return_inverse=True)
+
+        with self._lock:
+            kk, kc = self._known_keys, self._known_codes
+        pos = np.searchsorted(kk, uniq)
+        pos_c = np.minimum(pos, max(len(kk) - 1, 0))
+        hit = (pos < len(kk)) & (kk[pos_c] == uniq) if len(kk) else np.zeros(len(uniq), dtype=bool)
+        found = np.full(len(uniq), -1, dtype=np.int64)
+        found[hit] = kc[pos_c[hit]]
+        if not hit.all():
+            new = ~hit
+            idx = first[new]
+            found[new] = self._locate(lon[ok][idx], lat[ok][idx])
+            with self._lock:
+                kk, kc = self._known_keys, self._known_codes
+                if len(kk) + int(new.sum()) > _KNOWN_MAX:
+                    kk, kc = kk[:0], kc[:0]
+                # outra thread pode ter gravado as mesmas chaves: mantém as já conhecidas
+                add = ~np.isin(uniq[new], kk)
+                allk = np.concatenate([kk, uniq[new][add]])
+                allc = np.concatenate([kc, found[new][add]])
+                o = np.argsort(allk, kind="stable")
+                self._known_keys, self._known_codes = allk[o], allc[o]
+        codes[ok] = found[inv.ravel()]
+        return codes
+
+    def counts(self, lat, lon, weights=None) -> pd.DataFrame:
+        """
+        Total por distrito (todos os distritos, inclusive zerados): colunas
+        id, nome, valor. `attrs["fora"]` = peso dos pontos sem distrito.
+        """
+        codes = self.assign(lat, lon)
+        w = np.ones(len(codes)) if weights is None else np.asarray(weights, dtype=float)
+        m = codes >= 0
+        tot = np.bincount(codes[m], weights=w[m], minlength=len(self.names))
+        out = pd.DataFrame({"id": np.arange(len(self.names)), "nome": self.names, "valor": tot})
+        out.attrs["fora"] = float(w[~m].sum())
+        return out
+
+    # ------------------------------------------------------------------
+    # Geometria para o mapa
+    # ------------------------------------------------------------------
+    def geojson(self, zoom: int) -> dict:
+        """FeatureCollection simplificada para o nível `zoom` (id = índice do distrito)."""
+        with self._lock:
+            hit = self._simplified.get(zoom)
+        if hit is not None:
+            return hit
+        tol = tolerance(zoom)
+        big = ((self._bounds[:, 2] - self._bounds[:, 0]) >= tol) | ((self._bounds[:, 3] - self._bounds[:, 1]) >= tol)
+        polys: List[list] = [[] for _ in self.names]
+        if self._geoms is not None:
+            simple = shapely.simplify(self._geoms, tol, preserve_topology=True)
+            for p, g in enumerate(simple):
+                if g.is_empty:
+                    continue
+                gj = mapping(g)
+                polys[self._owner[p]] += [gj["coordinates"]] if gj["type"] == "Polygon" else list(gj["coordinates"])
+            polys = [[[np.round(np.asarray(r), 5).tolist() for r in poly] for poly in ps] for ps in polys]
+        else:
+            for p, rings in enumerate(self._parts):
+                polys[self._owner[p]].append([np.round(_simplify_ring(r, tol), 5).tolist() for r in rings])
+        # partes menores que um pixel somem (ilhas, ruído), mas nenhum distrito fica vazio
+        for p in np.flatnonzero(~big):
+            f = self._owner[p]
+            if big[self._owner == f].any():
+                polys[f] = [poly for poly in polys[f] if not _tiny(poly[0], tol)]
+        fc = {"type": "FeatureCollection", "features": [
+            {"type": "Feature", "id": i, "properties": {"nome": self.names[i]},
+             "geometry": {"type": "MultiPolygon", "coordinates": polys[i]}}
+            for i in range(len(self.names))
+        ]}
+        with self._lock:
+            self._simplified[zoom] = fc
+        return fc
+
+
+def _tiny(ring: list, tol: float) -> bool:
+    r = np.asarray(ring)
+    return bool((np.ptp(r[:, 0]) < tol) and (np.ptp(r[:, 1]) < tol))
+
+
+_LAYERS: Dict[str, tuple] = {}
+_LAYERS_LOCK = threading.Lock()
+
+
+def district_layer(secrets=None) -> Optional[DistrictLayer]:
+    """
+    Camada do processo para `geo.districts_file` (recarregada quando o
+    arquivo muda). None se o arquivo não estiver configurado/presente.
+    """
+    if secrets is None:
+        import streamlit as st
+        secrets = st.secrets
+    cfg = dict((secrets or {}).get("geo", {}) or {})
+    path = cfg.get("districts_file", "dados/distritos_sp.geojson")
+    if not path or not os.path.exists(path):
+        return None
+    token = (os.stat(path).st_mtime_ns, cfg.get("districts_name"))
+    with _LAYERS_LOCK:
+        cur = _LAYERS.get(path)
+        if cur is None or cur[0] != token:
+            cur = _LAYERS[path] = (token, DistrictLayer.from_file(path, cfg.get("districts_name")))
+    return cur[1]
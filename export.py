@@ -0,0 +1,85 @@
+# export.py
+from __future__ import annotations
+
+import gzip
+import tempfile
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator
+
+import pandas as pd
+
+# Parquet é opcional (pyarrow)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:
+    pa = pq = None
+
+CHUNK_ROWS = 50_000
+# acima disso o arquivo temporário vai para o disco em vez de ficar em memória
+_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+def iter_csv_chunks(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """CSV em blocos de `chunk_rows` linhas (cabeçalho só no primeiro)."""
+    if df.empty:
+        yield df.to_csv(index=False).encode("utf-8")
+        return
+    for i, start in enumerate(range(0, len(df), chunk_rows)):
+        chunk = df.iloc[start:start + chunk_rows]
+        yield chunk.to_csv(index=False, header=(i == 0)).encode("utf-8")
+
+
+def _spool(chunks: Iterable[bytes], compress: bool = False) -> BinaryIO:
+    f = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES)
+    sink = gzip.GzipFile(fileobj=f, mode="wb") if compress else f
+    for c in chunks:
+        sink.write(c)
+    if compress:
+        sink.close()  # fecha só o gzip; `f` continua aberto
+    f.seek(0)
+    return f
+
+
+def csv_file(df: pd.DataFrame) -> BinaryIO:
+    return _spool(iter_csv_chunks(df))
+
+
+def csv_gz_file(df: pd.DataFrame) -> BinaryIO:
+    return _spool(iter_csv_chunks(df), compress=True)
+
+
+def write_parquet(df: pd.DataFrame, sink, chunk_rows: int = CHUNK_ROWS):
+    """Escreve `df` em Parquet, um row group por bloco de linhas."""
+    # colunas vindas do Sheets são texto; fixa o schema para todos os blocos
+    schema = pa.schema([(str(c), pa.string()) for c in df.columns])
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for start in range(0, max(len(df), 1), chunk_rows):
+            # "string" (não str): None/NaN viram nulos do Parquet, não 'None'/'nan'
+            chunk = df.iloc[start:start + chunk_rows].astype("string")
+            chunk.columns = schema.names
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def parquet_file(df: pd.DataFrame) -> BinaryIO:
+    f = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES)
+    write_parquet(df, f)
+    f.seek(0)
+    return f
+
+
+# nome exibido -> (extensão, mime, construtor)
+FORMATS: Dict[str, tuple] = {
+    "CSV": ("csv", "text/csv", csv_file),
+    "CSV (gzip)": ("csv.gz", "application/gzip", csv_gz_file),
+}
+if pq is not None:
+    FORMATS["Parquet"] = ("parquet", "application/vnd.apache.parquet", parquet_file)
+
+
+def deferred_export(df: pd.DataFrame, fmt: str) -> Callable[[], BinaryIO]:
+    """
+    Callable para st.download_button: o arquivo só é gerado quando o usuário
+    clica, em blocos, sem montar o conteúdo inteiro como string.
+    """
+    build = FORMATS[fmt][2]
+    return lambda: build(df)
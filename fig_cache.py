@@ -0,0 +1,65 @@
+# fig_cache.py
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable
+
+from perf import timed
+
+# LRU de figuras prontas (Plotly/Altair), compartilhado entre sessões.
+# As figuras guardadas aqui são tratadas como somente-leitura.
+MAX_ENTRIES = 64
+
+_LOCK = threading.Lock()
+_FIGS: "OrderedDict[tuple, Any]" = OrderedDict()
+_STATS = {"hits": 0, "misses": 0}
+
+
+def _freeze(v):
+    """Converte o estado dos filtros em algo hasheável e estável."""
+    if isinstance(v, dict):
+        return tuple(sorted((k, _freeze(x)) for k, x in v.items()))
+    if isinstance(v, (list, tuple)):
+        return tuple(_freeze(x) for x in v)
+    if isinstance(v, (set, frozenset)):
+        return tuple(sorted(map(str, v)))
+    if isinstance(v, (date, datetime)):
+        return v.isoformat()
+    return v
+
+
+def cached_figure(name: str, version: str, deps, build: Callable[[], Any]):
+    """
+    Devolve a figura `name` para (versão do snapshot, `deps`); só chama
+    `build()` quando essa combinação ainda não está no cache.
+    `deps` deve conter apenas os filtros que afetam este gráfico.
+    """
+    key = (name, version, _freeze(deps))
+    with _LOCK:
+        if key in _FIGS:
+            _FIGS.move_to_end(key)
+            _STATS["hits"] += 1
+            return _FIGS[key]
+        _STATS["misses"] += 1
+
+    with timed(f"chart.{name}"):
+        fig = build()
+
+    with _LOCK:
+        _FIGS[key] = fig
+        _FIGS.move_to_end(key)
+        while len(_FIGS) > MAX_ENTRIES:
+            _FIGS.popitem(last=False)
+    return fig
+
+
+def clear():
+    with _LOCK:
+        _FIGS.clear()
+
+
+def stats() -> dict:
+    with _LOCK:
+        return {**_STATS, "entries": len(_FIGS)}
@@ -0,0 +1,69 @@
+# geo.py
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Teto de marcadores por mapa — mantém o JSON do Plotly limitado
+MAX_MARKERS = 400
+# Menor célula da grade (~50 m): abaixo disso não vale agregar
+_MIN_CELL_DEG = 0.0005
+
+
+def _cell_for_extent(extent: float, max_markers: int) -> float:
+    """
+    Tamanho de célula (graus) adequado ao "zoom" implícito pela extensão dos
+    pontos (os mapas usam fitbounds). Arredonda para potência de 2 para que
+    extensões parecidas caiam na mesma resolução (e no mesmo cache).
+    """
+    per_axis = max(1, int(math.sqrt(max_markers)))
+    cell = max(extent / per_axis, _MIN_CELL_DEG)
+    return 2.0 ** math.ceil(math.log2(cell))
+
+
+def _grid_aggregate(df: pd.DataFrame, count_col: str, cell: float) -> pd.DataFrame:
+    gx = np.floor(df["lat"].to_numpy() / cell).astype(np.int64)
+    gy = np.floor(df["lon"].to_numpy() / cell).astype(np.int64)
+    w = df[count_col].to_numpy(dtype=float)
+    tmp = pd.DataFrame({
+        "gx": gx, "gy": gy, "w": w,
+        "wlat": df["lat"].to_numpy() * w,
+        "wlon": df["lon"].to_numpy() * w,
+    })
+    g = tmp.groupby(["gx", "gy"], sort=False)[["w", "wlat", "wlon"]].sum()
+    # centróide ponderado pela contagem (o marcador fica onde está a massa)
+    return pd.DataFrame({
+        "lat": (g["wlat"] / g["w"]).to_numpy(),
+        "lon": (g["wlon"] / g["w"]).to_numpy(),
+        count_col: g["w"].to_numpy(),
+    })
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def cluster_points(points: pd.DataFrame, count_col: str, max_markers: int = MAX_MARKERS) -> pd.DataFrame:
+    """
+    Agrega pontos (lat, lon, contagem) numa grade com resolução escolhida pela
+    extensão dos dados, garantindo no máximo `max_markers` marcadores.
+    Cacheado por conteúdo (snapshot) + resolução.
+    """
+    if points is None or points.empty or len(points) <= max_markers:
+        return points
+
+    df = points[["lat", "lon", count_col]].dropna()
+    if df.empty:
+        return df
+    extent = max(float(df["lat"].max() - df["lat"].min()),
+                 float(df["lon"].max() - df["lon"].min()))
+    cell = _cell_for_extent(extent, max_markers)
+
+    out = _grid_aggregate(df, count_col, cell)
+    while len(out) > max_markers:
+        cell *= 2
+        out = _grid_aggregate(df, count_col, cell)
+
+    if pd.api.types.is_integer_dtype(points[count_col]):
+        out[count_col] = out[count_col].round().astype(int)
+    return out
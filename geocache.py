@@ -0,0 +1,261 @@
+# geocache.py
+from __future__ import annotations
+
+import json
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from textnorm import norm, split_address_series, street_core
+
+# Cache persistente endereço -> (lat, lon), por chave canônica:
+#   "<rua>|<número>"  (quando a fonte tem número)  e  "<rua>"  (nível de rua)
+# Fontes, em ordem de prioridade: Dim_enderecos > gazetteer local. Ruas sem
+# entrada podem cair numa rua da Dim_enderecos com as mesmas palavras
+# ("aproximado"): fica só em memória e é descartado a cada seed.
+SOURCES = ("dim", "gazetteer")
+_PRIORITY = {s: i for i, s in enumerate(SOURCES)}
+# palavras mais curtas ("a", "sol", "xv") não servem para aproximar
+MIN_APPROX_TOKEN = 4
+
+
+def _approx_tokens(rua: str) -> frozenset:
+    return frozenset(t for t in rua.split() if len(t) >= MIN_APPROX_TOKEN)
+
+
+def _num_key(v) -> str:
+    digits = re.sub(r"\D", "", str(v or ""))
+    return digits.lstrip("0") or ("0" if digits else "")
+
+
+class GeocodeCache:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, float, str]] = {}
+        self._misses: set = set()      # ruas sem resultado (nem aproximado), até o próximo seed
+        self._near: Dict[str, Tuple[float, float]] = {}  # aproximados, até o próximo seed
+        self._dim_tokens: Dict[str, set] = {}  # palavra -> ruas (nível de rua) da Dim
+        self._seeded: set = set()
+        self._dirty = False
+        self._stats = {"hits": 0, "misses": 0, "aprox": 0, "unresolved": 0}
+        self._load()
+
+    # ------------------------------------------------------------------
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                raw = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        for k, v in raw.get("entries", {}).items():
+            if v[2] in _PRIORITY:
+                self._entries[k] = (float(v[0]), float(v[1]), str(v[2]))
+            else:
+                self._dirty = True  # aproximados gravados por versões antigas
+        self._index_dim()
+
+    def _index_dim(self):
+        self._dim_tokens = {}
+        for k, v in self._entries.items():
+            if v[2] == "dim" and "|" not in k:
+                for t in _approx_tokens(k):
+                    self._dim_tokens.setdefault(t, set()).add(k)
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {"version": 1, "entries": {k: list(v) for k, v in self._entries.items()}}
+            self._dirty = False
+        d = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(d, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=d, prefix=".geocache_", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def _put(self, key: str, lat: float, lon: float, source: str) -> bool:
+        cur = self._entries.get(key)
+        if cur is not None and _PRIORITY[cur[2]] < _PRIORITY[source]:
+            return False
+        if cur == (lat, lon, source):
+            return False
+        self._entries[key] = (lat, lon, source)
+        return True
+
+    # ------------------------------------------------------------------
+    def seed(self, streets: Iterable, numbers: Optional[Iterable], lat: Iterable, lon: Iterable,
+             source: str, token: Optional[str] = None):
+        """
+        Alimenta o cache com (rua, número, lat, lon) já em graus decimais.
+        Com `token` (ex.: versão do snapshot), o mesmo lote só é processado uma vez.
+        """
+        if self.seeded(source, token):
+            return
+        df = pd.DataFrame({"rua": list(streets), "lat": list(lat), "lon": list(lon)})
+        df["num"] = list(numbers) if numbers is not None else ""
+        df = df.dropna(subset=["lat", "lon"])
+        df["rua"] = df["rua"].astype(str).map(street_core)
+        df["num"] = df["num"].map(_num_key)
+        df = df[df["rua"] != ""]
+        full = df[df["num"] != ""].drop_duplicates(["rua", "num"])
+        street = df.drop_duplicates("rua")  # nível de rua: a primeira ocorrência vence
+        changed = False
+        with self._lock:
+            if source == "dim":
+                # o lote da Dim_enderecos é completo: o que saiu dela sai do cache
+                # (senão coordenadas antigas ofuscariam o gazetteer para sempre)
+                current = {f"{r}|{n}" for r, n in zip(full["rua"], full["num"])} | set(street["rua"])
+                stale = [k for k, v in self._entries.items() if v[2] == "dim" and k not in current]
+                if stale:
+                    for k in stale:
+                        del self._entries[k]
+                    # o gazetteer volta a ser semeado por geocode_cache()
+                    self._seeded = {s for s in self._seeded if s[0] != "gazetteer"}
+                    changed = True
+            for rua, num, la, lo in zip(full["rua"], full["num"], full["lat"].astype(float), full["lon"].astype(float)):
+                changed |= self._put(f"{rua}|{num}", la, lo, source)
+            for rua, la, lo in zip(street["rua"], street["lat"].astype(float), street["lon"].astype(float)):
+                changed |= self._put(rua, la, lo, source)
+            if changed:
+                self._dirty = True
+                self._misses.clear()
+                self._near.clear()
+                if source == "dim":
+                    self._index_dim()
+            if token is not None:
+                self._seeded.add((source, token))
+
+    def seeded(self, source: str, token: Optional[str]) -> bool:
+        return token is not None and (source, token) in self._seeded
+
+    def _approx(self, rua: str) -> Optional[Tuple[float, float]]:
+        """
+        Rua da Dim_enderecos cujas palavras (>= MIN_APPROX_TOKEN letras)
+        contêm as de `rua`, ou estão contidas nelas; a mais parecida vence.
+        """
+        toks = _approx_tokens(rua)
+        cands = set().union(*(self._dim_tokens.get(t, ()) for t in toks))
+        best = None
+        for k in cands:
+            kt = _approx_tokens(k)
+            if toks <= kt or kt <= toks:
+                score = (len(toks ^ kt), k)
+                if best is None or score < best:
+                    best = score
+        if best is None:
+            return None
+        v = self._entries[best[1]]
+        return v[0], v[1]
+
+    def lookup(self, addresses: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        lat/lon (NaN quando não resolvido) para cada endereço livre. Normaliza
+        só os valores distintos; cada um vira no máximo duas buscas O(1), mais
+        o índice de palavras da Dim quando não há entrada.
+        """
+        codes, uniques = pd.factorize(addresses.astype(str))
+        rows = np.bincount(codes, minlength=len(uniques))
+        ruas, nums = split_address_series(pd.Series(uniques, dtype=object))
+        lat = np.full(len(uniques), np.nan)
+        lon = np.full(len(uniques), np.nan)
+        hits = misses = aprox = unresolved = 0
+        with self._lock:
+            entries = self._entries
+            for i, (rua, num) in enumerate(zip(ruas, nums)):
+                n = int(rows[i])
+                hit = (entries.get(f"{rua}|{num}") if num else None) or entries.get(rua)
+                if hit is not None:
+                    hits += n
+                    lat[i], lon[i] = hit[0], hit[1]
+                    continue
+                misses += n
+                near = self._near.get(rua)
+                if near is None and rua and rua not in self._misses:
+                    near = self._approx(rua)
+                    if near is None:
+                        self._misses.add(rua)
+                    else:
+                        self._near[rua] = near
+                if near is None:
+                    unresolved += n
+                    continue
+                aprox += n
+                lat[i], lon[i] = near
+            for k, v in (("hits", hits), ("misses", misses), ("aprox", aprox), ("unresolved", unresolved)):
+                self._stats[k] += v
+        self.save()
+        return lat[codes], lon[codes]
+
+    def stats(self) -> dict:
+        with self._lock:
+            by_source = {s: 0 for s in SOURCES}
+            for v in self._entries.values():
+                by_source[v[2]] = by_source.get(v[2], 0) + 1
+            by_source["aprox"] = len(self._near)
+            return {**self._stats, "entries": len(self._entries), "by_source": by_source, "path": self.path}
+
+
+# ---------------------------------------------------------------------
+# Gazetteer local (opcional)
+# ---------------------------------------------------------------------
+def load_gazetteer(path: str) -> pd.DataFrame:
+    """
+    CSV/Parquet com logradouro (rua/logradouro/endereco), lat/lon em graus
+    decimais e, opcionalmente, número. Devolve colunas rua, num, lat, lon.
+    """
+    df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path, dtype=str)
+    cols = {norm(c): c for c in df.columns}
+    rua = next((cols[k] for k in ("rua", "logradouro", "endereco") if k in cols), None)
+    lat = next((cols[k] for k in ("lat", "latitude") if k in cols), None)
+    lon = next((cols[k] for k in ("lon", "lng", "longitude") if k in cols), None)
+    num = next((cols[k] for k in ("numero", "num", "n") if k in cols), None)
+    if not (rua and lat and lon):
+        raise ValueError(f"Gazetteer sem colunas de rua/lat/lon: {path}")
+
+    def _deg(s):
+        return pd.to_numeric(s.astype(str).str.replace(",", ".", regex=False), errors="coerce")
+
+    return pd.DataFrame({
+        "rua": df[rua],
+        "num": df[num] if num else "",
+        "lat": _deg(df[lat]),
+        "lon": _deg(df[lon]),
+    })
+
+
+_CACHES: Dict[str, GeocodeCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def geocode_cache(secrets=None) -> GeocodeCache:
+    """
+    Cache do processo, configurado em secrets:
+
+        [geo]
+        cache_file = ".cuida_geocache.json"
+        gazetteer_file = "dados/logradouros_sp.csv"   # opcional
+    """
+    if secrets is None:
+        import streamlit as st
+        secrets = st.secrets
+    cfg = dict((secrets or {}).get("geo", {}) or {})
+    path = cfg.get("cache_file", ".cuida_geocache.json")
+    with _CACHES_LOCK:
+        cache = _CACHES.get(path)
+        if cache is None:
+            cache = _CACHES[path] = GeocodeCache(path)
+    gaz = cfg.get("gazetteer_file")
+    if gaz and os.path.exists(gaz):
+        token = f"{gaz}:{os.stat(gaz).st_mtime_ns}"
+        if not cache.seeded("gazetteer", token):
+            g = load_gazetteer(gaz)
+            cache.seed(g["rua"], g["num"], g["lat"], g["lon"], "gazetteer", token=token)
+            cache.save()
+    return cache
@@ -0,0 +1,270 @@
+# kpi_store.py
+"""
+Série diária de KPIs (uma linha por dia de atividade), gravada em disco e
+atualizada por um job em segundo plano. Painéis históricos e linhas de
+tendência leem daqui — O(dias) — em vez de varrer todas as Ações.
+
+    [kpi]
+    store_file = ".cuida_kpis.csv"
+    refresh_minutes = 360      # intervalo do job dentro do app
+
+Também roda avulso (ex.: cron): python -m kpi_store
+
+Dias que já saíram da planilha (abas arquivadas/podadas) continuam na
+série; dias presentes no snapshot atual são recalculados a cada sync. O
+primeiro dia de cada voluntário fica ao lado (`.cuida_kpis.voluntarios.csv`),
+para que quem só saiu da planilha não volte a contar como novo.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+import threading
+from typing import Mapping, Optional, Tuple
+
+import pandas as pd
+
+from analytics import action_hours, explode_volunteers, parse_brl
+from schema import resolve
+from snapshots import snapshot_store
+
+_log = logging.getLogger("cuida_sp.kpi_store")
+
+COLUMNS = ["dia", "horas", "acoes", "pessoas", "voluntarios", "voluntarios_novos",
+           "doacoes", "doacoes_valor"]
+DEFAULT_REFRESH_MINUTES = 360
+
+
+def _config(secrets=None) -> dict:
+    if secrets is None:
+        import streamlit as st
+        secrets = st.secrets
+    return dict((secrets or {}).get("kpi", {}) or {})
+
+
+def store_path(secrets=None) -> str:
+    return _config(secrets).get("store_file", ".cuida_kpis.csv")
+
+
+def _seen_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".voluntarios.csv"
+
+
+# ---------------------------------------------------------------------
+# Cálculo (uma passada pelas linhas do snapshot)
+# ---------------------------------------------------------------------
+def daily_kpis(acoes: pd.DataFrame, doacoes: pd.DataFrame,
+               first_seen: Optional[pd.Series] = None) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    KPIs por dia a partir das abas Ações e Doações, mais o primeiro dia de
+    cada voluntário (nome_norm -> dia). `first_seen` é esse mapa do sync
+    anterior: quem apareceu antes da primeira Ação atual não é novo.
+    """
+    seen = first_seen if first_seen is not None else pd.Series(dtype="datetime64[ns]")
+    seen = seen.rename_axis("nome_norm").rename("dia")
+    parts = []
+    if acoes is not None and not acoes.empty:
+        cols = resolve("acoes", acoes.columns)
+        if cols.has("data"):
+            a = acoes.rename(columns={cols.get("data"): "Data"})
+            a["Data"] = pd.to_datetime(a["Data"], errors="coerce", dayfirst=True)
+            dur_h, _ = action_hours(a)
+            dia = a["Data"].dt.normalize()
+            base = pd.DataFrame({
+                "dia": dia,
+                "horas": dur_h,
+                "acoes": 1,
+                "pessoas": pd.to_numeric(a[cols.get("pessoas")], errors="coerce").fillna(0)
+                if cols.has("pessoas") else 0,
+            }).dropna(subset=["dia"])
+            parts.append(base.groupby("dia").sum())
+
+            if cols.has("voluntarios"):
+                ex = explode_volunteers(a, cols.get("voluntarios"))
+                ex["dia"] = dia.reindex(ex["acao_id"]).to_numpy()
+                ex = ex.dropna(subset=["dia"])
+                por_dia = ex.groupby("dia")["nome_norm"].nunique().rename("voluntarios")
+                primeiro = ex.groupby("nome_norm")["dia"].min()
+                if not ex.empty:
+                    # antes da primeira Ação atual vale o mapa gravado (abas
+                    # podadas); dali em diante, o que está na planilha
+                    antes = seen[seen < ex["dia"].min()]
+                    primeiro = primeiro[~primeiro.index.isin(antes.index)]
+                    seen = pd.concat([antes, primeiro])
+                novos = primeiro.value_counts().rename("voluntarios_novos")
+                novos.index.name = "dia"
+                parts += [por_dia.to_frame(), novos.to_frame()]
+
+    if doacoes is not None and not doacoes.empty:
+        cols = resolve("doacoes", doacoes.columns)
+        if cols.has("data"):
+            d = pd.DataFrame({
+                "dia": pd.to_datetime(doacoes[cols.get("data")], errors="coerce", dayfirst=True).dt.normalize(),
+                "doacoes": 1,
+                "doacoes_valor": parse_brl(doacoes[cols.get("valor")]).fillna(0.0) if cols.has("valor") else 0.0,
+            }).dropna(subset=["dia"])
+            parts.append(d.groupby("dia").sum())
+
+    if not parts:
+        return pd.DataFrame(columns=COLUMNS), seen
+    out = pd.concat(parts, axis=1).fillna(0).reset_index().rename(columns={"index": "dia"})
+    for c in COLUMNS[1:]:
+        if c not in out.columns:
+            out[c] = 0
+    out = out[COLUMNS].sort_values("dia").reset_index(drop=True)
+    ints = ["acoes", "voluntarios", "voluntarios_novos", "doacoes"]
+    out[ints] = out[ints].astype("int64")
+    return out, seen
+
+
+# ---------------------------------------------------------------------
+# Armazenamento
+# ---------------------------------------------------------------------
+class KpiStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.seen_path = _seen_path(path)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()  # um sync por vez (job e chamadas avulsas)
+        self._cached: Optional[pd.DataFrame] = None
+        self._cached_rev: Optional[tuple] = None
+        self._synced_version: Optional[str] = None
+
+    def _rev(self) -> Optional[tuple]:
+        try:
+            st_ = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st_.st_mtime_ns, st_.st_size
+
+    def revision(self) -> str:
+        """Muda sempre que a série é regravada (chave para caches de gráficos)."""
+        rev = self._rev()
+        return f"{rev[0]}:{rev[1]}" if rev else ""
+
+    def synced(self, version: Optional[str]) -> bool:
+        return version is not None and version == self._synced_version
+
+    def history(self) -> pd.DataFrame:
+        """
+        Série diária completa, relida do disco só quando o arquivo muda.
+        Compartilhada entre sessões: trate como somente leitura.
+        """
+        rev = self._rev()
+        with self._lock:
+            if self._cached is not None and rev == self._cached_rev:
+                return self._cached
+        if rev is None:
+            df = pd.DataFrame(columns=COLUMNS)
+        else:
+            df = pd.read_csv(self.path, parse_dates=["dia"])
+        with self._lock:
+            self._cached, self._cached_rev = df, rev
+        return df
+
+    def first_seen(self) -> pd.Series:
+        """Primeiro dia de atividade por voluntário (nome_norm -> dia)."""
+        if not os.path.exists(self.seen_path):
+            return pd.Series(dtype="datetime64[ns]")
+        df = pd.read_csv(self.seen_path, parse_dates=["dia"], dtype={"nome_norm": str},
+                         keep_default_na=False)
+        return df.set_index("nome_norm")["dia"]
+
+    @staticmethod
+    def _write(df: pd.DataFrame, path: str):
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=d, prefix=".kpis_", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            df.to_csv(f, index=False, date_format="%Y-%m-%d")
+        os.replace(tmp, path)
+
+    def sync(self, tables: Mapping[str, pd.DataFrame], version: Optional[str] = None) -> bool:
+        """
+        Recalcula os dias cobertos pelo snapshot e grava. Com `version`, o
+        mesmo snapshot só é processado uma vez. Devolve True se gravou.
+        """
+        with self._sync_lock:
+            if self.synced(version):
+                return False
+            novo, seen = daily_kpis(tables.get("acoes"), tables.get("doacoes"), self.first_seen())
+            if novo.empty:
+                return False
+            antigo = self.history()
+            if not antigo.empty:
+                # dias anteriores ao snapshot (já fora da planilha) ficam como estavam
+                antigo = antigo[antigo["dia"] < novo["dia"].min()]
+                novo = pd.concat([antigo, novo], ignore_index=True)
+            self._write(novo, self.path)
+            # depois da série: se cair no meio, o próximo sync refaz a mesma janela
+            self._write(seen.reset_index(), self.seen_path)
+            self._synced_version = version
+            return True
+
+
+_STORES: dict = {}
+_STORES_LOCK = threading.Lock()
+
+
+def kpi_store(secrets=None) -> KpiStore:
+    path = store_path(secrets)
+    with _STORES_LOCK:
+        store = _STORES.get(path)
+        if store is None:
+            store = _STORES[path] = KpiStore(path)
+    return store
+
+
+def sync_now() -> bool:
+    """
+    Lê o snapshot atual, atualiza a série e grava o snapshot no histórico
+    de versões (snapshots.py), que também só anda quando a versão muda.
+    """
+    from data import read_all_tables, snapshot_version
+    tables = read_all_tables()
+    version = snapshot_version(tables)
+    try:
+        snapshot_store().record(tables, version)
+    except Exception as e:  # histórico é acessório: não impede a série
+        _log.warning("[kpi_store] histórico de snapshots falhou: %s", e)
+    return kpi_store().sync(tables, version)
+
+
+# ---------------------------------------------------------------------
+# Job em segundo plano (um por processo)
+# ---------------------------------------------------------------------
+_JOB: Optional[threading.Thread] = None
+_JOB_LOCK = threading.Lock()
+_WAKE = threading.Event()
+
+
+def _loop(interval_s: float):
+    while True:
+        try:
+            sync_now()
+        except Exception as e:  # o job não pode morrer por uma falha de leitura
+            _log.warning("[kpi_store] sync falhou: %s", e)
+        _WAKE.wait(interval_s)
+        _WAKE.clear()
+
+
+def ensure_background_job(version: Optional[str] = None):
+    """
+    Garante o job de sync (daemon, um por processo). Com a versão do
+    snapshot em uso, acorda o job se ela ainda não entrou na série (ou no
+    histórico de snapshots) — sem bloquear quem chamou.
+    """
+    global _JOB
+    with _JOB_LOCK:
+        if _JOB is None or not _JOB.is_alive():
+            minutes = float(_config().get("refresh_minutes", DEFAULT_REFRESH_MINUTES))
+            _JOB = threading.Thread(target=_loop, args=(minutes * 60,), name="kpi-sync", daemon=True)
+            _JOB.start()
+            return
+    if version is not None and not (kpi_store().synced(version) and snapshot_store().synced(version)):
+        _WAKE.set()
+
+
+if __name__ == "__main__":
+    print("gravado" if sync_now() else "sem alterações", "→", store_path())
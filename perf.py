@@ -0,0 +1,117 @@
+# perf.py
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Tuple
+
+# Instrumentação leve: latências por etapa em ring buffers limitados
+# (memória constante) e os últimos reruns com a quebra por etapa.
+STAGE_BUFFER = 512
+RUN_BUFFER = 200
+
+_LOCK = threading.Lock()
+_STAGES: Dict[str, Deque[float]] = {}
+_RUNS: Deque[dict] = deque(maxlen=RUN_BUFFER)
+_local = threading.local()
+
+
+def record(stage: str, seconds: float):
+    with _LOCK:
+        buf = _STAGES.get(stage)
+        if buf is None:
+            buf = _STAGES[stage] = deque(maxlen=STAGE_BUFFER)
+        buf.append(seconds)
+    acc = getattr(_local, "run", None)
+    if acc is not None:
+        acc[stage] = acc.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str):
+    """`with timed("sheets.read"):` — mede o bloco e registra na etapa."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - t0)
+
+
+def instrument(stage: str):
+    """Decorator equivalente a envolver a função inteira em `timed(stage)`."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+@contextmanager
+def rerun(page: str, user: str = ""):
+    """Mede um rerun inteiro da página e guarda a quebra por etapa."""
+    prev = getattr(_local, "run", None)
+    _local.run = {}
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        total = time.perf_counter() - t0
+        stages, _local.run = _local.run, prev
+        record(f"page.{page}", total)
+        with _LOCK:
+            _RUNS.append({"ts": time.time(), "page": page, "user": user,
+                          "total_s": total, "stages": stages})
+
+
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def stage_stats() -> List[dict]:
+    """p50/p95/máx por etapa, sobre as amostras retidas no ring buffer."""
+    with _LOCK:
+        snap = {k: sorted(v) for k, v in _STAGES.items()}
+    out = []
+    for stage, vals in sorted(snap.items()):
+        out.append({
+            "stage": stage,
+            "n": len(vals),
+            "p50_ms": _percentile(vals, 0.50) * 1000,
+            "p95_ms": _percentile(vals, 0.95) * 1000,
+            "max_ms": vals[-1] * 1000 if vals else 0.0,
+        })
+    return out
+
+
+def histogram(stage: str, bounds_ms: Tuple[float, ...] = (10, 50, 100, 250, 500, 1000, 2500, 5000)) -> List[Tuple[str, int]]:
+    """Contagem por faixa de latência (ms) de uma etapa."""
+    with _LOCK:
+        vals = [v * 1000 for v in _STAGES.get(stage, ())]
+    edges = (0.0,) + tuple(bounds_ms)
+    out = []
+    for lo, hi in zip(edges, edges[1:]):
+        out.append((f"{lo:g}–{hi:g} ms", sum(1 for v in vals if lo <= v < hi)))
+    out.append((f"≥{edges[-1]:g} ms", sum(1 for v in vals if v >= edges[-1])))
+    return out
+
+
+def slowest_runs(n: int = 10) -> List[dict]:
+    with _LOCK:
+        runs = list(_RUNS)
+    return sorted(runs, key=lambda r: r["total_s"], reverse=True)[:n]
+
+
+def reset():
+    with _LOCK:
+        _STAGES.clear()
+        _RUNS.clear()
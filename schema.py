@@ -0,0 +1,186 @@
+# schema.py
+"""
+Registro de colunas: para cada aba, campo lógico -> apelidos de coluna.
+Os padrões abaixo cobrem as planilhas atuais; secrets pode sobrescrever
+(ou acrescentar) campos por aba:
+
+    [schema.acoes]
+    endereco = ["Endereço", "Local da ação"]
+    pessoas  = ["Pessoas impactadas", "*beneficiad*"]
+
+Apelidos são comparados com o nome da coluna normalizado (textnorm.norm:
+sem acento, minúsculas) e aceitam curingas do fnmatch ("frente*",
+"*pessoa*"). Para cada campo vale o primeiro apelido que casar; uma
+coluna atende a um único campo (na ordem de declaração).
+
+A resolução depende só dos nomes das colunas, então é feita uma vez por
+snapshot (read_all_tables já aquece) e as reexecuções só consultam o
+mapa. Campo obrigatório ausente ou apelido que casa com mais de uma coluna
+é relatado uma única vez (log + `issues()`, exibido no Admin).
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from textnorm import norm
+
+_LAT = ("lat", "latitude")
+_LON = ("lon", "lng", "longitude")
+
+DEFAULTS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "acoes": {
+        "data": ("data",),
+        "frente": ("frente de atuacao", "frente*"),
+        "status": ("status",),
+        "endereco": ("endereco", "endereco*", "*endereco*", "end*"),
+        "inicio": ("horario de inicio*", "*inicio"),
+        "termino": ("horario de termino*", "*termino"),
+        "pessoas": ("*pessoa*",),
+        "voluntarios": ("volunt*envolv*",),
+        "lat": _LAT,
+        "lon": _LON,
+    },
+    "voluntarios": {
+        "nome": ("nome", "nome completo"),
+        "genero": ("genero", "sexo"),
+        "lat": _LAT,
+        "lon": _LON,
+    },
+    "enderecos": {
+        "rua": ("rua", "logradouro"),
+        "numero": ("numero", "num", "n"),
+        "cidade": ("cidade", "municipio"),
+        "uf": ("uf", "estado"),
+        "lat": _LAT,
+        "lon": _LON,
+    },
+    "doacoes": {
+        "data": ("data*",),
+        "valor": ("*valor*",),
+        "forma_doacao": ("forma*",),
+        "tipo_doador": ("*tipo*doador*",),
+        "recorrente": ("recorr*",),
+    },
+}
+
+# Sem estes campos a aba perde o principal uso no app: ausência é relatada
+REQUIRED: Dict[str, Tuple[str, ...]] = {
+    "acoes": ("data", "endereco"),
+    "voluntarios": ("nome",),
+    "enderecos": ("rua", "lat", "lon"),
+    "doacoes": ("data", "valor"),
+}
+
+_log = logging.getLogger("cuida_sp.schema")
+
+
+class ColumnMap(NamedTuple):
+    """Colunas resolvidas de uma aba (somente leitura; compartilhado entre sessões)."""
+    table: str
+    columns: Dict[str, str]                  # campo lógico -> coluna real (só os encontrados)
+    missing: Tuple[str, ...]                 # obrigatórios não encontrados
+    ambiguous: Dict[str, Tuple[str, ...]]    # campo -> colunas que casaram com o mesmo apelido
+
+    def get(self, field: str, default=None) -> Optional[str]:
+        return self.columns.get(field, default)
+
+    def has(self, *fields: str) -> bool:
+        return all(f in self.columns for f in fields)
+
+    def renames(self, targets: Mapping[str, str], existing: Iterable = ()) -> Dict[str, str]:
+        """{coluna real: nome canônico} para `df.rename`, sem sobrescrever colunas existentes."""
+        existing = set(existing)
+        out = {}
+        for field, target in targets.items():
+            col = self.columns.get(field)
+            if col is not None and col != target and target not in existing:
+                out[col] = target
+        return out
+
+
+# ---------------------------------------------------------------------
+# Configuração (padrões + secrets)
+# ---------------------------------------------------------------------
+def _secrets_schema(secrets) -> Mapping:
+    if secrets is None:
+        try:
+            import streamlit as st
+            secrets = st.secrets
+            return dict(secrets.get("schema", {}) or {})
+        except Exception:  # sem secrets.toml: só os padrões
+            return {}
+    return dict((secrets or {}).get("schema", {}) or {})
+
+
+def spec(table: str, secrets=None) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    """((campo, apelidos normalizados), ...) da aba, já com os overrides de secrets."""
+    fields = dict(DEFAULTS.get(table, {}))
+    for field, aliases in dict(_secrets_schema(secrets).get(table, {}) or {}).items():
+        if isinstance(aliases, str):
+            aliases = [aliases]
+        fields[str(field)] = tuple(aliases)
+    return tuple((f, tuple(norm(a) for a in aliases)) for f, aliases in fields.items())
+
+
+# ---------------------------------------------------------------------
+# Resolução
+# ---------------------------------------------------------------------
+_REPORT_LOCK = threading.Lock()
+_REPORTED: Dict[tuple, dict] = {}
+
+
+def _report(table: str, field: str, problem: str, cols: Tuple[str, ...]):
+    key = (table, field, problem, cols)
+    with _REPORT_LOCK:
+        if key in _REPORTED:
+            return
+        _REPORTED[key] = {"aba": table, "campo": field, "problema": problem, "colunas": ", ".join(cols)}
+    _log.warning("[schema] %s.%s: %s (%s)", table, field, problem, ", ".join(cols) or "-")
+
+
+@lru_cache(maxsize=256)
+def _resolve(table: str, columns: Tuple, fields: Tuple[Tuple[str, Tuple[str, ...]], ...]) -> ColumnMap:
+    normed = [(c, norm(c)) for c in columns]
+    found: Dict[str, str] = {}
+    ambiguous: Dict[str, Tuple[str, ...]] = {}
+    taken = set()
+    for field, aliases in fields:
+        for alias in aliases:
+            hits = [c for c, n in normed if c not in taken and fnmatchcase(n, alias)]
+            if hits:
+                found[field] = hits[0]
+                taken.add(hits[0])
+                if len(hits) > 1:
+                    ambiguous[field] = tuple(str(h) for h in hits)
+                break
+    missing = tuple(f for f in REQUIRED.get(table, ()) if f not in found)
+    if columns:  # aba vazia/ausente já é tratada por quem a usa
+        for f in missing:
+            _report(table, f, "coluna não encontrada", tuple(str(c) for c in columns))
+        for f, hits in ambiguous.items():
+            _report(table, f, f"mais de uma coluna casou; usando '{found[f]}'", hits)
+    return ColumnMap(table, found, missing, ambiguous)
+
+
+def resolve(table: str, columns: Iterable, secrets=None) -> ColumnMap:
+    """Mapa de colunas da aba `table` para esses nomes de coluna (memoizado)."""
+    return _resolve(table, tuple(columns), spec(table, secrets))
+
+
+def columns_for(df, table: str) -> ColumnMap:
+    """Atalho para `resolve(table, df.columns)`."""
+    return resolve(table, df.columns)
+
+
+def resolve_all(tables: Mapping, secrets=None) -> Dict[str, ColumnMap]:
+    """Resolve todas as abas conhecidas de um snapshot (chamado na carga)."""
+    return {k: resolve(k, df.columns, secrets) for k, df in tables.items() if k in DEFAULTS}
+
+
+def issues() -> List[dict]:
+    with _REPORT_LOCK:
+        return list(_REPORTED.values())
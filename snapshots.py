@@ -0,0 +1,388 @@
+# snapshots.py
+"""
+Histórico das abas por snapshot. Cada snapshot novo é gravado como delta
+contra o anterior — linhas que entraram + chaves das linhas que saíram
+(linha alterada = sai a antiga, entra a nova) — e, a cada
+`checkpoint_every` versões, quando o delta passa de metade da aba ou quando
+as colunas mudam, como cópia completa (checkpoint). Recarga sem mudança
+não grava nada: o disco cresce com as alterações, não com os refreshes.
+
+    [snapshots]
+    dir = ".cuida_snapshots"
+    checkpoint_every = 30
+
+`as_of(quando)` parte do último checkpoint anterior à data e aplica só os
+deltas seguintes (no máximo `checkpoint_every - 1`). Linhas que
+permaneceram mantêm a ordem; as que entraram vão para o fim.
+
+Gravações são serializadas por uma trava de arquivo no diretório (o app e
+`python -m kpi_store` via cron podem gravar no mesmo histórico); sob a
+trava o índice é relido se mudou no disco.
+
+Layout em disco:
+    index.json                        entradas: seq, ts (UTC), tipo, por aba linhas/colunas/+/-
+    000042/<aba>.parquet|ndjson       checkpoint: linhas completas
+    000042/<aba>.keys.u64             checkpoint: chave de cada linha
+    000043/<aba>.add.parquet|ndjson   delta: linhas que entraram
+    000043/<aba>.add.u64              delta: chaves das que entraram
+    000043/<aba>.del.u64              delta: chaves que saíram
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from backup import row_keys, write_ndjson
+from export import pq, write_parquet
+
+# trava entre processos (app + `python -m kpi_store` no cron); só POSIX
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_log = logging.getLogger("cuida_sp.snapshots")
+
+DEFAULT_CHECKPOINT_EVERY = 30
+INDEX_NAME = "index.json"
+LOCK_NAME = ".lock"
+TZ = "America/Sao_Paulo"
+_FRAME_EXT = "parquet" if pq is not None else "ndjson"
+_MEMO_MAX = 4
+_EMPTY = np.empty(0, dtype=np.uint64)
+
+
+def _config(secrets=None) -> dict:
+    if secrets is None:
+        import streamlit as st
+        secrets = st.secrets
+    return dict((secrets or {}).get("snapshots", {}) or {})
+
+
+def _moment(when) -> pd.Timestamp:
+    """Instante (UTC) de `when`; uma data sem hora vale até o fim do dia local."""
+    ts = pd.Timestamp(when)
+    if isinstance(when, date) and not isinstance(when, datetime):
+        ts = ts + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize(TZ)
+    return ts.tz_convert("UTC")
+
+
+# ---------------------------------------------------------------------
+# Arquivos
+# ---------------------------------------------------------------------
+def _write_frame(df: pd.DataFrame, path: str):
+    with open(path, "wb") as f:
+        if pq is not None:
+            write_parquet(df, f)
+        else:
+            write_ndjson(df, f)
+
+
+def _read_frame(path: str, columns: List[str]) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    elif os.path.getsize(path):
+        df = pd.read_json(path, lines=True, orient="records", dtype=False)
+    else:
+        df = pd.DataFrame()
+    if len(df.columns) == len(columns):
+        df.columns = columns  # posicional: preserva nomes repetidos/não-texto
+    return df.reindex(columns=columns)
+
+
+def _read_keys(path: str) -> np.ndarray:
+    return np.fromfile(path, dtype=np.uint64) if os.path.exists(path) else _EMPTY
+
+
+class SnapshotStore:
+    def __init__(self, path: str, checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY):
+        self.path = path
+        self.checkpoint_every = max(1, int(checkpoint_every))
+        self._lock = threading.Lock()  # só para trocar índice/cabeça/memo publicados
+        self._write_lock = threading.Lock()  # um gravador por instância (o flock cobre processos)
+        self._entries: Optional[List[dict]] = None
+        self._index_rev: Optional[tuple] = None  # (mtime_ns, tamanho) do index.json lido
+        self._head: Optional[Dict[str, np.ndarray]] = None  # chaves do último snapshot gravado
+        self._recorded_version: Optional[str] = None
+        self._memo: "OrderedDict[tuple, Dict[str, pd.DataFrame]]" = OrderedDict()
+
+    # ------------------------------------------------------------------
+    # Índice
+    # ------------------------------------------------------------------
+    def _stat_index(self) -> Optional[tuple]:
+        try:
+            st_ = os.stat(os.path.join(self.path, INDEX_NAME))
+        except FileNotFoundError:
+            return None
+        return st_.st_mtime_ns, st_.st_size
+
+    def _index(self) -> List[dict]:
+        """Entradas do índice; relido quando outro processo regrava o arquivo."""
+        rev = self._stat_index()
+        if self._entries is None or rev != self._index_rev:
+            try:
+                with open(os.path.join(self.path, INDEX_NAME), encoding="utf-8") as f:
+                    self._entries = json.load(f).get("entries", [])
+            except (FileNotFoundError, ValueError):
+                self._entries = []
+            self._index_rev = rev
+            self._head = None  # a cabeça é refeita a partir do índice novo
+            self._memo.clear()
+        return self._entries
+
+    def _save_index(self, entries: List[dict]) -> Optional[tuple]:
+        """Grava o índice (atômico) e devolve a revisão do arquivo gravado."""
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=".index_", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": entries}, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(self.path, INDEX_NAME))
+        return self._stat_index()
+
+    @contextmanager
+    def _file_lock(self):
+        """Um gravador por diretório, também entre processos (flock)."""
+        os.makedirs(self.path, exist_ok=True)
+        fd = os.open(os.path.join(self.path, LOCK_NAME), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # fechar libera o flock
+
+    def _dir(self, seq: int) -> str:
+        return os.path.join(self.path, f"{seq:06d}")
+
+    def entries(self) -> List[dict]:
+        """Snapshots gravados (mais antigo primeiro); cópia rasa do índice."""
+        with self._lock:
+            return list(self._index())
+
+    def synced(self, version: Optional[str]) -> bool:
+        return version is not None and version == self._recorded_version
+
+    # ------------------------------------------------------------------
+    # Reconstrução
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _chain(entries: List[dict], seq: int) -> List[dict]:
+        """Último checkpoint até `seq` seguido dos deltas até `seq`."""
+        entries = [e for e in entries if e["seq"] <= seq]
+        start = max(i for i, e in enumerate(entries) if e["kind"] == "full")
+        return entries[start:]
+
+    def _keys_at(self, entries: List[dict], seq: int) -> Dict[str, np.ndarray]:
+        """Só as chaves (sem ler linhas) — cabeça do histórico ao abrir o processo."""
+        keys: Dict[str, np.ndarray] = {}
+        for e in self._chain(entries, seq):
+            d = self._dir(e["seq"])
+            keys = {k: v for k, v in keys.items() if k in e["tables"]}  # abas que sumiram
+            for key, t in e["tables"].items():
+                if e["kind"] == "full":
+                    keys[key] = _read_keys(os.path.join(d, f"{key}.keys.u64"))
+                    continue
+                cur = keys.get(key, _EMPTY)
+                if t["removed"]:
+                    cur = cur[~np.isin(cur, _read_keys(os.path.join(d, f"{key}.del.u64")))]
+                if t["added"]:
+                    cur = np.concatenate([cur, _read_keys(os.path.join(d, f"{key}.add.u64"))])
+                keys[key] = cur
+        return keys
+
+    def _tables_at(self, seq: int, only: Optional[frozenset]) -> Dict[str, pd.DataFrame]:
+        memo_key = (seq, only)
+        with self._lock:
+            hit = self._memo.get(memo_key)
+            if hit is not None:
+                self._memo.move_to_end(memo_key)
+                return {k: v.copy() for k, v in hit.items()}
+            chain = self._chain(self._index(), seq)
+
+        state: Dict[str, tuple] = {}  # aba -> (linhas, chaves)
+        for e in chain:
+            d = self._dir(e["seq"])
+            state = {k: v for k, v in state.items() if k in e["tables"]}  # abas que sumiram
+            for key, t in e["tables"].items():
+                if only is not None and key not in only:
+                    continue
+                if e["kind"] == "full":
+                    state[key] = (_read_frame(os.path.join(d, f"{key}.{e['format']}"), t["columns"]),
+                                  _read_keys(os.path.join(d, f"{key}.keys.u64")))
+                    continue
+                if not (t["added"] or t["removed"]):
+                    continue
+                df, keys = state.get(key, (pd.DataFrame(columns=t["columns"]), _EMPTY))
+                if t["removed"]:
+                    keep = ~np.isin(keys, _read_keys(os.path.join(d, f"{key}.del.u64")))
+                    df, keys = df[keep], keys[keep]
+                if t["added"]:
+                    add = _read_frame(os.path.join(d, f"{key}.add.{e['format']}"), t["columns"])
+                    df = pd.concat([df, add], ignore_index=True)
+                    keys = np.concatenate([keys, _read_keys(os.path.join(d, f"{key}.add.u64"))])
+                state[key] = (df, keys)
+
+        last = chain[-1]
+        out = {}
+        for key, t in last["tables"].items():
+            if only is not None and key not in only:
+                continue
+            df = state.get(key, (pd.DataFrame(columns=t["columns"]),))[0]
+            out[key] = df.reindex(columns=t["columns"]).reset_index(drop=True)
+        with self._lock:
+            self._memo[memo_key] = out
+            while len(self._memo) > _MEMO_MAX:
+                self._memo.popitem(last=False)
+        return {k: v.copy() for k, v in out.items()}
+
+    def entry_at(self, when) -> Optional[dict]:
+        """Último snapshot gravado até `when` (data, datetime ou texto ISO)."""
+        limit = _moment(when)
+        found = None
+        for e in self.entries():
+            if pd.Timestamp(e["ts"]) > limit:
+                break
+            found = e
+        return found
+
+    def as_of(self, when, tables: Optional[Iterable[str]] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Abas como estavam em `when` ({} se não há histórico até lá). Com
+        `tables`, reconstrói só essas abas.
+        """
+        e = self.entry_at(when)
+        if e is None:
+            return {}
+        return self._tables_at(e["seq"], frozenset(tables) if tables is not None else None)
+
+    # ------------------------------------------------------------------
+    # Gravação
+    # ------------------------------------------------------------------
+    def record(self, tables: Mapping[str, pd.DataFrame], version: Optional[str] = None,
+               when: Optional[datetime] = None) -> Optional[int]:
+        """
+        Grava o snapshot como delta (ou checkpoint). Com `version`, o mesmo
+        snapshot só é processado uma vez. Devolve o seq gravado, ou None se
+        nada mudou.
+        """
+        tables = {k: df for k, df in tables.items() if isinstance(df, pd.DataFrame)}
+        # hash, arquivos e índice só sob as travas de gravação; `self._lock`
+        # fica para as trocas de estado, e leitores não esperam a gravação
+        with self._write_lock, self._file_lock():
+            if self.synced(version):
+                return None
+            # sob o flock: relê o índice (e refaz a cabeça) se outro processo gravou
+            with self._lock:
+                entries = list(self._index())
+                head = self._head
+            last = entries[-1] if entries else None
+            if head is None:
+                head = self._keys_at(entries, last["seq"]) if last else {}
+
+            keys = {k: row_keys(df) for k, df in tables.items()}
+            info: Dict[str, dict] = {}
+            masks: Dict[str, np.ndarray] = {}
+            removed: Dict[str, np.ndarray] = {}
+            full = last is None
+            for key, df in tables.items():
+                cur, prev = keys[key], head.get(key, _EMPTY)
+                masks[key] = ~np.isin(cur, prev)
+                removed[key] = prev[~np.isin(prev, cur)]
+                columns = [str(c) for c in df.columns]
+                if last is None or last["tables"].get(key, {}).get("columns") != columns:
+                    full = True
+                info[key] = {"rows": int(len(df)), "columns": columns,
+                             "added": int(masks[key].sum()), "removed": int(len(removed[key]))}
+            dropped = set(head) - set(tables)
+
+            changes = sum(t["added"] + t["removed"] for t in info.values())
+            if not full and not changes and not dropped:
+                with self._lock:
+                    self._head = head
+                    self._recorded_version = version
+                return None
+            since = 0
+            for e in reversed(entries):
+                if e["kind"] == "full":
+                    break
+                since += 1
+            rows = sum(t["rows"] for t in info.values())
+            if since + 1 >= self.checkpoint_every or changes * 2 > rows:
+                full = True
+
+            seq = last["seq"] + 1 if last else 1
+            d = self._dir(seq)
+            os.makedirs(d, exist_ok=True)
+            for key, df in tables.items():
+                if full:
+                    _write_frame(df, os.path.join(d, f"{key}.{_FRAME_EXT}"))
+                    keys[key].tofile(os.path.join(d, f"{key}.keys.u64"))
+                    continue
+                if info[key]["added"]:
+                    _write_frame(df[masks[key]], os.path.join(d, f"{key}.add.{_FRAME_EXT}"))
+                    keys[key][masks[key]].tofile(os.path.join(d, f"{key}.add.u64"))
+                if info[key]["removed"]:
+                    removed[key].tofile(os.path.join(d, f"{key}.del.u64"))
+
+            stamp = (when or datetime.now(timezone.utc)).astimezone(timezone.utc)
+            entries.append({
+                "seq": seq,
+                "ts": stamp.isoformat(),
+                "kind": "full" if full else "delta",
+                "format": _FRAME_EXT,
+                "snapshot": version,
+                "tables": info,
+            })
+            rev = self._save_index(entries)
+            with self._lock:
+                self._entries, self._index_rev = entries, rev
+                self._head = keys
+                self._recorded_version = version
+        _log.info("[snapshots] #%d gravado (%s, %d alterações)", seq, "checkpoint" if full else "delta", changes)
+        return seq
+
+    def stats(self) -> dict:
+        entries = self.entries()
+        size = 0
+        for root, _, files in os.walk(self.path):
+            size += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+        return {
+            "snapshots": len(entries),
+            "checkpoints": sum(e["kind"] == "full" for e in entries),
+            "first": entries[0]["ts"] if entries else None,
+            "last": entries[-1]["ts"] if entries else None,
+            "bytes": size,
+            "path": self.path,
+        }
+
+
+_STORES: Dict[str, SnapshotStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def snapshot_store(secrets=None) -> SnapshotStore:
+    cfg = _config(secrets)
+    path = cfg.get("dir", ".cuida_snapshots")
+    with _STORES_LOCK:
+        store = _STORES.get(path)
+        if store is None:
+            store = _STORES[path] = SnapshotStore(
+                path, cfg.get("checkpoint_every", DEFAULT_CHECKPOINT_EVERY))
+    return store
+
+
+def as_of(when, tables: Optional[Iterable[str]] = None) -> Dict[str, pd.DataFrame]:
+    """Atalho para `snapshot_store().as_of(...)`."""
+    return snapshot_store().as_of(when, tables)
@@ -0,0 +1,182 @@
+# storage.py
+"""
+Backends de armazenamento. Padrão: Google (gspread + Drive). Para rodar
+sem credenciais/rede (desenvolvimento, profiling, testes de carga), use
+pastas locais via secrets:
+
+    [storage]
+    backend = "local"
+    sheets_dir = "local_data/sheets"      # uma aba por arquivo: <aba>.csv ou <aba>.parquet
+    users_file = "local_data/users.enc"   # YAML de usuários criptografado (Fernet)
+
+Os objetos locais imitam só o que o app usa das APIs do Google:
+planilha (`worksheet`, `worksheets`, `revision` no lugar do modifiedTime
+do Drive), aba (`title`, `get_all_values`, `row_count`, `get` por faixa
+de linhas) e arquivo de usuários (bytes + metadados no formato do Drive).
+"""
+from __future__ import annotations
+
+import csv
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import List, Mapping, Optional, Tuple
+
+SHEET_EXTS = (".csv", ".parquet")
+
+
+def storage_config(secrets: Mapping) -> dict:
+    return dict((secrets or {}).get("storage", {}) or {})
+
+
+def is_local(secrets: Mapping) -> bool:
+    return str(storage_config(secrets).get("backend", "google")).strip().lower() == "local"
+
+
+# ---------------------------------------------------------------------
+# Planilha: pasta com um arquivo por aba
+# ---------------------------------------------------------------------
+_A1_ROWS = re.compile(r"^(?:.*!)?[A-Za-z]*(\d+):[A-Za-z]*(\d+)$")
+
+
+def a1_row_span(range_name: str) -> Tuple[int, int]:
+    """'5001:10000' / 'A5001:H10000' / "'Aba'!1:500" -> (início, fim), 1-based e inclusivo."""
+    m = _A1_ROWS.match(range_name.strip())
+    if not m:
+        raise ValueError(f"Faixa A1 não suportada: {range_name}")
+    return int(m.group(1)), int(m.group(2))
+
+
+class LocalWorksheet:
+    def __init__(self, path: str):
+        self.path = path
+        self.title = os.path.splitext(os.path.basename(path))[0]
+        self._rows: Optional[List[List[str]]] = None
+
+    def get_all_values(self) -> List[List[str]]:
+        """Mesmo formato do gspread: lista de linhas de texto, cabeçalho incluso."""
+        if self.path.endswith(".parquet"):
+            import pandas as pd
+            df = pd.read_parquet(self.path)
+            body = df.astype(str).where(df.notna(), "").to_numpy().tolist()
+            return [[str(c) for c in df.columns]] + body
+        with open(self.path, newline="", encoding="utf-8-sig") as f:
+            return [row for row in csv.reader(f)]
+
+    # leitura por faixas (data.iter_ws_chunks): o arquivo é lido uma vez por objeto
+    def _all(self) -> List[List[str]]:
+        if self._rows is None:
+            self._rows = self.get_all_values()
+        return self._rows
+
+    @property
+    def row_count(self) -> int:
+        return len(self._all())
+
+    def get(self, range_name: str, **kwargs) -> List[List[str]]:
+        start, end = a1_row_span(range_name)
+        return [list(r) for r in self._all()[start - 1:end]]
+
+
+class LocalSpreadsheet:
+    def __init__(self, folder: str, title: str = "Cuida SP - Database"):
+        self.folder = folder
+        self.title = title
+
+    def worksheets(self) -> List[LocalWorksheet]:
+        if not os.path.isdir(self.folder):
+            return []
+        return [LocalWorksheet(os.path.join(self.folder, f))
+                for f in sorted(os.listdir(self.folder)) if f.endswith(SHEET_EXTS)]
+
+    def worksheet(self, title: str) -> LocalWorksheet:
+        for ext in SHEET_EXTS:
+            p = os.path.join(self.folder, title + ext)
+            if os.path.exists(p):
+                return LocalWorksheet(p)
+        raise FileNotFoundError(f"Aba '{title}' não encontrada em {self.folder}")
+
+    def revision(self, title: str) -> Optional[str]:
+        """Revisão da aba (mtime + tamanho do arquivo), no lugar do modifiedTime do Drive."""
+        for ext in SHEET_EXTS:
+            try:
+                st_ = os.stat(os.path.join(self.folder, title + ext))
+            except FileNotFoundError:
+                continue
+            return f"{st_.st_mtime_ns}:{st_.st_size}"
+        return None
+
+
+def write_sheet_folder(tables: Mapping[str, List[List[str]]], folder: str, fmt: str = "csv"):
+    """Grava {aba: linhas (com cabeçalho)} numa pasta lida por LocalSpreadsheet."""
+    os.makedirs(folder, exist_ok=True)
+    for title, rows in tables.items():
+        if fmt == "parquet":
+            import pandas as pd
+            header, body = (rows[0], rows[1:]) if rows else ([], [])
+            pd.DataFrame(body, columns=header).to_parquet(os.path.join(folder, f"{title}.parquet"), index=False)
+        else:
+            with open(os.path.join(folder, f"{title}.csv"), "w", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows(rows)
+
+
+# ---------------------------------------------------------------------
+# Arquivo de usuários (substitui o YAML no Drive)
+# ---------------------------------------------------------------------
+class LocalUsersFile:
+    # um lock por caminho: várias sessões no mesmo processo gravam o mesmo arquivo
+    _locks: dict = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        with self._locks_guard:
+            self._lock = self._locks.setdefault(self.path, threading.Lock())
+
+    def download(self) -> bytes:
+        try:
+            with open(self.path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return b""
+
+    def upload(self, data: bytes) -> dict:
+        """Grava de forma atômica (tmp + rename) e devolve os metadados."""
+        d = os.path.dirname(self.path)
+        os.makedirs(d, exist_ok=True)
+        with self._lock:
+            fd, tmp = tempfile.mkstemp(dir=d, prefix=".users_", suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+            return self.metadata()
+
+    def metadata(self) -> dict:
+        """Mesmos campos (e tipos) que o Drive devolve em files().get."""
+        try:
+            st_ = os.stat(self.path)
+        except FileNotFoundError:
+            return {"id": self.path, "size": "0", "version": "0", "modifiedTime": None}
+        mod = datetime.fromtimestamp(st_.st_mtime, timezone.utc)
+        return {
+            "id": self.path,
+            "size": str(st_.st_size),
+            "version": str(st_.st_mtime_ns),
+            "modifiedTime": mod.isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+        }
+
+
+def local_spreadsheet(secrets: Mapping) -> Optional[LocalSpreadsheet]:
+    """Planilha local quando backend = "local"; None no modo Google."""
+    if not is_local(secrets):
+        return None
+    return LocalSpreadsheet(storage_config(secrets).get("sheets_dir", os.path.join("local_data", "sheets")))
+
+
+def local_users_file(secrets: Mapping) -> Optional[LocalUsersFile]:
+    """Arquivo de usuários local quando backend = "local"; None no modo Google."""
+    if not is_local(secrets):
+        return None
+    return LocalUsersFile(storage_config(secrets).get("users_file", os.path.join("local_data", "users.enc")))
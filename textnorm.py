@@ -0,0 +1,121 @@
+# textnorm.py
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+# Normalização única de texto do app: sem acento, minúsculas, espaços simples.
+# Caminho escalar com LRU (nomes de coluna, endereços, termos de busca) e
+# caminho de coluna que normaliza cada valor distinto uma única vez.
+MAX_CACHED = 65_536
+# até aqui o caminho de coluna usa (e aquece) o LRU; acima disso ocuparia
+# boa parte do cache e expulsaria as chaves escalares
+_SERIES_LRU_MAX = MAX_CACHED // 4
+
+
+def _fold(s: str) -> str:
+    # NFKD separa os acentos; encode ascii/ignore os descarta (e qualquer
+    # outro caractere não-ASCII) — tudo em C, uma passada por valor
+    return " ".join(unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii").lower().split())
+
+
+_norm_cached = lru_cache(maxsize=MAX_CACHED)(_fold)
+
+
+def norm(s) -> str:
+    """'  São   Paulo ' -> 'sao paulo'. None -> ''."""
+    if s is None:
+        return ""
+    return _norm_cached(s if isinstance(s, str) else str(s))
+
+
+def norm_series(s: pd.Series) -> pd.Series:
+    """
+    Versão de coluna de `norm` (mesmo resultado, mesmo índice): fatoriza e
+    normaliza só os valores distintos, depois expande pelos códigos.
+    """
+    codes, uniques = pd.factorize(s.astype(str))
+    fold = _norm_cached if len(uniques) <= _SERIES_LRU_MAX else _fold
+    folded = np.array([fold(u) for u in uniques], dtype=object)
+    return pd.Series(folded[codes], index=s.index)
+
+
+# ---------------------------------------------------------------------
+# Endereços
+# ---------------------------------------------------------------------
+_PREFIXES = {"rua", "r", "avenida", "av", "praca", "alameda", "al", "travessa", "tv",
+             "estrada", "est", "rodovia", "rod", "largo"}
+_CONNECTORS = {"de", "da", "do", "das", "dos"}
+_PUNCT_RE = re.compile(r"[^\w\s]")
+# número no fim: "rua x, 123" / "rua x 123" / "rua x, n 123" (não pega "rua 25 de marco")
+_NUM_RE = re.compile(r"^(.*?)[,\s]+(?:n\.?\s*|no\.?\s*|numero\s*)?(\d{1,6})\s*$")
+
+
+@lru_cache(maxsize=MAX_CACHED)
+def street_core(s: str) -> str:
+    """'R. da Consolação' -> 'consolacao' (sem acento, tipo de logradouro e conectivos)."""
+    parts = _PUNCT_RE.sub(" ", norm(s)).split()
+    if parts and parts[0] in _PREFIXES:
+        parts = parts[1:]
+    return " ".join(p for p in parts if p not in _CONNECTORS)
+
+
+def _split_normed(txt: str) -> Tuple[str, str]:
+    m = _NUM_RE.match(txt)
+    if m:
+        return street_core(m.group(1)), m.group(2).lstrip("0") or "0"
+    return street_core(txt), ""
+
+
+@lru_cache(maxsize=MAX_CACHED)
+def split_address(s: str) -> Tuple[str, str]:
+    """'Rua Augusta, 123' -> ('augusta', '123'); sem número -> (rua, '')."""
+    return _split_normed(norm(s))
+
+
+def split_address_series(s: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """Versão de coluna de `split_address`: (ruas canônicas, números)."""
+    codes, uniques = pd.factorize(s.astype(str))
+    if len(uniques) <= _SERIES_LRU_MAX:
+        pairs = [split_address(u) for u in uniques]
+    else:
+        pairs = [_split_normed(t) for t in norm_series(pd.Series(uniques, dtype=object))]
+    ruas = np.array([p[0] for p in pairs], dtype=object)
+    nums = np.array([p[1] for p in pairs], dtype=object)
+    return pd.Series(ruas[codes], index=s.index), pd.Series(nums[codes], index=s.index)
+
+
+# ---------------------------------------------------------------------
+# Busca livre
+# ---------------------------------------------------------------------
+def search_mask(df: pd.DataFrame, q: str) -> pd.Series:
+    """
+    True nas linhas em que alguma coluna contém `q`, ignorando acento e
+    caixa (texto literal, não regex). Alinhada ao índice de `df`.
+    """
+    key = norm(q)
+    if not key:
+        return pd.Series(True, index=df.index)
+    mask = np.zeros(len(df), dtype=bool)
+    for c in df.columns:
+        todo = np.flatnonzero(~mask)  # só linhas que ainda não casaram
+        if not len(todo):
+            break
+        codes, uniques = pd.factorize(df[c].iloc[todo])
+        if len(uniques) == 0:
+            continue
+        hit = np.fromiter((key in v for v in norm_series(pd.Series(uniques, dtype=object))),
+                          dtype=bool, count=len(uniques))
+        mask[todo] = (codes >= 0) & hit[codes]
+    return pd.Series(mask, index=df.index)
+
+
+def cache_info() -> dict:
+    return {"norm": _norm_cached.cache_info()._asdict(),
+            "street_core": street_core.cache_info()._asdict(),
+            "split_address": split_address.cache_info()._asdict()}
@@ -2,7 +2,6 @@
 from __future__ import annotations
 
 import re
-import unicodedata
 from typing import Dict, List, Tuple
 
 import altair as alt
@@ -13,7 +12,26 @@ import streamlit as st
 from db import get_month_access_count
 
 # Importa dados
-from data import read_all_tables
+from data import (
+    read_all_tables, snapshot_version, enum_options,
+    invalidate_tables, refresh_source, source_names, source_status,
+)
+from fig_cache import cached_figure
+import perf
+from export import FORMATS as EXPORT_FORMATS, deferred_export
+from backup import FORMATS as BACKUP_FORMATS, build_backup, read_manifest
+from geo import cluster_points, MAX_MARKERS
+from districts import district_layer, zoom_for_extent
+from geocache import geocode_cache
+from kpi_store import ensure_background_job as ensure_kpi_job, kpi_store
+from schema import columns_for, issues as schema_issues
+from snapshots import snapshot_store
+from textnorm import search_mask
+from analytics import (
+    volunteer_bridge, unique_volunteers, volunteer_stats, action_hours,
+    explode_volunteers, column_profile,
+    donations_cube, slice_cube, rollup,
+)
 
 # Importa UI components (nova sidebar + componentes já usados)
 from ui_components import (
@@ -33,7 +51,7 @@ import bcrypt
 import plotly.io as pio
 pio.templates.default = None  # desativa template global que pode esconder o geo
 
-from db import get_recent_logs
+from db import get_recent_logs, get_log_summary
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
@@ -70,12 +88,9 @@ def _tighten_top_spacing(padding_top_px: int = 8):
     )
 
 
-def _norm_text(s: str) -> str:
-    """Normaliza texto para comparação."""
-    if s is None:
-        return ""
-    s0 = unicodedata.normalize("NFKD", str(s)).encode("ASCII", "ignore").decode("ASCII")
-    return " ".join(s0.lower().strip().split())
+def _map_max_markers() -> int:
+    """Teto de marcadores por mapa (configurável em secrets: app.map_max_markers)."""
+    return int(st.secrets.get("app", {}).get("map_max_markers", MAX_MARKERS))
 
 def _style_geo(fig, title: str, height: int = 520):
     fig.update_geos(
@@ -99,16 +114,10 @@ def _style_geo(fig, title: str, height: int = 520):
 # ---------------------------------------------------------------------
 # ======= GEO HELPERS (limpeza de coordenadas e join com enderecos) ===
 # ---------------------------------------------------------------------
-def _pick_latlon(df_src: pd.DataFrame) -> Tuple[str, str]:
-    """Encontra colunas de latitude e longitude pelo nome."""
-    lat_col = lon_col = None
-    for c in df_src.columns:
-        cl = _norm_text(c)
-        if cl in ("lat", "latitude"):
-            lat_col = c
-        if cl in ("lon", "lng", "longitude"):
-            lon_col = c
-    return lat_col, lon_col
+def _pick_latlon(df_src: pd.DataFrame, table: str = "acoes") -> Tuple[str, str]:
+    """Colunas de latitude e longitude da aba (registro de colunas)."""
+    cols = columns_for(df_src, table)
+    return cols.get("lat"), cols.get("lon")
 
 
 def _clean_coord(x) -> float:
@@ -176,48 +185,12 @@ def _prepare_volunteer_map_data(volunt: pd.DataFrame, v_lat: str, v_lon: str) ->
     return vmap_df.groupby(["lat", "lon"], as_index=False).size().rename(columns={"size": "vol_count"})
 
 
-def _parse_endereco_livre(s: str) -> Tuple[str, str]:
-    """Extrai rua e número de um endereço livre."""
-    if not s:
-        return ("", "")
-    txt = _norm_text(s)
-    # pega o último número da string
-    m = re.search(r"(\d{1,6})(?!.*\d)", txt)
-    numero = m.group(1) if m else ""
-    rua = txt if not numero else txt[:m.start()].strip()
-    return (rua, numero)
-
-
-# --- Helpers p/ normalização de textos de endereço ---
-import unicodedata, re
-
-def _strip_accents(s: str) -> str:
-    if s is None:
-        return ""
-    return unicodedata.normalize("NFKD", str(s)).encode("ASCII", "ignore").decode("ASCII")
-
-def _norm_key(s: str) -> str:
-    s = _strip_accents(s).lower().strip()
-    s = re.sub(r"\s+", " ", s)
-    return s
-
-def _split_endereco_livre(s: str) -> tuple[str, str]:
-    """
-    Tenta separar 'Rua/Nome, 123' em (rua, numero).
-    Se não achar número, volta (rua, "").
-    """
-    txt = _norm_key(s)
-    if not txt:
-        return ("", "")
-    m = re.search(r"(\d{1,6})(?!.*\d)", txt)
-    numero = m.group(1) if m else ""
-    rua = txt if not numero else txt[:m.start()].strip()
-    return (rua, numero)
-
+@perf.instrument("geo.resolve_coords_for_acoes")
 def _resolve_coords_for_acoes(df_acoes: pd.DataFrame, df_end: pd.DataFrame) -> pd.DataFrame:
     """
     Se 'Ações' já tiver colunas de latitude/longitude, usa diretamente (com normalização).
-    Caso contrário, cruza AÇÕES['Endereço'] com DIM_ENDERECOS['Rua'] para obter lat/lon.
+    Caso contrário, resolve AÇÕES['Endereço'] pelo cache de geocodificação
+    (geocache.py), que guarda Dim_enderecos e o gazetteer local por rua/número.
     """
     if df_acoes is None or df_acoes.empty:
         return pd.DataFrame()
@@ -231,78 +204,31 @@ def _resolve_coords_for_acoes(df_acoes: pd.DataFrame, df_end: pd.DataFrame) -> p
         out = out.dropna(subset=["lat", "lon"])
         return out
 
-    # 2) Fallback: cruzar Endereço (Ações) ↔ Rua (Dim_enderecos)
-    if df_end is None or df_end.empty:
-        return pd.DataFrame()
-
-    end_acao_col = next((c for c in df_acoes.columns if _norm_text(c) in ("endereco", "endereço")), None)
-    rua_dim_col  = next((c for c in df_end.columns    if _norm_text(c) in ("rua", "logradouro")), None)
-    if not end_acao_col or not rua_dim_col:
+    # 2) Fallback: Endereço (Ações) -> cache de geocodificação persistente,
+    #    alimentado por Dim_enderecos (uma vez por snapshot) e pelo gazetteer local
+    end_acao_col = columns_for(df_acoes, "acoes").get("endereco")
+    if not end_acao_col:
         return pd.DataFrame()
 
-    e_lat, e_lon = _pick_latlon(df_end)
-    if not e_lat or not e_lon:
-        return pd.DataFrame()
-
-    dim = df_end.copy()
-    dim[e_lat] = dim[e_lat].apply(_clean_coord)
-    dim[e_lon] = dim[e_lon].apply(_clean_coord)
-    dim = dim.dropna(subset=[e_lat, e_lon]).copy()
-
-    def _street_core(s: str) -> str:
-        s = _norm_text(s)
-        prefixes = ("rua", "r", "avenida", "av", "praça", "praca", "alameda", "travessa", "estrada", "rodovia")
-        parts = s.split()
-        if parts and parts[0] in prefixes:
-            parts = parts[1:]
-        parts = [p for p in parts if p not in ("de", "da", "do", "das", "dos")]
-        return " ".join(parts).strip()
-
-    dim["rua_key"]  = dim[rua_dim_col].astype(str).map(_norm_text)
-    dim["rua_core"] = dim[rua_dim_col].astype(str).map(_street_core)
-
-    a = df_acoes.copy()
-    a["rua_key"]  = a[end_acao_col].astype(str).map(_norm_text)
-    a["rua_core"] = a[end_acao_col].astype(str).map(_street_core)
-
-    # 2.1) Match exato por rua_key
-    m1 = a.merge(dim[["rua_key", e_lat, e_lon]].drop_duplicates("rua_key"), on="rua_key", how="left")
-    if m1[[e_lat, e_lon]].notna().any(axis=None):
-        out = m1.rename(columns={e_lat: "lat", e_lon: "lon"})
-        out["lat"] = out["lat"].apply(_clean_coord)
-        out["lon"] = out["lon"].apply(_clean_coord)
-        return out.dropna(subset=["lat", "lon"])
-
-    # 2.2) Match exato por rua_core
-    m2 = a.merge(dim[["rua_core", e_lat, e_lon]].drop_duplicates("rua_core"), on="rua_core", how="left")
-    if m2[[e_lat, e_lon]].notna().any(axis=None):
-        out = m2.rename(columns={e_lat: "lat", e_lon: "lon"})
-        out["lat"] = out["lat"].apply(_clean_coord)
-        out["lon"] = out["lon"].apply(_clean_coord)
-        return out.dropna(subset=["lat", "lon"])
-
-    # 2.3) Fallback 'contains' no núcleo da rua
-    dim_map = (
-        dim[["rua_core", e_lat, e_lon]]
-        .dropna()
-        .drop_duplicates("rua_core")
-        .set_index("rua_core")
-        .to_dict(orient="index")
-    )
-
-    def _match_contains(core: str):
-        if not core:
-            return (np.nan, np.nan)
-        for k, v in dim_map.items():
-            if core in k or k in core:
-                return (v[e_lat], v[e_lon])
-        return (np.nan, np.nan)
+    cache = geocode_cache()
+    if df_end is not None and not df_end.empty:
+        end_cols = columns_for(df_end, "enderecos")
+        rua_dim_col, num_dim_col = end_cols.get("rua"), end_cols.get("numero")
+        e_lat, e_lon = _pick_latlon(df_end, "enderecos")
+        token = df_end.attrs.get("snapshot_version")
+        if rua_dim_col and e_lat and e_lon and not cache.seeded("dim", token):
+            cache.seed(
+                df_end[rua_dim_col],
+                df_end[num_dim_col] if num_dim_col else None,
+                df_end[e_lat].apply(_clean_coord),
+                df_end[e_lon].apply(_clean_coord),
+                source="dim",
+                token=token,
+            )
 
-    miss = a.copy()
-    miss["lat"], miss["lon"] = zip(*miss["rua_core"].map(_match_contains))
-    miss["lat"] = miss["lat"].apply(_clean_coord)
-    miss["lon"] = miss["lon"].apply(_clean_coord)
-    return miss.dropna(subset=["lat", "lon"])
+    out = df_acoes.copy()
+    out["lat"], out["lon"] = cache.lookup(out[end_acao_col])
+    return out.dropna(subset=["lat", "lon"])
 
 def _prepare_actions_map_data(df_geo: pd.DataFrame, a_lat: str, a_lon: str) -> pd.DataFrame:
     """Agrupa ações por lat/lon e conta."""
@@ -450,36 +376,84 @@ def _render_kpi_panel(v_horas: str, v_acoes: str, v_pess: str, v_vol: str,
 
 # -----------------------------------------------------------------
 # ------------------------------------------------------------------
-def _render_kpi_panel_hist(v_kits: str, v_cri: str):
+def _render_kpi_panel_hist(items: List[Tuple[str, str, str]]):
     """
-    Painel de 2 KPIs (kits & crianças) usando o MESMO CSS do painel principal.
+    Painel de KPIs históricos (título, valor, legenda) usando o MESMO CSS do painel principal.
     """
-    # Reaproveita a mesma folha de estilos — só muda a grade para 2 colunas
-    st.markdown("""
+    # Reaproveita a mesma folha de estilos — só muda a grade para o nº de cards
+    st.markdown(f"""
     <style>
-      .kpi-panel-hist .kpi-grid { grid-template-columns:repeat(2,1fr); }
+      .kpi-panel-hist .kpi-grid {{ grid-template-columns:repeat({len(items)},1fr); }}
     </style>
     """, unsafe_allow_html=True)
 
+    cards = "".join(f"""
+        <div class="kpi-card">
+          <div class="kpi-title">{title}</div>
+          <div class="kpi-value">{value}</div>
+          <div class="kpi-sub">{sub}</div>
+        </div>""" for title, value, sub in items)
     html = f"""
     <div class="kpi-panel kpi-panel-hist">
-      <div class="kpi-grid">
-        <div class="kpi-card">
-          <div class="kpi-title">Kits entregues (desde 2021)</div>
-          <div class="kpi-value">{v_kits}</div>
-          <div class="kpi-sub">kits</div>
-        </div>
-        <div class="kpi-card">
-          <div class="kpi-title">Crianças atendidas (desde 2021)</div>
-          <div class="kpi-value">{v_cri}</div>
-          <div class="kpi-sub">crianças</div>
-        </div>
+      <div class="kpi-grid">{cards}
       </div>
     </div>
     """
     st.markdown(html, unsafe_allow_html=True)
 
 
+def _hist_items(hist: pd.DataFrame) -> List[Tuple[str, str, str]]:
+    """Totais acumulados da série diária de KPIs (kpi_store)."""
+    desde = f"desde {hist['dia'].min():%m/%Y}"
+
+    def _n(v):
+        return f"{v:,.0f}".replace(",", ".")
+    return [
+        ("Horas de voluntariado", _n(hist["horas"].sum()), desde),
+        ("Ações realizadas", _n(hist["acoes"].sum()), desde),
+        ("Pessoas impactadas", _n(hist["pessoas"].sum()), desde),
+        ("Voluntários engajados", _n(hist["voluntarios_novos"].sum()), desde),
+        ("Doações recebidas", _fmt_brl(hist["doacoes_valor"].sum()), f"{_n(hist['doacoes'].sum())} doações {desde}"),
+    ]
+
+
+_HIST_METRICS = {
+    "horas": "Horas de voluntariado",
+    "acoes": "Ações",
+    "pessoas": "Pessoas impactadas",
+    "voluntarios_novos": "Novos voluntários",
+    "doacoes_valor": "Doações (R$)",
+}
+
+
+def _build_hist_chart(hist: pd.DataFrame, metric: str):
+    serie = (
+        hist.assign(mes=hist["dia"].dt.to_period("M").dt.to_timestamp())
+        .groupby("mes", as_index=False)[metric].sum()
+    )
+    if serie.empty:
+        return None
+    return alt.Chart(serie).mark_line(
+        point=alt.OverlayMarkDef(filled=True, size=60),
+        strokeWidth=3,
+        color=COLORS["primary"]
+    ).encode(
+        x=alt.X("mes:T", title="Mês", axis=alt.Axis(format="%b %Y")),
+        y=alt.Y(f"{metric}:Q", title=_HIST_METRICS[metric]),
+        tooltip=["mes:T", f"{metric}:Q"]
+    ).properties(height=260)
+
+
+@st.fragment
+def _dash_history_fragment(revision: str, hist: pd.DataFrame):
+    """Tendência mensal a partir da série diária — trocar a métrica só reexecuta aqui."""
+    metric = st.selectbox("Tendência", list(_HIST_METRICS), format_func=_HIST_METRICS.get, key="dash_hist_metric")
+    chart = cached_figure("tendencia_historica", revision, {"metric": metric},
+                          lambda: _build_hist_chart(hist, metric))
+    if chart is not None:
+        st.altair_chart(chart, use_container_width=True)
+
+
 # ---------------------------------------------------------------------
 # Compatibilidade com app.py antigo
 # ---------------------------------------------------------------------
@@ -512,7 +486,7 @@ def run():
     inject_css_once()
 
     current_page = sidebar_nav_compact(
-        pages=["Dashboard", "Dados Brutos", "Admin"],
+        pages=["Dashboard", "Doações", "Dados Brutos", "Admin"],
         default_index=0,
         logo_path="logo.png",
         on_logout=lambda: (do_logout(), st.rerun())
@@ -520,6 +494,8 @@ def run():
 
     if current_page == "Dashboard":
         dashboard_acoes()
+    elif current_page == "Doações":
+        doacoes_dashboard()
     elif current_page == "Dados Brutos":
         dados_brutos()
     elif current_page == "Admin":
@@ -538,6 +514,241 @@ def _get_enderecos_table(data_all: dict) -> pd.DataFrame:
             return data_all[k].copy()
     return pd.DataFrame()
 
+def _vol_points(volunt: pd.DataFrame) -> pd.DataFrame:
+    """lat/lon (graus decimais) de cada voluntário com coordenada válida."""
+    v_lat, v_lon = _pick_latlon(volunt, "voluntarios")
+    if not (v_lat and v_lon):
+        return pd.DataFrame(columns=["lat", "lon"])
+    tmp = volunt[[v_lat, v_lon]].dropna().copy()
+    tmp[v_lat] = tmp[v_lat].apply(_clean_coord)
+    tmp[v_lon] = tmp[v_lon].apply(_clean_coord)
+    return tmp.dropna().rename(columns={v_lat: "lat", v_lon: "lon"})
+
+
+def _acoes_points(df: pd.DataFrame, end: pd.DataFrame) -> pd.DataFrame:
+    """lat/lon de cada ação (coordenada própria ou via Dim_enderecos/geocache)."""
+    df_geo = _resolve_coords_for_acoes(df, end)
+    a_lat, a_lon = _pick_latlon(df_geo)
+    if not (a_lat and a_lon):
+        return pd.DataFrame(columns=["lat", "lon"])
+    tmp = df_geo[[a_lat, a_lon]].dropna().copy()
+    tmp[a_lat] = tmp[a_lat].apply(_clean_coord)
+    tmp[a_lon] = tmp[a_lon].apply(_clean_coord)
+    return tmp.dropna().rename(columns={a_lat: "lat", a_lon: "lon"})
+
+
+def _build_vol_map(volunt: pd.DataFrame, base_size: int):
+    vmap_df = _vol_points(volunt)
+    if vmap_df.empty:
+        return None
+    vagg = vmap_df.groupby(["lat", "lon"], as_index=False).size().rename(columns={"size": "vol_count"})
+    vagg = vagg[vagg["lat"].between(-90, 90) & vagg["lon"].between(-180, 180)]
+    vagg = cluster_points(vagg, "vol_count", _map_max_markers())
+
+    fig_v = px.scatter_geo(
+        vagg,
+        lat="lat", lon="lon",
+        size="vol_count", size_max=base_size, opacity=0.85,
+        color="vol_count", color_continuous_scale=["#D1FAE5", "#10B981"],
+        projection="natural earth", fitbounds="locations",
+    )
+    return _style_geo(fig_v, "Distribuição Geográfica dos Voluntários", height=460)
+
+
+def _build_acoes_map(df: pd.DataFrame, end: pd.DataFrame, base_size: int):
+    geo = _acoes_points(df, end)
+    if geo.empty:
+        return None
+    aagg = geo.groupby(["lat", "lon"], as_index=False).size().rename(columns={"size": "acoes_count"})
+    aagg = aagg[aagg["lat"].between(-90, 90) & aagg["lon"].between(-180, 180)]
+    aagg = cluster_points(aagg, "acoes_count", _map_max_markers())
+
+    fig_a = px.scatter_geo(
+        aagg,
+        lat="lat", lon="lon",
+        size="acoes_count", size_max=base_size, opacity=0.85,
+        color="acoes_count", color_continuous_scale=["#FED7AA", "#F97316"],
+        projection="natural earth", fitbounds="locations",
+    )
+    return _style_geo(fig_a, "Distribuição Geográfica das Ações", height=460)
+
+
+def _build_district_map(layer, points: pd.DataFrame, label: str, title: str, colors):
+    """Coroplético: pontos somados por distrito (geometria simplificada para o zoom)."""
+    if points.empty:
+        return None
+    counts = layer.counts(points["lat"], points["lon"]).rename(columns={"valor": label})
+    dentro = counts[counts[label] > 0]
+    if dentro.empty:
+        return None
+    # enquadra os distritos com pontos; a geometria vem simplificada para esse zoom
+    minx, miny, maxx, maxy = layer.bounds(dentro["id"])
+    zoom = zoom_for_extent(max(maxx - minx, maxy - miny))
+    center = {"lat": (miny + maxy) / 2, "lon": (minx + maxx) / 2}
+
+    # choropleth_map (MapLibre) no plotly >= 5.24; mapbox nas versões anteriores
+    kw = dict(geojson=layer.geojson(zoom), locations="id", featureidkey="id", color=label,
+              hover_name="nome", hover_data={"id": False}, color_continuous_scale=colors,
+              zoom=zoom - 1, center=center, opacity=0.75)
+    if hasattr(px, "choropleth_map"):
+        fig = px.choropleth_map(counts, map_style="open-street-map", **kw)
+    else:
+        fig = px.choropleth_mapbox(counts, mapbox_style="open-street-map", **kw)
+    fig.update_traces(marker_line_width=0.5)
+    fig.update_layout(template=None, title=dict(text=title, x=0.5), height=460,
+                      margin=dict(l=0, r=0, t=40, b=0), font=dict(size=12))
+    fora = int(counts.attrs.get("fora", 0))
+    if fora:
+        fig.add_annotation(text=f"{fora} fora dos distritos", showarrow=False, x=0, y=0,
+                           xref="paper", yref="paper", xanchor="left", yanchor="bottom",
+                           bgcolor="rgba(255,255,255,.8)", font=dict(size=11))
+    return fig
+
+
+@st.fragment
+def _dash_maps_fragment(version: str, filt: dict, df: pd.DataFrame, volunt: pd.DataFrame, end: pd.DataFrame):
+    """Mapas lado a lado. Controles (modo, bolhas) só reexecutam este fragmento."""
+    section("Mapas Geográficos", "")
+    layer = district_layer()
+    modo = "Pontos"
+    if layer is not None:
+        modo = st.radio("Visualização", ["Pontos", "Distritos"], horizontal=True, key="dash_map_mode",
+                        help="Distritos: total por polígono do GeoJSON configurado em geo.districts_file")
+    col_left, col_right = st.columns(2, gap="large")
+
+    if modo == "Distritos":
+        with col_left:
+            fig_v = cached_figure("mapa_voluntarios_distritos", version, {"camada": layer.revision},
+                                  lambda: _build_district_map(layer, _vol_points(volunt), "Voluntários",
+                                                              "Voluntários por Distrito", ["#D1FAE5", "#10B981"]))
+            if fig_v is not None:
+                st.plotly_chart(fig_v, theme=None, use_container_width=True)
+            else:
+                st.info("Nenhum voluntário dentro dos distritos.")
+        with col_right:
+            fig_a = cached_figure("mapa_acoes_distritos", version, {**filt, "camada": layer.revision},
+                                  lambda: _build_district_map(layer, _acoes_points(df, end), "Ações",
+                                                              "Ações por Distrito", ["#FED7AA", "#F97316"]))
+            if fig_a is not None:
+                st.plotly_chart(fig_a, theme=None, use_container_width=True)
+            else:
+                st.info("Nenhuma ação dentro dos distritos.")
+        section_end()
+        return
+
+    base_size = st.slider("Tamanho base das bolhas (mapas)", 10, 80, 35, 5, key="dash_base_size")
+
+    # Voluntários (não dependem dos filtros de Ações)
+    with col_left:
+        fig_v = cached_figure("mapa_voluntarios", version, {"base_size": base_size},
+                              lambda: _build_vol_map(volunt, base_size))
+        if fig_v is not None:
+            st.plotly_chart(fig_v, theme=None, use_container_width=True)
+        else:
+            st.info("Sem dados georreferenciados para *Voluntários*.")
+
+    # Ações
+    with col_right:
+        fig_a = cached_figure("mapa_acoes", version, {**filt, "base_size": base_size},
+                              lambda: _build_acoes_map(df, end, base_size))
+        if fig_a is not None:
+            st.plotly_chart(fig_a, theme=None, use_container_width=True)
+        else:
+            st.info("Sem dados georreferenciados para *Ações*.")
+    section_end()
+
+
+def _build_gender_pie(vol_df: pd.DataFrame, gen_col: str):
+    counts = (
+        vol_df[gen_col]
+        .fillna("Não informado")
+        .astype(str)
+        .str.strip()
+        .value_counts()
+        .sort_values(ascending=False)
+    )
+
+    fig = px.pie(
+        names=counts.index,
+        values=counts.values,
+        hole=0.45,  # rosca
+        title="Gênero dos voluntários (atual)"
+    )
+    fig.update_traces(textinfo="percent+label", pull=[0.03] * len(counts))
+    return fig
+
+
+@st.fragment
+def _dash_gender_fragment(version: str, vol_df: pd.DataFrame):
+    """Pizza de gênero — depende só do snapshot de Voluntários."""
+    section("Distribuição de Gênero dos Voluntários", "")
+
+    gen_col = columns_for(vol_df, "voluntarios").get("genero")
+
+    if gen_col:
+        fig = cached_figure("pizza_genero", version, {}, lambda: _build_gender_pie(vol_df, gen_col))
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("Coluna de gênero/sexo não encontrada na tabela de voluntários.")
+
+
+def _build_line_chart(df: pd.DataFrame, dur_h: pd.Series):
+    serie = (
+        pd.DataFrame({"Data": pd.to_datetime(df["Data"]), "Horas": dur_h})
+        .dropna(subset=["Data"])
+        .assign(mes=lambda x: x["Data"].dt.to_period("M").dt.to_timestamp())
+        .groupby("mes", as_index=False)["Horas"].sum()
+    )
+    if serie.empty:
+        return None
+    return alt.Chart(serie).mark_line(
+        point=alt.OverlayMarkDef(filled=True, size=80),
+        strokeWidth=3,
+        color="#EC4899"
+    ).encode(
+        x=alt.X("mes:T", title="Mês", axis=alt.Axis(format="%b %Y")),
+        y=alt.Y("Horas:Q", title="Horas de Voluntariado"),
+        tooltip=["mes:T", "Horas:Q"]
+    ).properties(title="Evolução Mensal das Horas de Voluntariado", height=300)
+
+
+def _build_bar_chart(df: pd.DataFrame, dur_h: pd.Series):
+    por_frente = (
+        pd.DataFrame({"Frente de Atuação": df["Frente de Atuação"], "Horas": dur_h})
+        .groupby("Frente de Atuação", as_index=False)["Horas"].sum()
+        .sort_values("Horas", ascending=False)
+    )
+    if por_frente.empty:
+        return None
+    return alt.Chart(por_frente).mark_bar(
+        color="#10B981",
+        cornerRadiusTopRight=4, cornerRadiusBottomRight=4
+    ).encode(
+        x=alt.X("Horas:Q", title="Horas de Voluntariado"),
+        y=alt.Y("Frente de Atuação:N", sort="-x", title="Frente de Atuação"),
+        tooltip=["Frente de Atuação:N", "Horas:Q"]
+    ).properties(title="Horas de Voluntariado por Frente de Atuação", height=300)
+
+
+@st.fragment
+def _dash_temporal_fragment(version: str, filt: dict, df: pd.DataFrame, dur_h: pd.Series, has_hours: bool):
+    """Séries temporais — dependem das Ações filtradas e das horas calculadas."""
+    section("Análise Temporal", "")
+    if has_hours:
+        if "Data" in df.columns and df["Data"].notna().any():
+            line_chart = cached_figure("linha_horas_mes", version, filt, lambda: _build_line_chart(df, dur_h))
+            if line_chart is not None:
+                st.altair_chart(line_chart, use_container_width=True)
+
+        if "Frente de Atuação" in df.columns:
+            bar_chart = cached_figure("barras_horas_frente", version, filt, lambda: _build_bar_chart(df, dur_h))
+            if bar_chart is not None:
+                st.altair_chart(bar_chart, use_container_width=True)
+    else:
+        info_message("As colunas *Horário de início* e *Horário de término* não foram detectadas na aba Ações.")
+    section_end()
+
+
 def dashboard_acoes():
     inject_css_once()
     hero(
@@ -548,7 +759,8 @@ def dashboard_acoes():
 
     # Botão de atualizar (limpa cache e recarrega)
     if st.button("🔄 Atualizar dados", key="refresh_dashboard"):
-        st.cache_data.clear()  # limpa todos os caches de dados
+        # só as abas desta página; relidas apenas se a planilha mudou (modifiedTime)
+        invalidate_tables(["acoes", "voluntarios", "enderecos"])
         st.rerun()  # recarrega a página imediatamente
 
     # Carrega dados
@@ -562,34 +774,15 @@ def dashboard_acoes():
         return
 
     # ------------ Normalizações básicas ------------
-    # Data
-    if "Data" not in acoes.columns:
-        for col in acoes.columns:
-            if _norm_text(col) == "data":
-                acoes.rename(columns={col: "Data"}, inplace=True)
-                break
+    # Data / Frente / Status / Endereço com os nomes canônicos (registro de colunas)
+    acoes.rename(columns=columns_for(acoes, "acoes").renames({
+        "data": "Data", "frente": "Frente de Atuação", "status": "Status", "endereco": "Endereço",
+    }, acoes.columns), inplace=True)
+    cols = columns_for(acoes, "acoes")
+    end_cols = columns_for(end, "enderecos")
     if "Data" in acoes.columns:
         acoes["Data"] = pd.to_datetime(acoes["Data"], errors="coerce", dayfirst=True)
 
-    # Frente / Status
-    if "Frente de Atuação" not in acoes.columns:
-        for c in acoes.columns:
-            if _norm_text(c).startswith("frente"):
-                acoes.rename(columns={c: "Frente de Atuação"}, inplace=True)
-                break
-    if "Status" not in acoes.columns:
-        for c in acoes.columns:
-            if _norm_text(c) == "status":
-                acoes.rename(columns={c: "Status"}, inplace=True)
-                break
-
-    # Endereço
-    if "Endereço" not in acoes.columns:
-        for c in acoes.columns:
-            if "end" in _norm_text(c):
-                acoes.rename(columns={c: "Endereço"}, inplace=True)
-                break
-
     # --------------------- Filtros ---------------------
     with st.expander("Filtros avançados", expanded=True):
         c1, c2, c3 = st.columns(3)
@@ -607,13 +800,7 @@ def dashboard_acoes():
             status_sel = st.multiselect("Status", status_opts)
 
         c4, c5, c6 = st.columns(3)
-        cidade_col = uf_col = None
-        for c in end.columns:
-            cl = _norm_text(c)
-            if cl in ("cidade", "municipio"):
-                cidade_col = c
-            if cl in ("uf", "estado"):
-                uf_col = c
+        cidade_col, uf_col = end_cols.get("cidade"), end_cols.get("uf")
         with c4:
             cidades = sorted(end[cidade_col].dropna().unique().tolist()) if (not end.empty and cidade_col in end.columns) else []
             cidade_sel = st.multiselect("Cidade", cidades) if cidades else []
@@ -623,8 +810,6 @@ def dashboard_acoes():
         with c6:
             q = st.text_input("Busca livre", placeholder="Digite para buscar...")
 
-        base_size = st.slider("Tamanho base das bolhas (mapas)", 10, 80, 35, 5)
-
     # Aplica filtros
     df = acoes.copy()
     if periodo and isinstance(periodo, tuple) and len(periodo) == 2 and all(periodo) and "Data" in df.columns:
@@ -634,13 +819,10 @@ def dashboard_acoes():
     if status_sel and "Status" in df.columns:
         df = df[df["Status"].isin(status_sel)]
     if q:
-        mask = pd.Series([False] * len(df))
-        for c in df.columns:
-            mask |= df[c].astype("string").str.contains(q, case=False, na=False)
-        df = df[mask]
+        df = df[search_mask(df, q)]
 
     # Filtro por cidade/UF através do join com endereços
-    if (cidade_sel or uf_sel) and not end.empty and ("Endereço" in df.columns or any("end" in _norm_text(c) for c in df.columns)):
+    if (cidade_sel or uf_sel) and not end.empty and cols.has("endereco"):
         enriched = _resolve_coords_for_acoes(df, end)
         if cidade_sel and cidade_col in enriched.columns:
             enriched = enriched[enriched[cidade_col].isin(cidade_sel)]
@@ -649,70 +831,37 @@ def dashboard_acoes():
         df = enriched
 
     # ------------------- KPIs HISTÓRICOS -------------------
-    from datetime import datetime
+    # Série diária pré-calculada (kpi_store): o job em segundo plano a mantém
+    # em dia com o snapshot; aqui só se lê O(dias) pontos.
     section("Indicadores Históricos", "")
-
-    ANOS = datetime.now().year - 2021 + 1  # 2021 – ano atual
-    v_kits = f"{450 * 10 * ANOS:,}".replace(",", ".")
-    v_cri = f"{500 * 4 * ANOS:,}".replace(",", ".")
-
-    stat_grid_open()  # usa o mesmo wrapper já existente
-    _render_kpi_panel_hist(v_kits, v_cri)
-    stat_grid_close()
+    ensure_kpi_job(snapshot_version(data_all))
+    store = kpi_store()
+    hist = store.history()
+    if hist.empty:
+        info_message("Série histórica em cálculo — os indicadores aparecem na próxima atualização.")
+    else:
+        stat_grid_open()  # usa o mesmo wrapper já existente
+        _render_kpi_panel_hist(_hist_items(hist))
+        stat_grid_close()
+        _dash_history_fragment(store.revision(), hist)
     section_end()
 
     # ------------------- KPIs (linha única) -------------------
     section("Indicadores Principais", "")
     # Horas
-    h_ini_col = h_fim_col = None
-    for c in acoes.columns:
-        nc = _norm_text(c)
-        if "horario de inicio" in nc or "horario de início" in nc or nc.endswith("inicio"):
-            h_ini_col = c
-        if "horario de termino" in nc or "horario de término" in nc or nc.endswith("termino") or nc.endswith("término"):
-            h_fim_col = c
-    horas_total = 0.0
-    dur_h = pd.Series([0.0] * len(df))
-    if h_ini_col and h_fim_col:
-        work = df.copy()
-
-        def _to_time(s):
-            s = str(s).strip()
-            if not s:
-                return pd.NaT
-            t = pd.to_datetime(s, format="%H:%M:%S", errors="coerce")
-            if pd.isna(t):
-                t = pd.to_datetime(s, format="%H:%M", errors="coerce")
-            return t
-
-        t_ini = work[h_ini_col].apply(_to_time)
-        t_fim = work[h_fim_col].apply(_to_time)
-
-        base = work["Data"].dt.date.astype(str) if ("Data" in work.columns and work["Data"].notna().any()) else pd.Series(["2000-01-01"] * len(work))
-        ini_dt = pd.to_datetime(base + " " + t_ini.dt.strftime("%H:%M:%S"), errors="coerce")
-        fim_dt = pd.to_datetime(base + " " + t_fim.dt.strftime("%H:%M:%S"), errors="coerce")
-        wrap = (fim_dt.notna() & ini_dt.notna()) & (fim_dt < ini_dt)
-        fim_dt.loc[wrap] = fim_dt.loc[wrap] + pd.Timedelta(days=1)
-
-        dur_h = ((fim_dt - ini_dt).dt.total_seconds() / 3600.0).clip(lower=0).fillna(0.0)
-        horas_total = float(dur_h.sum())
+    has_hours = cols.has("inicio", "termino")
+    dur_h, horas_total = action_hours(df)
 
     tot_ac = len(df)
 
-    # Pessoas impactadas (tenta detectar coluna)
+    # Pessoas impactadas
     pessoas = 0
-    for c in df.columns:
-        if "pessoa" in _norm_text(c):
-            pessoas = pd.to_numeric(df[c], errors="coerce").fillna(0).sum()
-            break
-
-    # Voluntários únicos (a partir de string listada)
-    volunt_set = set()
-    col_vol_env = next((c for c in df.columns if _norm_text(c).startswith("volunt") and "envolv" in _norm_text(c)), None)
-    if col_vol_env:
-        for s in df[col_vol_env].dropna().astype(str):
-            volunt_set.update([x.strip() for x in s.split(",") if x.strip()])
-    tot_vol = len(volunt_set)
+    if cols.has("pessoas"):
+        pessoas = pd.to_numeric(df[cols.get("pessoas")], errors="coerce").fillna(0).sum()
+
+    # Voluntários únicos (ponte voluntário↔ação montada uma vez por snapshot)
+    bridge, vol_names = volunteer_bridge(acoes, volunt, snapshot_version(data_all))
+    tot_vol = unique_volunteers(bridge, df.index)
 
     v_horas  = f"{horas_total:,.1f}".replace(",", ".")
     v_acoes  = f"{tot_ac:,}".replace(",", ".")
@@ -731,171 +880,39 @@ def dashboard_acoes():
     # novo painel com fundo/borda/sombra
     _render_kpi_panel(v_horas, v_acoes, v_pess, v_vol, tot_ac, tot_vol, pessoas)
 
+    if tot_vol:
+        with st.expander("Ações e horas por voluntário", expanded=False):
+            por_vol = volunteer_stats(bridge, vol_names, df.index, dur_h if has_hours else None)
+            st.dataframe(por_vol, use_container_width=True, hide_index=True, height=320)
+
     # Fecha o painel
     stat_grid_close()
     section_end()
 
-    # ------------------- Mapas lado a lado -------------------
-    section("Mapas Geográficos", "")
-    col_left, col_right = st.columns(2, gap="large")
-
-    # Voluntários
-    with col_left:
-        v_lat, v_lon = _pick_latlon(volunt)
-        vmap_df = pd.DataFrame()
-        if v_lat and v_lon:
-            tmp = volunt[[v_lat, v_lon]].dropna().copy()
-            tmp[v_lat] = tmp[v_lat].apply(_clean_coord)
-            tmp[v_lon] = tmp[v_lon].apply(_clean_coord)
-            vmap_df = tmp.dropna().rename(columns={v_lat: "lat", v_lon: "lon"})
-
-        if not vmap_df.empty:
-            vagg = vmap_df.groupby(["lat", "lon"], as_index=False).size().rename(columns={"size": "vol_count"})
-            vagg = vagg[vagg["lat"].between(-90, 90) & vagg["lon"].between(-180, 180)]
-
-            fig_v = px.scatter_geo(
-                vagg,
-                lat="lat", lon="lon",
-                size="vol_count", size_max=base_size, opacity=0.85,
-                color="vol_count", color_continuous_scale=["#D1FAE5", "#10B981"],
-                projection="natural earth", fitbounds="locations",
-            )
-            fig_v = _style_geo(fig_v, "Distribuição Geográfica dos Voluntários", height=460)
-            st.plotly_chart(fig_v, theme=None, use_container_width=True)
-        else:
-            st.info("Sem dados georreferenciados para *Voluntários*.")
-
-    # Ações
-    with col_right:
-        df_geo = _resolve_coords_for_acoes(df, end)
-        a_lat, a_lon = _pick_latlon(df_geo)
-        geo = pd.DataFrame()
-        if a_lat and a_lon:
-            tmp = df_geo[[a_lat, a_lon]].dropna().copy()
-            tmp[a_lat] = tmp[a_lat].apply(_clean_coord)
-            tmp[a_lon] = tmp[a_lon].apply(_clean_coord)
-            geo = tmp.dropna().rename(columns={a_lat: "lat", a_lon: "lon"})
-
-        if not geo.empty:
-            aagg = geo.groupby(["lat", "lon"], as_index=False).size().rename(columns={"size": "acoes_count"})
-            aagg = aagg[aagg["lat"].between(-90, 90) & aagg["lon"].between(-180, 180)]
-
-            fig_a = px.scatter_geo(
-                aagg,
-                lat="lat", lon="lon",
-                size="acoes_count", size_max=base_size, opacity=0.85,
-                color="acoes_count", color_continuous_scale=["#FED7AA", "#F97316"],
-                projection="natural earth", fitbounds="locations",
-            )
-            fig_a = _style_geo(fig_a, "Distribuição Geográfica das Ações", height=460)
-            st.plotly_chart(fig_a, theme=None, use_container_width=True)
-        else:
-            st.info("Sem dados georreferenciados para *Ações*.")
-    section_end()
-
-    # ------------------- Distribuição de Gênero -------------------
-    section("Distribuição de Gênero dos Voluntários", "")
-
-    # obtém a tabela de voluntários já carregada no cache
-    vol_df = data_all.get("voluntarios") if "data_all" in locals() else read_all_tables()["voluntarios"].copy()
-
-    # detecta a coluna de gênero/sexo
-    gen_col = next(
-        (c for c in vol_df.columns if _norm_text(c) in ("genero", "gênero", "sexo")),
-        None
-    )
-
-    if gen_col:
-        counts = (
-            vol_df[gen_col]
-            .fillna("Não informado")
-            .astype(str)
-            .str.strip()
-            .value_counts()
-            .sort_values(ascending=False)
-        )
-
-        fig = px.pie(
-            names=counts.index,
-            values=counts.values,
-            hole=0.45,  # rosca
-            title="Gênero dos voluntários (atual)"
-        )
-        fig.update_traces(textinfo="percent+label", pull=[0.03] * len(counts))
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.info("Coluna de gênero/sexo não encontrada na tabela de voluntários.")
-
-    # ------------------- Análise temporal -------------------
-    section("Análise Temporal", "")
-    if h_ini_col and h_fim_col:
-        if "Data" in df.columns and df["Data"].notna().any():
-            serie = (
-                pd.DataFrame({"Data": pd.to_datetime(df["Data"]), "Horas": dur_h})
-                .dropna(subset=["Data"])
-                .assign(mes=lambda x: x["Data"].dt.to_period("M").dt.to_timestamp())
-                .groupby("mes", as_index=False)["Horas"].sum()
-            )
-            if not serie.empty:
-                line_chart = alt.Chart(serie).mark_line(
-                    point=alt.OverlayMarkDef(filled=True, size=80),
-                    strokeWidth=3,
-                    color="#EC4899"
-                ).encode(
-                    x=alt.X("mes:T", title="Mês", axis=alt.Axis(format="%b %Y")),
-                    y=alt.Y("Horas:Q", title="Horas de Voluntariado"),
-                    tooltip=["mes:T", "Horas:Q"]
-                ).properties(title="Evolução Mensal das Horas de Voluntariado", height=300)
-                st.altair_chart(line_chart, use_container_width=True)
-
-        if "Frente de Atuação" in df.columns:
-            por_frente = (
-                pd.DataFrame({"Frente de Atuação": df["Frente de Atuação"], "Horas": dur_h})
-                .groupby("Frente de Atuação", as_index=False)["Horas"].sum()
-                .sort_values("Horas", ascending=False)
-            )
-            if not por_frente.empty:
-                bar_chart = alt.Chart(por_frente).mark_bar(
-                    color="#10B981",
-                    cornerRadiusTopRight=4, cornerRadiusBottomRight=4
-                ).encode(
-                    x=alt.X("Horas:Q", title="Horas de Voluntariado"),
-                    y=alt.Y("Frente de Atuação:N", sort="-x", title="Frente de Atuação"),
-                    tooltip=["Frente de Atuação:N", "Horas:Q"]
-                ).properties(title="Horas de Voluntariado por Frente de Atuação", height=300)
-                st.altair_chart(bar_chart, use_container_width=True)
-    else:
-        info_message("As colunas *Horário de início* e *Horário de término* não foram detectadas na aba Ações.")
-    section_end()
+    # ------------------- Seções em fragmentos -------------------
+    # Cada fragmento recebe explicitamente o que consome; controles internos
+    # (ex.: tamanho das bolhas) só reexecutam o próprio fragmento.
+    version = snapshot_version(data_all)
+    filt = {
+        "periodo": periodo, "frentes": frentes, "status": status_sel,
+        "q": q, "cidade": cidade_sel, "uf": uf_sel,
+    }
+    _dash_maps_fragment(version, filt, df, volunt, end)
+    _dash_gender_fragment(version, data_all.get("voluntarios", pd.DataFrame()))
+    _dash_temporal_fragment(version, filt, df, dur_h, has_hours)
 
     footer()
 
 
 def _normalize_columns(acoes: pd.DataFrame):
     """Normaliza nomes de colunas mais usadas."""
-    # Data
-    if "Data" not in acoes.columns:
-        for col in acoes.columns:
-            if _norm_text(col) == "data":
-                acoes.rename(columns={col: "Data"}, inplace=True)
-                break
+    acoes.rename(columns=columns_for(acoes, "acoes").renames({
+        "data": "Data", "frente": "Frente de Atuacao", "status": "Status", "endereco": "Endereco",
+    }, acoes.columns), inplace=True)
 
     if "Data" in acoes.columns:
         acoes["Data"] = pd.to_datetime(acoes["Data"], errors="coerce", dayfirst=True)
 
-    # Outros mapeamentos
-    column_mappings = {
-        "frente": "Frente de Atuacao",
-        "status": "Status",
-        "endereco": "Endereco"
-    }
-    for normalized, target in column_mappings.items():
-        if target not in acoes.columns:
-            for c in acoes.columns:
-                if normalized in _norm_text(c):
-                    acoes.rename(columns={c: target}, inplace=True)
-                    break
-
 
 def _create_filter_section(acoes: pd.DataFrame, end: pd.DataFrame):
     """Cria filtros do dashboard."""
@@ -918,13 +935,8 @@ def _create_filter_section(acoes: pd.DataFrame, end: pd.DataFrame):
         filters['status_sel'] = st.multiselect("Status", status_opts)
 
     col4, col5, col6 = st.columns(3)
-    cidade_col = uf_col = None
-    for c in end.columns:
-        cl = _norm_text(c)
-        if cl in ("cidade", "municipio"):
-            cidade_col = c
-        if cl in ("uf", "estado"):
-            uf_col = c
+    end_cols = columns_for(end, "enderecos")
+    cidade_col, uf_col = end_cols.get("cidade"), end_cols.get("uf")
 
     with col4:
         if not end.empty and cidade_col:
@@ -966,18 +978,15 @@ def _apply_filters(acoes: pd.DataFrame, end: pd.DataFrame, filters: dict) -> pd.
 
     search_query = filters.get('search_query', '')
     if search_query:
-        mask = pd.Series([False] * len(df))
-        for c in df.columns:
-            mask |= df[c].astype("string").str.contains(search_query, case=False, na=False)
-        df = df[mask]
+        df = df[search_mask(df, search_query)]
 
     cidade_sel = filters.get('cidade_sel', [])
     uf_sel = filters.get('uf_sel', [])
     if (cidade_sel or uf_sel) and not end.empty:
         enriched = _resolve_coords_for_acoes(df, end)
 
-        cidade_col = next((c for c in end.columns if _norm_text(c) in ("cidade", "municipio")), None)
-        uf_col = next((c for c in end.columns if _norm_text(c) in ("uf", "estado")), None)
+        end_cols = columns_for(end, "enderecos")
+        cidade_col, uf_col = end_cols.get("cidade"), end_cols.get("uf")
 
         if cidade_sel and cidade_col and cidade_col in enriched.columns:
             enriched = enriched[enriched[cidade_col].isin(cidade_sel)]
@@ -991,42 +1000,7 @@ def _apply_filters(acoes: pd.DataFrame, end: pd.DataFrame, filters: dict) -> pd.
 
 def _calculate_hours(df: pd.DataFrame) -> Tuple[pd.Series, float]:
     """Calcula horas a partir de colunas de horário."""
-    h_ini_col = h_fim_col = None
-    for c in df.columns:
-        nc = _norm_text(c)
-        if "horario de inicio" in nc or nc.endswith("inicio"):
-            h_ini_col = c
-        if "horario de termino" in nc or nc.endswith("termino"):
-            h_fim_col = c
-
-    horas_total = 0.0
-    dur_h = pd.Series([0.0] * len(df))
-
-    if h_ini_col and h_fim_col:
-        work = df.copy()
-
-        def _to_time(s):
-            s = str(s).strip()
-            if not s:
-                return pd.NaT
-            t = pd.to_datetime(s, format="%H:%M:%S", errors="coerce")
-            if pd.isna(t):
-                t = pd.to_datetime(s, format="%H:%M", errors="coerce")
-            return t
-
-        t_ini = work[h_ini_col].apply(_to_time)
-        t_fim = work[h_fim_col].apply(_to_time)
-
-        base = work["Data"].dt.date.astype(str) if ("Data" in work.columns and work["Data"].notna().any()) else pd.Series(["2000-01-01"] * len(work))
-        ini_dt = pd.to_datetime(base + " " + t_ini.dt.strftime("%H:%M:%S"), errors="coerce")
-        fim_dt = pd.to_datetime(base + " " + t_fim.dt.strftime("%H:%M:%S"), errors="coerce")
-        wrap = (fim_dt.notna() & ini_dt.notna()) & (fim_dt < ini_dt)
-        fim_dt.loc[wrap] = fim_dt.loc[wrap] + pd.Timedelta(days=1)
-
-        dur_h = ((fim_dt - ini_dt).dt.total_seconds() / 3600.0).clip(lower=0).fillna(0.0)
-        horas_total = float(dur_h.sum())
-
-    return dur_h, horas_total
+    return action_hours(df)
 
 
 def _render_kpi_section(df: pd.DataFrame, horas_total: float, volunt: pd.DataFrame):
@@ -1035,19 +1009,15 @@ def _render_kpi_section(df: pd.DataFrame, horas_total: float, volunt: pd.DataFra
 
     tot_ac = len(df)
 
-    # Pessoas impactadas (tenta achar uma coluna com 'pessoa' no nome)
+    # Pessoas impactadas
+    cols = columns_for(df, "acoes")
     pessoas = 0
-    for c in df.columns:
-        if "pessoa" in _norm_text(c):
-            pessoas = pd.to_numeric(df[c], errors="coerce").fillna(0).sum()
-            break
-
-    # Voluntários únicos (a partir de string listada)
-    volunt_set = set()
-    if "Voluntarios envolvidos" in df.columns:
-        for s in df["Voluntarios envolvidos"].dropna().astype(str):
-            volunt_set.update([x.strip() for x in s.split(",") if x.strip()])
-    tot_vol = len(volunt_set)
+    if cols.has("pessoas"):
+        pessoas = pd.to_numeric(df[cols.get("pessoas")], errors="coerce").fillna(0).sum()
+
+    # Voluntários únicos (a partir de string listada, vetorizado)
+    col_vol_env = cols.get("voluntarios")
+    tot_vol = int(explode_volunteers(df, col_vol_env)["nome_norm"].nunique()) if col_vol_env else 0
 
     # Valores formatados
     v_horas = f"{horas_total:,.1f}".replace(",", ".")
@@ -1073,10 +1043,11 @@ def _render_maps_section(df: pd.DataFrame, volunt: pd.DataFrame, dim_end: pd.Dat
     section("Mapas Geográficos", "")
 
     # Voluntários
-    v_lat, v_lon = _pick_latlon(volunt) if not volunt.empty else (None, None)
+    v_lat, v_lon = _pick_latlon(volunt, "voluntarios") if not volunt.empty else (None, None)
     vol_df = pd.DataFrame(columns=["lat", "lon", "vol_count"])
     if v_lat and v_lon and not volunt.empty:
         vol_df = _prepare_volunteer_map_data(volunt, v_lat, v_lon).rename(columns={"vol_count": "valor"})
+        vol_df = cluster_points(vol_df, "valor", _map_max_markers())
 
     # Ações -> cruza com Dim_enderecos para ter lat/lon
     df_geo = _resolve_coords_for_acoes(df, dim_end) if not df.empty and not dim_end.empty else pd.DataFrame()
@@ -1084,6 +1055,7 @@ def _render_maps_section(df: pd.DataFrame, volunt: pd.DataFrame, dim_end: pd.Dat
     acoes_df = pd.DataFrame(columns=["lat", "lon", "acoes_count"])
     if a_lat and a_lon and not df_geo.empty:
         acoes_df = _prepare_actions_map_data(df_geo, a_lat, a_lon).rename(columns={"acoes_count": "valor"})
+        acoes_df = cluster_points(acoes_df, "valor", _map_max_markers())
 
     col1, col2 = st.columns(2, gap="large")
 
@@ -1112,15 +1084,7 @@ def _render_time_series_section(df: pd.DataFrame, dur_h: pd.Series):
     """Séries temporais: evolução mensal e horas por frente."""
     section("Análise Temporal")
 
-    h_ini_col = h_fim_col = None
-    for c in df.columns:
-        nc = _norm_text(c)
-        if "horario de inicio" in nc or nc.endswith("inicio"):
-            h_ini_col = c
-        if "horario de termino" in nc or nc.endswith("termino"):
-            h_fim_col = c
-
-    if h_ini_col and h_fim_col:
+    if columns_for(df, "acoes").has("inicio", "termino"):
         if "Data" in df.columns and df["Data"].notna().any():
             serie = (
                 pd.DataFrame({"Data": pd.to_datetime(df["Data"]), "Horas": dur_h})
@@ -1161,6 +1125,116 @@ def _render_time_series_section(df: pd.DataFrame, dur_h: pd.Series):
     section_end()
 
 
+# ---------------------------------------------------------------------
+# DOAÇÕES
+# ---------------------------------------------------------------------
+def _fmt_brl(v: float) -> str:
+    return "R$ " + f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def doacoes_dashboard():
+    """Dashboard de Doações — lê apenas do cubo pré-agregado do snapshot."""
+    inject_css_once()
+    hero("Dashboard de Doações", "", "CuidaSP > Doações")
+
+    data_all = read_all_tables()
+    doacoes = data_all.get("doacoes", pd.DataFrame())
+    if doacoes.empty:
+        info_message("Nenhum dado encontrado na aba *Doações*.")
+        return
+    cube = donations_cube(doacoes, snapshot_version(data_all))
+    if cube.empty:
+        info_message("Não foi possível agregar a aba *Doações*.")
+        return
+
+    # --------------------- Filtros ---------------------
+    enums = enum_options()
+    def _opts(dim: str, enum_key: str):
+        seen = [str(x) for x in cube[dim].cat.categories]
+        return list(dict.fromkeys([o for o in enums[enum_key] if o in seen] + seen))
+
+    with st.expander("Filtros", expanded=True):
+        c1, c2, c3, c4 = st.columns(4)
+        with c1:
+            meses = cube["mes"].dropna()
+            periodo = st.date_input("Período", value=(meses.min().date(), meses.max().date()),
+                                    key="doa_periodo") if not meses.empty else None
+        with c2:
+            formas = st.multiselect("Forma de doação", _opts("forma_doacao", "forma_doacao"), key="doa_forma")
+        with c3:
+            tipos = st.multiselect("Tipo de doador", _opts("tipo_doador", "tipo_doador"), key="doa_tipo")
+        with c4:
+            recor = st.multiselect("Recorrente", _opts("recorrente", "recorrente"), key="doa_recorrente")
+
+    sel = slice_cube(cube, periodo if isinstance(periodo, tuple) else None,
+                     forma_doacao=formas, tipo_doador=tipos, recorrente=recor)
+
+    # --------------------- KPIs ---------------------
+    section("Indicadores de Doações", "")
+    total = float(sel["valor"].sum())
+    qtd = int(sel["doacoes"].sum())
+    rec = float(sel.loc[sel["recorrente"] == "Sim", "doacoes"].sum())
+    create_metric_cards([
+        {"title": "Total arrecadado", "value": _fmt_brl(total), "subtitle": "no período"},
+        {"title": "Doações", "value": f"{qtd:,}".replace(",", "."), "subtitle": "registros"},
+        {"title": "Ticket médio", "value": _fmt_brl(total / qtd) if qtd else "—", "subtitle": "por doação"},
+        {"title": "Recorrentes", "value": f"{(rec / qtd * 100) if qtd else 0:.1f}%", "subtitle": "das doações"},
+    ])
+    section_end()
+
+    if sel.empty:
+        warning_message("Nenhuma doação corresponde aos filtros aplicados.")
+        footer()
+        return
+
+    # --------------------- Gráficos ---------------------
+    section("Evolução e Composição", "")
+    mensal = rollup(sel.dropna(subset=["mes"]), "mes")
+    if not mensal.empty:
+        line = alt.Chart(mensal).mark_line(
+            point=alt.OverlayMarkDef(filled=True, size=70), strokeWidth=3, color=COLORS["primary"]
+        ).encode(
+            x=alt.X("mes:T", title="Mês", axis=alt.Axis(format="%b %Y")),
+            y=alt.Y("valor:Q", title="Valor (R$)"),
+            tooltip=["mes:T", alt.Tooltip("valor:Q", format=",.2f"), "doacoes:Q"],
+        ).properties(title="Arrecadação mensal", height=300)
+        st.altair_chart(line, use_container_width=True)
+
+    g1, g2 = st.columns(2, gap="large")
+    with g1:
+        por_forma = rollup(sel, "forma_doacao").sort_values("valor", ascending=False)
+        bar = alt.Chart(por_forma).mark_bar(
+            color=COLORS["secondary"], cornerRadiusTopRight=4, cornerRadiusBottomRight=4
+        ).encode(
+            x=alt.X("valor:Q", title="Valor (R$)"),
+            y=alt.Y("forma_doacao:N", sort="-x", title="Forma de doação"),
+            tooltip=["forma_doacao:N", alt.Tooltip("valor:Q", format=",.2f"), "doacoes:Q"],
+        ).properties(title="Valor por forma de doação", height=280)
+        st.altair_chart(bar, use_container_width=True)
+    with g2:
+        por_tipo = rollup(sel, "tipo_doador")
+        fig = px.pie(por_tipo, names="tipo_doador", values="valor", hole=0.45, title="Valor por tipo de doador")
+        fig.update_traces(textinfo="percent+label")
+        st.plotly_chart(fig, use_container_width=True)
+    section_end()
+
+    # --------------------- Drilldown ---------------------
+    section("Detalhamento", "")
+    labels = {"forma_doacao": "Forma de doação", "tipo_doador": "Tipo de doador", "recorrente": "Recorrente"}
+    dim = st.selectbox("Detalhar por", list(labels), format_func=labels.get, key="doa_drill")
+    por_mes = st.checkbox("Quebrar por mês", key="doa_drill_mes")
+    tab = rollup(sel, ["mes", dim] if por_mes else [dim]).sort_values(["mes", "valor"] if por_mes else "valor",
+                                                                      ascending=[True, False] if por_mes else False)
+    if por_mes:
+        tab["mes"] = tab["mes"].dt.strftime("%m/%Y")
+    tab["valor"] = tab["valor"].map(_fmt_brl)
+    st.dataframe(tab.rename(columns={"mes": "Mês", dim: labels[dim], "valor": "Valor", "doacoes": "Doações"}),
+                 use_container_width=True, hide_index=True)
+    section_end()
+
+    footer()
+
+
 # ---------------------------------------------------------------------
 # DADOS BRUTOS
 # ---------------------------------------------------------------------
@@ -1174,26 +1248,48 @@ def _filter_dataframe(df: pd.DataFrame, table_name: str = "") -> pd.DataFrame:
 
     out = df.copy()
     if q:
-        mask = pd.Series([False] * len(out))
-        for c in out.columns:
-            mask |= out[c].astype("string").str.contains(q, case=False, na=False)
-        out = out[mask]
+        out = out[search_mask(out, q)]
 
+    # valores distintos vêm do perfil cacheado do snapshot (tabela completa)
+    prof = column_profile(df, table_name)["columns"]
+    version = df.attrs.get("snapshot_version", "")
     with st.expander("Filtros por Coluna", expanded=False):
         filter_cols = st.columns(min(3, len(out.columns)))
         for i, c in enumerate(out.columns):
             if i >= 12:
                 break
             with filter_cols[i % 3]:
-                vals = out[c].dropna().unique()
-                if 1 < len(vals) <= 50:
-                    sel = st.multiselect(f"Filtrar {c}", sorted(map(str, vals)),
-                                         key=f"filter_{table_name}{c}{hash(tuple(vals))}")
+                opts = prof[c]["options"]
+                if opts and len(opts) > 1:
+                    sel = st.multiselect(f"Filtrar {c}", opts,
+                                         key=f"filter_{table_name}{c}{version}")
                     if sel:
                         out = out[out[c].astype(str).isin(sel)]
     return out
 
 
+_PAGE_SIZES = [50, 100, 250, 500]
+
+
+def _paginated_table(df: pd.DataFrame, key: str, height: int = 400):
+    """
+    Mostra só a página visível do DataFrame: apenas essas linhas são
+    serializadas (Arrow) e enviadas ao navegador a cada rerun.
+    """
+    total = len(df)
+    c1, c2, c3 = st.columns([1, 1, 2])
+    with c1:
+        page_size = st.selectbox("Linhas por página", _PAGE_SIZES, index=1, key=f"page_size_{key}")
+    n_pages = max(1, -(-total // page_size))
+    with c2:
+        page = st.number_input("Página", min_value=1, max_value=n_pages, value=1, step=1, key=f"page_{key}")
+    start = (int(page) - 1) * page_size
+    end = min(start + page_size, total)
+    with c3:
+        st.caption(f"Linhas {start + 1:,}–{end:,} de {total:,} • página {int(page)} de {n_pages}".replace(",", "."))
+    st.dataframe(df.iloc[start:end], use_container_width=True, hide_index=True, height=height)
+
+
 def dados_brutos():
     """Exploração de tabelas com busca e filtros."""
     inject_css_once()
@@ -1207,58 +1303,81 @@ def dados_brutos():
         "Endereços": {"key": "enderecos", "desc": "Dimensão de endereços", "icon": "📍"},
     }
 
+    # Carregamento preguiçoso: só a tabela escolhida é processada e renderizada
+    # (st.tabs executaria e enviaria o conteúdo de todas as abas).
     tab_names = list(table_info.keys())
-    tabs = st.tabs(tab_names)
-
-    for tab_name, tab in zip(tab_names, tabs):
-        with tab:
-            cfg = table_info[tab_name]
-            df = data_all.get(cfg["key"], pd.DataFrame()).copy()
-
-            st.markdown(f"""
-            <div style="padding: 1rem; background: {COLORS['gray_100']}; border-radius: .5rem; margin-bottom: 1rem;">
-              <h4 style="margin:0; color:{COLORS['gray_900']};">{cfg['icon']} {tab_name}</h4>
-              <p style="margin:.5rem 0 0; color:{COLORS['gray_500']}; font-size:.9rem;">{cfg['desc']}</p>
-            </div>
-            """, unsafe_allow_html=True)
-
-            if df.empty:
-                info_message(f"Nenhum dado encontrado na tabela *{tab_name}*.")
-                continue
-
-            col1, col2, col3, col4 = st.columns(4)
-            with col1: st.metric("Registros", f"{len(df):,}".replace(",", "."))
-            with col2: st.metric("Colunas", len(df.columns))
-            with col3:
-                memory_usage = df.memory_usage(deep=True).sum() / 1024
-                st.metric("Tamanho", f"{memory_usage:.1f} KB")
-            with col4:
-                completeness = (1 - df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100
-                st.metric("Completude", f"{completeness:.1f}%")
-
-            st.markdown("---")
-
-            filtered = _filter_dataframe(df, cfg["key"])
-
-            if not filtered.empty:
-                st.dataframe(filtered, use_container_width=True, hide_index=True, height=400)
-
-                if len(filtered) != len(df):
-                    st.info(f"Mostrando {len(filtered):,} de {len(df):,} registros".replace(",", "."))
-                else:
-                    st.info(f"Total: {len(df):,} registros".replace(",", "."))
-
-                if st.button(f"Baixar {tab_name} (CSV)", key=f"download_{cfg['key']}"):
-                    csv = filtered.to_csv(index=False)
-                    st.download_button(
-                        label=f"Download {tab_name}.csv",
-                        data=csv,
-                        file_name=f"cuida_sp_{cfg['key']}.csv",
-                        mime="text/csv",
-                        key=f"download_btn_{cfg['key']}"
-                    )
-            else:
-                warning_message("Nenhum registro corresponde aos filtros aplicados.")
+    tab_name = st.radio("Tabela", tab_names, horizontal=True, key="raw_table",
+                        format_func=lambda t: f"{table_info[t]['icon']} {t}",
+                        label_visibility="collapsed")
+
+    cfg = table_info[tab_name]
+    df = data_all.get(cfg["key"], pd.DataFrame())
+
+    # versões anteriores: reconstrói só a aba escolhida a partir do histórico
+    hist = snapshot_store()
+    versoes = hist.entries()
+    if versoes:
+        primeira = pd.Timestamp(versoes[0]["ts"]).tz_convert("America/Sao_Paulo").date()
+        ref = st.date_input("Ver como estava em", value=None, min_value=primeira, format="DD/MM/YYYY",
+                            key="raw_as_of", help="Vazio = dados atuais")
+        if ref is not None:
+            df = hist.as_of(ref, [cfg["key"]]).get(cfg["key"], pd.DataFrame())
+            snap = hist.entry_at(ref)
+            if snap:
+                st.caption("Versão gravada em " + pd.Timestamp(snap["ts"]).tz_convert("America/Sao_Paulo")
+                           .strftime("%d/%m/%Y %H:%M"))
+
+    st.markdown(f"""
+    <div style="padding: 1rem; background: {COLORS['gray_100']}; border-radius: .5rem; margin-bottom: 1rem;">
+      <h4 style="margin:0; color:{COLORS['gray_900']};">{cfg['icon']} {tab_name}</h4>
+      <p style="margin:.5rem 0 0; color:{COLORS['gray_500']}; font-size:.9rem;">{cfg['desc']}</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    if df.empty:
+        info_message(f"Nenhum dado encontrado na tabela *{tab_name}*.")
+        footer()
+        return
+
+    prof = column_profile(df, cfg["key"])
+    col1, col2, col3, col4 = st.columns(4)
+    with col1: st.metric("Registros", f"{prof['rows']:,}".replace(",", "."))
+    with col2: st.metric("Colunas", prof["cols"])
+    with col3:
+        memory_usage = prof["memory_bytes"] / 1024
+        st.metric("Tamanho", f"{memory_usage:.1f} KB")
+    with col4:
+        st.metric("Completude", f"{prof['completeness']:.1f}%")
+
+    st.markdown("---")
+
+    filtered = _filter_dataframe(df, cfg["key"])
+
+    if not filtered.empty:
+        _paginated_table(filtered, cfg["key"])
+
+        if len(filtered) != len(df):
+            st.info(f"Mostrando {len(filtered):,} de {len(df):,} registros".replace(",", "."))
+        else:
+            st.info(f"Total: {len(df):,} registros".replace(",", "."))
+
+        # exportação sob demanda: o arquivo só é gerado no clique, em blocos
+        e1, e2 = st.columns([1, 3])
+        with e1:
+            fmt = st.selectbox("Formato", list(EXPORT_FORMATS), key=f"export_fmt_{cfg['key']}",
+                               label_visibility="collapsed")
+        ext, mime, _ = EXPORT_FORMATS[fmt]
+        with e2:
+            st.download_button(
+                label=f"Baixar {tab_name} ({fmt})",
+                data=deferred_export(filtered, fmt),
+                file_name=f"cuida_sp_{cfg['key']}.{ext}",
+                mime=mime,
+                key=f"download_btn_{cfg['key']}",
+                on_click="ignore",
+            )
+    else:
+        warning_message("Nenhum registro corresponde aos filtros aplicados.")
     footer()
 
 
@@ -1275,7 +1394,7 @@ def admin():
 
     hero("Painel Administrativo", "Gerenciamento de usuários e configurações", "CuidaSP > Admin")
 
-    tab1, tab2, tab3, tab4 = st.tabs(["Usuários", "Sistema", "Configurações", "Log"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Usuários", "Sistema", "Configurações", "Log", "Desempenho"])
 
     with tab1:
         _render_user_management()
@@ -1285,6 +1404,8 @@ def admin():
         _render_system_config()
     with tab4:                       # ← novo bloco
         _render_log()
+    with tab5:
+        _render_performance()
 
     footer()
 
@@ -1431,8 +1552,10 @@ def _render_system_info():
         ]:
             df = data_all.get(table_name, pd.DataFrame())
             if not df.empty:
-                completeness = (1 - df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100
-                quality_data.append({'Tabela': display_name, 'Completude': f"{completeness:.1f}%", 'Registros': len(df), 'Colunas': len(df.columns)})
+                prof = column_profile(df, table_name)
+                quality_data.append({'Tabela': display_name, 'Completude': f"{prof['completeness']:.1f}%",
+                                     'Registros': prof['rows'], 'Colunas': prof['cols'],
+                                     'Tamanho (KB)': round(prof['memory_bytes'] / 1024, 1)})
         if quality_data:
             st.dataframe(pd.DataFrame(quality_data), use_container_width=True, hide_index=True)
 
@@ -1454,12 +1577,26 @@ def _render_system_config():
     st.markdown("### Gerenciamento de Cache")
     c1, c2 = st.columns(2)
     with c1:
-        if st.button("Limpar Cache de Dados", help="Remove o cache dos dados do Google Sheets"):
-            st.cache_data.clear()
-            st.success("Cache limpo!")
+        if st.button("Limpar Cache de Dados",
+                     help="Reverifica todas as abas; só as alteradas no Google Sheets são relidas"):
+            invalidate_tables()
+            st.success("Abas marcadas para reverificação na próxima leitura.")
     with c2:
         st.metric("Cache de Dados", "Ativo")
 
+    status = source_status()
+    if status:
+        st.dataframe(pd.DataFrame(status), hide_index=True, use_container_width=True)
+    fontes = source_names()
+    if len(fontes) > 1:
+        f1, f2 = st.columns([3, 1])
+        with f1:
+            fonte = st.selectbox("Fonte", fontes, key="refresh_source_sel", label_visibility="collapsed")
+        with f2:
+            if st.button("Atualizar fonte", key="refresh_source_btn", help="Reverifica só esta planilha"):
+                refresh_source(fonte)
+                st.rerun()
+
     st.markdown("### Configurações Atuais")
     config_info = {
         "TTL do Cache": f"{st.secrets.get('app', {}).get('cache_ttl_seconds', 300)} segundos",
@@ -1471,33 +1608,40 @@ def _render_system_config():
         st.info(f"{k}: {v}")
 
     st.markdown("### Backup e Exportação")
-    if st.button("Exportar Todos os Dados", help="Baixar backup completo em formato JSON"):
-        try:
-            data_all = read_all_tables()
-            export_data = {k: df.to_dict('records') for k, df in data_all.items() if not df.empty}
-            import json
-            from datetime import datetime
-            fname = f"cuida_sp_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            st.download_button("Download Backup", data=json.dumps(export_data, ensure_ascii=False, indent=2, default=str),
-                               file_name=fname, mime="application/json")
-        except Exception as e:
-            error_message(f"Erro ao gerar backup: {str(e)}")
+    b1, b2 = st.columns(2)
+    with b1:
+        modo = st.radio("Tipo de backup", ["Completo", "Incremental"], horizontal=True, key="backup_mode",
+                        help="Incremental inclui só as linhas alteradas desde o último backup gerado")
+    with b2:
+        fmt = st.selectbox("Formato", BACKUP_FORMATS, key="backup_fmt",
+                           format_func=lambda f: {"ndjson": "JSON (NDJSON)", "parquet": "Parquet"}[f])
+    state_dir = st.secrets.get("app", {}).get("backup_state_dir")
+    last = read_manifest(state_dir)  # só o JSON: os hashes ficam para o backup incremental
+    if last:
+        st.caption(f"Último backup: {last['created_at']} ({last['mode']})")
+    hist = snapshot_store().stats()
+    if hist["snapshots"]:
+        st.caption(f"Histórico de versões: {hist['snapshots']} snapshots ({hist['checkpoints']} completos), "
+                   f"{hist['bytes'] / 1024:.0f} KB em {hist['path']}")
+
+    def _gerar_backup():
+        return build_backup(read_all_tables(), fmt=fmt, incremental=(modo == "Incremental"),
+                            state_dir=state_dir)
+
+    from datetime import datetime
+    fname = f"cuida_sp_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    st.download_button("Exportar Todos os Dados", data=_gerar_backup, file_name=fname,
+                       mime="application/zip", on_click="ignore",
+                       help="Backup compactado (zip), gerado em blocos no momento do download")
     section_end()
 
 # ---------------------------------------------------------------
 def _render_log():
-    from yaml_store import download_users_doc
-
-    st.caption("LOG SYNC PATCH ATIVO ✅")  # marcador pra você ver que deployou
+    summary = get_log_summary(30)
+    mod = summary.get("modified_time")
+    mod_txt = pd.to_datetime(mod).tz_convert("America/Sao_Paulo").strftime("%d/%m/%Y %H:%M") if mod else "—"
+    st.caption(f"access_logs armazenados = {summary['stored']} • YAML no Drive atualizado em {mod_txt}")
 
-    remote = download_users_doc()
-    remote_logs = remote.get("access_logs", []) or []
-    st.caption(f"Drive access_logs = {len(remote_logs)}")
-    
-    # o que o app está vendo (memória)
-    logs = get_recent_logs(30)
-    st.caption(f"Memória get_recent_logs(30) = {len(logs)}")
-    
     logs = get_recent_logs(30)
     df = pd.DataFrame(logs)
     if df.empty:
@@ -1547,3 +1691,64 @@ def _render_log():
         height=400,
     )
 
+
+# ---------------------------------------------------------------
+def _render_performance():
+    section("Desempenho", "Latência por etapa (amostras recentes deste processo)")
+
+    stats = perf.stage_stats()
+    if not stats:
+        info_message("Ainda não há medições. Navegue pelo app e volte aqui.")
+        section_end()
+        return
+
+    df = pd.DataFrame(stats).sort_values("p95_ms", ascending=False)
+    st.dataframe(
+        df.rename(columns={"stage": "Etapa", "n": "Amostras", "p50_ms": "p50 (ms)",
+                           "p95_ms": "p95 (ms)", "max_ms": "Máx (ms)"}),
+        hide_index=True,
+        use_container_width=True,
+        column_config={c: st.column_config.NumberColumn(format="%.1f")
+                       for c in ("p50 (ms)", "p95 (ms)", "Máx (ms)")},
+    )
+
+    stage = st.selectbox("Histograma da etapa", df["stage"].tolist(), key="perf_stage")
+    hist = pd.DataFrame(perf.histogram(stage), columns=["Faixa", "Amostras"])
+    st.plotly_chart(px.bar(hist, x="Faixa", y="Amostras"), use_container_width=True)
+
+    st.markdown("### Reruns mais lentos")
+    runs = perf.slowest_runs(10)
+    if runs:
+        rows = []
+        for r in runs:
+            top = sorted(r["stages"].items(), key=lambda kv: kv[1], reverse=True)[:3]
+            rows.append({
+                "Quando": pd.to_datetime(r["ts"], unit="s", utc=True).tz_convert("America/Sao_Paulo").strftime("%d/%m %H:%M:%S"),
+                "Página": r["page"],
+                "Usuário": r["user"],
+                "Total (ms)": round(r["total_s"] * 1000, 1),
+                "Etapas mais caras": ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in top),
+            })
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+
+    st.markdown("### Cache de geocodificação")
+    g = geocode_cache().stats()
+    looked = g["hits"] + g["misses"]
+    create_metric_cards([
+        {"title": "Endereços no cache", "value": f"{g['entries']:,}".replace(",", ".")},
+        {"title": "Taxa de acerto", "value": f"{g['hits'] / looked:.0%}" if looked else "—"},
+        {"title": "Aproximados", "value": f"{g['aprox']:,}".replace(",", ".")},
+        {"title": "Não resolvidos", "value": f"{g['unresolved']:,}".replace(",", ".")},
+    ])
+    st.caption(" • ".join(f"{k}: {v}" for k, v in g["by_source"].items()) + f" • arquivo: {g['path']}")
+
+    problemas = schema_issues()
+    if problemas:
+        st.markdown("### Colunas não reconhecidas")
+        st.caption("Ajuste os apelidos em secrets, seção [schema.<aba>].")
+        st.dataframe(pd.DataFrame(problemas), hide_index=True, use_container_width=True)
+
+    if st.button("Zerar medições", key="perf_reset"):
+        perf.reset()
+        st.rerun()
+    section_end()
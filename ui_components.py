@@ -290,7 +290,7 @@ def sidebar_nav_compact(pages: list[str], default_index: int = 0,
         st.write("")  # respiro
 
         # ---- NAVEGAÇÃO
-        icons = {"Dashboard": "📊", "Dados Brutos": "🗂", "Admin": "🛠"}
+        icons = {"Dashboard": "📊", "Doações": "💝", "Dados Brutos": "🗂", "Admin": "🛠"}
         for p in pages:
             if st.button(f"{icons.get(p,'•')}  {p}", key=f"nav_{p}", use_container_width=True):
                 current = p
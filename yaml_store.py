@@ -4,8 +4,14 @@ from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
 from crypto import encrypt_text, decrypt_text
+from perf import instrument
+from storage import local_users_file
 
 SCOPES = ["https://www.googleapis.com/auth/drive"]
+_META_FIELDS = "id,modifiedTime,size,version"
+
+# metadados do último arquivo lido/gravado (evita ir ao Drive só para consultar)
+_DOC_META: dict = {}
 
 def _get_secrets():
     # tenta st.secrets; se não existir (ex.: script CLI), tenta .streamlit/secrets.toml
@@ -29,7 +35,13 @@ def _file_id() -> str:
     sec = _get_secrets()
     return sec.get("app", {}).get("users_yaml_file_id")
 
+def _local():
+    return local_users_file(_get_secrets())  # None no modo Google
+
 def _download_raw() -> bytes:
+    local = _local()
+    if local is not None:
+        return local.download()
     service = _drive()
     req = service.files().get_media(fileId=_file_id())
     buf = io.BytesIO()
@@ -40,11 +52,36 @@ def _download_raw() -> bytes:
     return buf.getvalue()
 
 def _upload_raw(data: bytes):
-    service = _drive()
-    buf = io.BytesIO(data)
-    media = MediaIoBaseUpload(buf, mimetype="application/octet-stream", resumable=True)
-    service.files().update(fileId=_file_id(), media_body=media).execute()
+    local = _local()
+    if local is not None:
+        meta = local.upload(data)
+    else:
+        service = _drive()
+        buf = io.BytesIO(data)
+        media = MediaIoBaseUpload(buf, mimetype="application/octet-stream", resumable=True)
+        meta = service.files().update(fileId=_file_id(), media_body=media, fields=_META_FIELDS).execute()
+    _DOC_META.clear()
+    _DOC_META.update(meta or {})
+
+def users_doc_metadata(refresh: bool = False) -> dict:
+    """
+    Metadados do YAML de usuários no Drive (modifiedTime, size, version),
+    sem baixar o conteúdo. Usa o que já foi visto no último upload, a não ser
+    que `refresh=True`.
+    """
+    if _DOC_META and not refresh:
+        return dict(_DOC_META)
+    local = _local()
+    if local is not None:
+        meta = local.metadata()
+    else:
+        service = _drive()
+        meta = service.files().get(fileId=_file_id(), fields=_META_FIELDS).execute()
+    _DOC_META.clear()
+    _DOC_META.update(meta or {})
+    return dict(_DOC_META)
 
+@instrument("drive.download_users_doc")
 def download_users_doc() -> dict:
     raw = _download_raw()
     if not raw:
@@ -78,6 +115,7 @@ def download_users_doc() -> dict:
     # fallback final: estrutura vazia válida
     return {"users": []}
 
+@instrument("drive.upload_users_doc")
 def upload_users_doc(doc: dict):
     txt = yaml.safe_dump(doc, sort_keys=False, allow_unicode=True)
     blob = encrypt_text(txt)  # sempre criptografado no Drive